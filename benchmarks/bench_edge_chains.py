@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark grind spline edge chain ordering on large synthetic meshes.
+
+Usage:
+    blender --background --factory-startup --python benchmarks/bench_edge_chains.py -- [grid_size]
+"""
+# Ensure that compatibility is handled for python 2, 3
+from __future__ import division, print_function, absolute_import
+
+import os
+import sys
+import time
+
+import bpy
+import bmesh
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "skater-xl-mod-tools"))
+from sxl.ops import SXLGeneratePoints  # noqa: E402
+
+CHAIN_LENGTHS = [10, 100, 1000, 10000]
+
+
+def build_grid(size):
+    """
+    Builds a quad grid object with roughly 2 * size^2 edges and links it to the scene
+    Args:
+        size: Number of vertices along each side of the grid
+
+    Returns: New grid object
+    """
+    verts = [(x, y, 0.0) for y in range(size) for x in range(size)]
+    faces = [(y * size + x, y * size + x + 1, (y + 1) * size + x + 1, (y + 1) * size + x)
+             for y in range(size - 1) for x in range(size - 1)]
+    mesh = bpy.data.meshes.new("BenchGrid")
+    mesh.from_pydata(verts, [], faces)
+    obj = bpy.data.objects.new("BenchGrid", mesh)
+    bpy.context.collection.objects.link(obj)
+    bpy.context.view_layer.objects.active = obj
+    return obj
+
+
+def select_chain(b_mesh, size, length):
+    """
+    Selects a snaking chain of edges that walks the grid row by row
+    Args:
+        b_mesh: Edit mode bmesh of the grid
+        size: Number of vertices along each side of the grid
+        length: Number of edges to select
+    """
+    path = {}
+    for step in range(length + 1):
+        y, x = divmod(step, size)
+        path[y * size + (x if y % 2 == 0 else size - 1 - x)] = step
+    for edge in b_mesh.edges:
+        v0, v1 = edge.verts[0].index, edge.verts[1].index
+        edge.select = v0 in path and v1 in path and abs(path[v0] - path[v1]) == 1
+    b_mesh.select_mode = {'EDGE'}
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    size = int(argv[0]) if argv else 500
+
+    obj = build_grid(size)
+    bpy.ops.object.mode_set(mode='EDIT')
+    b_mesh = bmesh.from_edit_mesh(obj.data)
+    print("Grid: {} verts, {} edges".format(len(b_mesh.verts), len(b_mesh.edges)))
+
+    for length in CHAIN_LENGTHS:
+        select_chain(b_mesh, size, length)
+        start = time.perf_counter()
+        points = SXLGeneratePoints.get_selected_verts(obj)
+        elapsed = time.perf_counter() - start
+        assert len(points) == length + 1, "Expected {} points, got {}".format(length + 1, len(points))
+        print("{:>6} edges: {:.4f}s".format(length, elapsed))
+
+    bpy.ops.object.mode_set(mode='OBJECT')
+
+
+if __name__ == "__main__":
+    main()
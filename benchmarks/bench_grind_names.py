@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark grind point naming as a scene grows, comparing the counter based names used by
+SXLGeneratePoints against the legacy 3 character uuid names. Splines are added until the
+scene holds --points grind points, timing every --block points. Exits 1 when the last block
+is more than --max-growth times slower than the first, or when a counter name was renamed.
+
+Usage:
+    blender --background --factory-startup --python benchmarks/bench_grind_names.py -- \
+        [--points 50000] [--spline-points 100] [--block 5000] [--output results.json]
+"""
+# Ensure that compatibility is handled for python 2, 3
+from __future__ import division, print_function, absolute_import
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import uuid
+
+import bpy
+from mathutils import Vector
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "skater-xl-mod-tools"))
+from sxl import pipeline  # noqa: E402
+from sxl.ops import SXLGeneratePoints  # noqa: E402
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(prog="bench_grind_names.py")
+    parser.add_argument("--points", type=int, default=50000, help="Grind points in the scene at the end")
+    parser.add_argument("--spline-points", type=int, default=100, help="Grind points per spline")
+    parser.add_argument("--block", type=int, default=5000, help="Points per timed block")
+    parser.add_argument("--max-growth", type=float, default=2.0, help="Allowed last block to first block time ratio")
+    parser.add_argument("--skip-legacy", action="store_true", help="Only time the counter based names")
+    parser.add_argument("--output", default=None, help="Results json path, printed only when not given")
+    return parser.parse_args(argv)
+
+
+class BenchOperator(object):
+    """Stands in for a running SXLGeneratePoints operator"""
+    audio_cue = "Metal"
+    add_point = staticmethod(SXLGeneratePoints.add_point)
+    add_points = staticmethod(SXLGeneratePoints.add_points)
+
+
+def counter_build(obj, vertex_array):
+    SXLGeneratePoints.build_grind_spline(BenchOperator(), obj, vertex_array)
+
+
+def legacy_build(obj, vertex_array):
+    """Point naming as it was before the scene counter, kept as the benchmark baseline"""
+    root = SXLGeneratePoints.add_point("{}_GrindSpline_Grind_Metal_Root".format(obj.name), str(uuid.uuid4())[:3],
+                                       location=obj.location, parent=obj)
+    point_uuid = str(uuid.uuid4())[:3]
+    names = ["GrindPoint_{}{}".format(point_uuid, i) for i in range(len(vertex_array))]
+    SXLGeneratePoints.add_points(names, vertex_array, root, parent_matrix=root.matrix_basis)
+
+
+def clear_scene():
+    bpy.data.batch_remove(list(bpy.data.objects))
+    bpy.context.scene.SXL.grinds.clear()
+    bpy.context.scene.SXL.grind_counter = 0
+
+
+def run(build, args):
+    """
+    Fills an empty scene with splines
+    Returns: Tuple of (seconds per block, number of points blender renamed)
+    """
+    clear_scene()
+    obj = bpy.data.objects.new("BenchRail", None)
+    bpy.context.collection.objects.link(obj)
+    vertex_array = [Vector((i * 0.25, 0.0, 1.0)) for i in range(args.spline_points)]
+
+    blocks = []
+    created = 0
+    block_start = time.perf_counter()
+    while created < args.points:
+        build(obj, vertex_array)
+        created += len(vertex_array)
+        if created % args.block < args.spline_points:
+            blocks.append(time.perf_counter() - block_start)
+            block_start = time.perf_counter()
+    # Blender resolves a taken name with a .001 style suffix
+    renamed = sum(1 for obj in bpy.data.objects if re.search(r"\.\d{3}$", obj.name))
+    return blocks, renamed
+
+
+def main():
+    args = parse_args()
+    # Grind roots are recorded in the scene registry
+    pipeline.ensure_registered()
+
+    results = {"blender": bpy.app.version_string, "points": args.points, "block": args.block}
+    builds = [("counter", counter_build)] + ([] if args.skip_legacy else [("legacy", legacy_build)])
+    for label, build in builds:
+        blocks, renamed = run(build, args)
+        results[label] = {"blocks": blocks, "renamed": renamed,
+                          "growth": blocks[-1] / max(blocks[0], 1e-9) if blocks else 1.0}
+    clear_scene()
+
+    print("{:>8} ".format("points") + " ".join("{:>10}".format(label) for label, _ in builds))
+    for i in range(len(results["counter"]["blocks"])):
+        print("{:>8} ".format((i + 1) * args.block) +
+              " ".join("{:>9.4f}s".format(results[label]["blocks"][i]) for label, _ in builds))
+    for label, _ in builds:
+        print("{}: {:.2f}x growth, {} points renamed".format(label, results[label]["growth"], results[label]["renamed"]))
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as results_file:
+            results_file.write(text)
+        print("Results => {}".format(args.output))
+    else:
+        print(text)
+
+    failed = False
+    if results["counter"]["growth"] > args.max_growth:
+        print("Point creation slowed down {:.2f}x, over {:.2f}x".format(results["counter"]["growth"], args.max_growth))
+        failed = True
+    if results["counter"]["renamed"]:
+        print("{} counter named points were renamed".format(results["counter"]["renamed"]))
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark grind point creation, comparing the legacy per point bpy.ops.object.parent_set
+path against the batched data path used by SXLGeneratePoints.
+
+Usage:
+    blender --background --factory-startup --python benchmarks/bench_grind_points.py
+"""
+# Ensure that compatibility is handled for python 2, 3
+from __future__ import division, print_function, absolute_import
+
+import os
+import sys
+import time
+
+import bpy
+from mathutils import Vector
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "skater-xl-mod-tools"))
+from sxl import pipeline  # noqa: E402
+from sxl.ops import SXLGeneratePoints  # noqa: E402
+
+POINT_COUNTS = [10, 100, 300, 1000]
+
+
+def legacy_add_point(name, uid, location=(0, 0, 0), parent=None):
+    """Point creation as it was before batching, kept as the benchmark baseline"""
+    point = bpy.data.objects.new(name, None)
+    point.name = "{}_{}".format(point.name.split('.')[0], uid)
+    point.empty_display_size = 1
+    point.empty_display_type = 'PLAIN_AXES'
+    bpy.context.collection.objects.link(point)
+    point.location = location
+
+    bpy.context.active_object.select_set(False)
+    bpy.data.objects[point.name].select_set(True)
+    bpy.data.objects[parent.name].select_set(True)
+    bpy.context.view_layer.objects.active = parent
+    bpy.ops.object.parent_set(type="OBJECT")
+    bpy.context.active_object.select_set(False)
+
+    return point
+
+
+def legacy_build(obj, vertex_array):
+    grind_root = legacy_add_point("{}_GrindSpline_Grind_Metal_Root".format(obj.name), "old",
+                                  location=obj.location, parent=obj)
+    for i in range(len(vertex_array)):
+        legacy_add_point("GrindPoint", "old{}".format(i), location=vertex_array[i], parent=grind_root)
+    return grind_root
+
+
+class BenchOperator(object):
+    """Stands in for a running SXLGeneratePoints operator"""
+    audio_cue = "Metal"
+    add_point = staticmethod(SXLGeneratePoints.add_point)
+    add_points = staticmethod(SXLGeneratePoints.add_points)
+
+
+def batched_build(obj, vertex_array):
+    SXLGeneratePoints.build_grind_spline(BenchOperator(), obj, vertex_array)
+    return next(o for o in obj.children if o.get("grind_spline") == 1)
+
+
+def make_rail(count):
+    obj = bpy.data.objects.new("BenchRail", None)
+    bpy.context.collection.objects.link(obj)
+    obj.location = (1.0, 2.0, 3.0)
+    obj.rotation_euler = (0.0, 0.0, 0.5)
+    bpy.context.view_layer.objects.active = obj
+    bpy.context.view_layer.update()
+    return obj, [obj.matrix_world @ Vector((i * 0.25, 0.0, 1.0)) for i in range(count)]
+
+
+def clear_scene():
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj)
+
+
+def world_positions(root):
+    bpy.context.view_layer.update()
+    return [child.matrix_world.translation.copy() for child in sorted(root.children, key=lambda c: c.location.x)]
+
+
+def timed(build, count):
+    clear_scene()
+    obj, vertex_array = make_rail(count)
+    start = time.perf_counter()
+    root = build(obj, vertex_array)
+    elapsed = time.perf_counter() - start
+    return elapsed, world_positions(root)
+
+
+def main():
+    # Grind roots are recorded in the scene registry
+    pipeline.ensure_registered()
+    print("{:>6} {:>10} {:>10} {:>8}".format("points", "legacy", "batched", "speedup"))
+    for count in POINT_COUNTS:
+        legacy_time, legacy_positions = timed(legacy_build, count)
+        batched_time, batched_positions = timed(batched_build, count)
+        for old, new in zip(legacy_positions, batched_positions):
+            assert (old - new).length < 1e-5, "World space mismatch {} != {}".format(old, new)
+        print("{:>6} {:>9.4f}s {:>9.4f}s {:>7.1f}x".format(count, legacy_time, batched_time,
+                                                          legacy_time / max(batched_time, 1e-9)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark the full Skater XL workflow on a synthetic park and write the timings as json.
+Results of two runs, ie two commits, can be compared with benchmarks/compare.py.
+
+Usage:
+    blender --background --factory-startup --python benchmarks/bench_park.py -- \
+        [--props N] [--rails M] [--rail-edges K] [--dense D] [--dense-segments S] [--output results.json]
+"""
+# Ensure that compatibility is handled for python 2, 3
+from __future__ import division, print_function, absolute_import
+
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import addon_utils
+import bpy
+import bmesh
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ADDON = "skater-xl-mod-tools"
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(prog="bench_park.py")
+    parser.add_argument("--props", type=int, default=50, help="Number of subdivided box props")
+    parser.add_argument("--prop-cuts", type=int, default=4, help="Subdivision cuts of each prop")
+    parser.add_argument("--rails", type=int, default=20, help="Number of rails")
+    parser.add_argument("--rail-edges", type=int, default=200, help="Edges along each rail")
+    parser.add_argument("--dense", type=int, default=2, help="Number of dense meshes")
+    parser.add_argument("--dense-segments", type=int, default=256, help="Segments of each dense uv sphere")
+    parser.add_argument("--output", default=None, help="Results json path, printed only when not given")
+    return parser.parse_args(argv)
+
+
+def enable_addon():
+    """Enables the add-on from this checkout, so operators and preferences behave as installed"""
+    sys.path.insert(0, ROOT)
+    addon_utils.enable(ADDON, default_set=True)
+    return {name: importlib.import_module("{}.sxl.{}".format(ADDON, name))
+            for name in ("ops", "lods", "collision")}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_prop(i, cuts):
+    mesh = bpy.data.meshes.new("Prop{}".format(i))
+    b_mesh = bmesh.new()
+    bmesh.ops.create_cube(b_mesh, size=1.0)
+    bmesh.ops.subdivide_edges(b_mesh, edges=b_mesh.edges[:], cuts=cuts, use_grid_fill=True)
+    b_mesh.to_mesh(mesh)
+    b_mesh.free()
+    obj = bpy.data.objects.new(mesh.name, mesh)
+    obj.location = ((i % 10) * 3.0, (i // 10) * 3.0, 0.5)
+    bpy.context.collection.objects.link(obj)
+    return obj
+
+
+def build_rail(i, edges):
+    """
+    Builds a square tube rail. Its first edges.length + 1 vertices run along the top edge.
+    """
+    profile = [(0.0, 0.05), (0.05, 0.0), (0.0, -0.05), (-0.05, 0.0)]
+    verts = [(x * 0.1, y, 1.0 + z) for y, z in profile for x in range(edges + 1)]
+    faces = []
+    for side in range(len(profile)):
+        a, b = side * (edges + 1), ((side + 1) % len(profile)) * (edges + 1)
+        faces.extend((a + x, a + x + 1, b + x + 1, b + x) for x in range(edges))
+    mesh = bpy.data.meshes.new("Rail{}".format(i))
+    mesh.from_pydata(verts, [], faces)
+    obj = bpy.data.objects.new(mesh.name, mesh)
+    obj.location = (-5.0, i * 2.0, 0.0)
+    bpy.context.collection.objects.link(obj)
+    return obj
+
+
+def build_dense(i, segments):
+    bpy.ops.mesh.primitive_uv_sphere_add(segments=segments, ring_count=segments // 2, location=(-20.0, i * 5.0, 2.0))
+    obj = bpy.context.active_object
+    obj.name = "Dense{}".format(i)
+    return obj
+
+
+def select_top_edge(obj, edges):
+    b_mesh = bmesh.from_edit_mesh(obj.data)
+    b_mesh.select_mode = {'EDGE'}
+    for edge in b_mesh.edges:
+        edge.select = edge.verts[0].index <= edges and edge.verts[1].index <= edges
+
+
+def set_active(obj):
+    for o in bpy.context.selected_objects:
+        o.select_set(False)
+    obj.select_set(True)
+    bpy.context.view_layer.objects.active = obj
+
+
+class Timer(object):
+    def __init__(self):
+        self.timings = {}
+
+    def __call__(self, name, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        self.timings[name] = time.perf_counter() - start
+        print("{:<24} {:>9.4f}s".format(name, self.timings[name]))
+        return result
+
+
+def main():
+    args = parse_args()
+    modules = enable_addon()
+    prefs = bpy.context.preferences.addons[ADDON].preferences
+    prefs.export_mode = "SINGLE"
+    prefs.export_incremental = False
+    prefs.export_selected_flag = False
+
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj)
+    timer = Timer()
+    props = timer("build_scene_props", lambda: [build_prop(i, args.prop_cuts) for i in range(args.props)])
+    rails = timer("build_scene_rails", lambda: [build_rail(i, args.rail_edges) for i in range(args.rails)])
+    dense = timer("build_scene_dense", lambda: [build_dense(i, args.dense_segments) for i in range(args.dense)])
+    meshes = props + dense
+
+    def selected_verts():
+        set_active(rails[0])
+        bpy.ops.object.mode_set(mode='EDIT')
+        select_top_edge(rails[0], args.rail_edges)
+        start = time.perf_counter()
+        verts = modules["ops"].SXLGeneratePoints.get_selected_verts(rails[0])
+        elapsed = time.perf_counter() - start
+        bpy.ops.object.mode_set(mode='OBJECT')
+        assert len(verts) == args.rail_edges + 1, "Expected {} points, got {}".format(args.rail_edges + 1, len(verts))
+        return elapsed
+
+    def grind_points():
+        for rail in rails:
+            set_active(rail)
+            bpy.ops.object.mode_set(mode='EDIT')
+            select_top_edge(rail, args.rail_edges)
+            bpy.ops.sxl.generate_points(audio_cue="Metal")
+            bpy.ops.object.mode_set(mode='OBJECT')
+
+    timer.timings["get_selected_verts"] = selected_verts()
+    print("{:<24} {:>9.4f}s".format("get_selected_verts", timer.timings["get_selected_verts"]))
+    timer("build_grind_points", grind_points)
+    timer("make_lods", lambda: [modules["lods"].make_lods(obj) for obj in meshes])
+    timer("make_collision_shape", lambda: [modules["collision"].make_collision_shape(obj) for obj in meshes])
+    timer("finalize_grinds", bpy.ops.sxl.finalize_grinds)
+    timer("reset_grinds", bpy.ops.sxl.reset_grinds)
+
+    temp_dir = tempfile.mkdtemp(prefix="sxl_bench_")
+    export_path = os.path.join(temp_dir, "park.fbx")
+    timer("asset_export", lambda: bpy.ops.sxl.asset_export(filepath=export_path))
+
+    results = {
+        "commit": git_commit(),
+        "blender": bpy.app.version_string,
+        "params": {key: value for key, value in vars(args).items() if key != "output"},
+        "scene": {
+            "objects": len(bpy.data.objects),
+            "vertices": sum(len(mesh.vertices) for mesh in bpy.data.meshes),
+            "export_size": os.path.getsize(export_path) if os.path.exists(export_path) else 0,
+        },
+        "timings": timer.timings,
+    }
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as results_file:
+            results_file.write(text)
+        print("Results => {}".format(args.output))
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark the add-on startup cost: importing and registering it in a fresh blender.
+Exits 1 when registering takes longer than the budget, or when it imports an
+implementation module that operators should only import on first execute.
+
+Usage:
+    blender --background --factory-startup --python benchmarks/bench_register.py -- \
+        [--budget 0.05] [--repeat 10] [--output results.json]
+"""
+# Ensure that compatibility is handled for python 2, 3
+from __future__ import division, print_function, absolute_import
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import addon_utils
+import bpy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ADDON = "skater-xl-mod-tools"
+# Implementation modules, imported by the operators that use them
+LAZY_MODULES = ("batch", "batching", "collision", "detection", "export", "grinds", "hashing", "lods",
+                "pipeline", "report", "splines")
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(prog="bench_register.py")
+    parser.add_argument("--budget", type=float, default=0.05, help="Allowed seconds for the first import and register")
+    parser.add_argument("--repeat", type=int, default=10, help="Number of unregister and register cycles timed")
+    parser.add_argument("--output", default=None, help="Results json path, printed only when not given")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    sys.path.insert(0, ROOT)
+    modules_before = set(sys.modules)
+
+    start = time.perf_counter()
+    addon_utils.enable(ADDON, default_set=True)
+    first = time.perf_counter() - start
+    imported = sorted(set(sys.modules) - modules_before)
+
+    # Modules are cached from here on, so these cycles only time class registration
+    cycles = []
+    for _ in range(args.repeat):
+        addon_utils.disable(ADDON)
+        start = time.perf_counter()
+        addon_utils.enable(ADDON)
+        cycles.append(time.perf_counter() - start)
+
+    eager = [name for name in LAZY_MODULES if "{}.sxl.{}".format(ADDON, name) in imported]
+    results = {
+        "blender": bpy.app.version_string,
+        "budget": args.budget,
+        "timings": {
+            "first_register": first,
+            "register": min(cycles) if cycles else first,
+        },
+        "imported_modules": imported,
+        "eager_modules": eager,
+    }
+    print("{:<24} {:>9.4f}s".format("first_register", first))
+    print("{:<24} {:>9.4f}s".format("register", results["timings"]["register"]))
+    print("{} modules imported by the add-on".format(len(imported)))
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as results_file:
+            results_file.write(text)
+        print("Results => {}".format(args.output))
+    else:
+        print(text)
+
+    failed = False
+    if first > args.budget:
+        print("Register took {:.4f}s, over the {:.4f}s budget".format(first, args.budget))
+        failed = True
+    if eager:
+        print("Imported at register: {}".format(", ".join(eager)))
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
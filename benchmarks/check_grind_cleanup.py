@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Check the grind spline clean up math on synthetic splines: untouched, merged, snapped,
+overlapping, trimmed and split splines, and point clustering against a brute force search.
+Only needs numpy, so it runs in Blender or in a plain python. Exits 1 when a check fails.
+
+Usage:
+    python benchmarks/check_grind_cleanup.py
+    blender --background --factory-startup --python benchmarks/check_grind_cleanup.py
+"""
+# Ensure that compatibility is handled for python 2, 3
+from __future__ import division, print_function, absolute_import
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "skater-xl-mod-tools", "sxl"))
+import splines  # noqa: E402
+
+TOLERANCE = 0.01
+SNAP_DISTANCE = 0.1
+
+
+def line(start, end, count):
+    """Evenly spaced points from start to end"""
+    return np.linspace(start, end, count)
+
+
+def cleanup(chains):
+    """
+    Runs the clean up steps of grinds.cleanup_grinds on point arrays
+    Args:
+        chains: List of (N, 3) arrays of ordered points, earlier chains win overlaps
+
+    Returns: List of runs per chain, as (M, 3) arrays, or None for collapsed chains
+    """
+    points, indices, merged, snapped = splines.merge_chains(chains, TOLERANCE, SNAP_DISTANCE)
+    points, runs_per_chain, dropped, trimmed = splines.trim_overlaps(points, indices, TOLERANCE, SNAP_DISTANCE)
+    return [None if runs is None else [points[run] for run in runs] for runs in runs_per_chain]
+
+
+def check_untouched():
+    chains = [line((0, 0, 0), (10, 0, 0), 11), line((0, 5, 0), (10, 5, 0), 11)]
+    result = cleanup(chains)
+    return all(len(runs) == 1 and np.allclose(runs[0], chain) for runs, chain in zip(result, chains))
+
+
+def check_merged():
+    chain = line((0, 0, 0), (10, 0, 0), 11)
+    doubled = np.insert(chain, 5, chain[5] + (0.0, 0.004, 0.0), axis=0)
+    runs = cleanup([doubled])[0]
+    return len(runs) == 1 and len(runs[0]) == 11
+
+
+def check_snapped():
+    first = line((0, 0, 0), (5, 0, 0), 6)
+    second = line((5.05, 0, 0), (10, 0, 0), 6)
+    result = cleanup([first, second])
+    return np.allclose(result[0][0][-1], result[1][0][0])
+
+
+def check_overlapping():
+    first = line((0, 0, 0), (10, 0, 0), 11)
+    stacked = line((2, 0.005, 0), (8, 0.005, 0), 7)
+    result = cleanup([first, stacked])
+    return len(result[0]) == 1 and not result[1]
+
+
+def check_trimmed():
+    first = line((0, 0, 0), (10, 0, 0), 11)
+    # Runs along the end of the first spline, then carries on past it on a longer segment
+    second = np.array([(6, 0, 0), (8, 0, 0), (14, 0, 0)], dtype=np.float64)
+    runs = cleanup([first, second])[1]
+    return len(runs) == 1 and np.allclose(runs[0][0], (10, 0, 0), atol=1e-4) and np.allclose(runs[0][-1], (14, 0, 0))
+
+
+def check_split():
+    first = line((4, 0, 0), (6, 0, 0), 3)
+    crossing = line((0, 0, 0), (10, 0, 0), 11)
+    runs = cleanup([first, crossing])[1]
+    return len(runs) == 2 and np.allclose(runs[0][-1], (4, 0, 0)) and np.allclose(runs[1][0], (6, 0, 0))
+
+
+def check_junction():
+    rail = line((0, 0, 0), (10, 0, 0), 11)
+    # Starts on the rail at an angle, the overlap is shorter than the snap distance
+    branch = line((5.5, 0, 0), (7.5, 5, 0), 3)
+    runs = cleanup([rail, branch])[1]
+    return len(runs) == 1 and np.allclose(runs[0], branch)
+
+
+def check_collapsed():
+    result = cleanup([line((0, 0, 0), (10, 0, 0), 11), line((3, 3, 0), (3.005, 3, 0), 2)])
+    return result[1] is None
+
+
+def check_clusters():
+    random = np.random.RandomState(0)
+    points = np.concatenate([random.uniform(0.0, 5.0, (2000, 3)), random.uniform(1000.0, 1001.0, (10, 3))])
+    radius = 0.2
+    labels, centers = splines.cluster_points(points, radius)
+    expected = np.full(len(points), -1)
+    count = 0
+    for i in range(len(points)):
+        if expected[i] >= 0:
+            continue
+        members = (np.linalg.norm(points - points[i], axis=1) <= radius) & (expected < 0)
+        expected[members] = count
+        count += 1
+    return np.array_equal(labels, expected) and np.allclose(centers[labels[:1]], points[expected == 0].mean(axis=0))
+
+
+CHECKS = [check_untouched, check_merged, check_snapped, check_overlapping, check_trimmed, check_split,
+          check_junction, check_collapsed, check_clusters]
+
+
+def main():
+    failed = [check.__name__ for check in CHECKS if not check()]
+    for check in CHECKS:
+        print("{:<20} {}".format(check.__name__, "FAIL" if check.__name__ in failed else "ok"))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
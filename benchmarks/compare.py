@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compare two benchmark result files written by bench_park.py, ie from two commits.
+Runs with any python, blender is not needed.
+
+Usage:
+    python benchmarks/compare.py base.json new.json [--threshold 0.1]
+Exits 1 when any timing is slower than base by more than the threshold.
+"""
+# Ensure that compatibility is handled for python 2, 3
+from __future__ import division, print_function, absolute_import
+
+import argparse
+import json
+import sys
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="compare.py")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Allowed slowdown as a fraction of base")
+    args = parser.parse_args()
+
+    with open(args.base) as base_file:
+        base = json.load(base_file)
+    with open(args.new) as new_file:
+        new = json.load(new_file)
+    if base.get("params") != new.get("params"):
+        print("Warning: benchmark parameters differ, timings are not comparable")
+
+    print("{:<24} {:>10} {:>10} {:>8}".format("timing", "base", "new", "speedup"))
+    regressions = []
+    for name, base_time in base["timings"].items():
+        new_time = new["timings"].get(name)
+        if new_time is None:
+            print("{:<24} {:>9.4f}s {:>10}".format(name, base_time, "-"))
+            continue
+        print("{:<24} {:>9.4f}s {:>9.4f}s {:>7.2f}x".format(name, base_time, new_time,
+                                                           base_time / max(new_time, 1e-9)))
+        if new_time > base_time * (1.0 + args.threshold) and new_time - base_time > 0.001:
+            regressions.append(name)
+
+    if regressions:
+        print("Slower than base: {}".format(", ".join(regressions)))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
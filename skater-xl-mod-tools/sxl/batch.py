@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Skater XL package background blender worker pool.
+"""
+# Ensure that compatibility is handled for python 2, 3
+from __future__ import division, print_function, absolute_import
+
+__author__ = "Greg Amato"
+__url__ = "https://gregamato.dev"
+__copyright__ = "Copyright 2019-2020, Greg Amato - Amatobahn"
+__credits__ = []
+__license__ = "GNU Public License"
+__maintainer__ = "Greg Amato"
+__status__ = "Development"
+
+import concurrent.futures
+import json
+import os
+import subprocess
+
+import bpy
+
+from .error_handling import SXLWorkerError
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker.py")
+
+
+def worker_command(job_path, blend_file=None):
+    """
+    Builds the command line for a background blender worker
+    Args:
+        job_path: Path of the job description json
+        blend_file: Optional .blend file for the worker to open
+
+    Returns: List of command line arguments
+    """
+    command = [bpy.app.binary_path, "--background", "--factory-startup", "--python-exit-code", "1"]
+    if blend_file:
+        command.append(blend_file)
+    return command + ["--python", WORKER_SCRIPT, "--", job_path]
+
+
+def run_workers(jobs, workers, temp_dir, callback=None):
+    """
+    Runs jobs in a pool of background blender processes. Only the processes run concurrently,
+    callbacks and results are handled on the calling thread.
+    Args:
+        jobs: List of job dictionaries, each with a "task" key understood by worker.py
+        workers: Maximum number of concurrent blender processes
+        temp_dir: Directory to write job and result files to
+        callback: Optional callable receiving each job as it completes
+
+    Returns: List of result dictionaries, in job order
+    """
+    for i, job in enumerate(jobs):
+        job["result"] = os.path.join(temp_dir, "job_{}_result.json".format(i))
+        job["path"] = os.path.join(temp_dir, "job_{}.json".format(i))
+        with open(job["path"], "w") as job_file:
+            json.dump(job, job_file)
+
+    def run(job):
+        return subprocess.run(worker_command(job["path"], job.get("blend")),
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+
+    failures = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(run, job): job for job in jobs}
+        for future in concurrent.futures.as_completed(futures):
+            job = futures[future]
+            process = future.result()
+            if process.returncode != 0 or not os.path.exists(job["result"]):
+                failures.append("{}:\n{}".format(job["path"], process.stdout[-2000:]))
+            elif callback is not None:
+                callback(job)
+
+    if failures:
+        raise SXLWorkerError("{} worker(s) failed\n{}".format(len(failures), "\n".join(failures)))
+
+    results = []
+    for job in jobs:
+        with open(job["result"]) as result_file:
+            results.append(json.load(result_file))
+    return results
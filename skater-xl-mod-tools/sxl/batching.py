@@ -0,0 +1,296 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Skater XL package static batching.
+
+Static, non-grind props are grouped by material and by a spatial cell and merged into one
+mesh per group before export, so the park imports as a few large meshes instead of thousands
+of draw calls. Merging reads and writes flat arrays, the original objects are not modified.
+"""
+# Ensure that compatibility is handled for python 2, 3
+from __future__ import division, print_function, absolute_import
+
+__author__ = "Greg Amato"
+__url__ = "https://gregamato.dev"
+__copyright__ = "Copyright 2019-2020, Greg Amato - Amatobahn"
+__credits__ = []
+__license__ = "GNU Public License"
+__maintainer__ = "Greg Amato"
+__status__ = "Development"
+
+import contextlib
+import math
+
+import bpy
+import numpy as np
+
+from . import report, utils
+
+COLLECTION_NAME = "SXL_Batches"
+# Custom property opting an object out of batching
+NO_BATCH_PROPERTY = "sxl_no_batch"
+
+
+def is_static(obj, hierarchy):
+    """
+    Checks whether an object can be merged into a batch: an unparented, unanimated mesh whose
+    only children are its LODs and collision
+    Args:
+        obj: Object to check
+        hierarchy: Scene wide index from utils.build_hierarchy, so grandchildren are found
+
+    Returns: True when obj can be batched
+    """
+    if obj.type != 'MESH' or obj.parent is not None or obj.get(NO_BATCH_PROPERTY):
+        return False
+    if report.is_collision(obj) or report.get_lod_level(obj) > 0 or obj.get("grind_spline"):
+        return False
+    if obj.animation_data is not None and obj.animation_data.action is not None:
+        return False
+    for child in hierarchy.get(obj, []):
+        if child.get("grind_spline") or hierarchy.get(child):
+            return False
+        if not (report.is_collision(child) or child.get("sxl_collider") or report.get_lod_level(child) > 0):
+            return False
+    return True
+
+
+def get_batches(objects, cell_size):
+    """
+    Groups static objects by their materials and the cell their bounds center falls in
+    Args:
+        objects: Candidate objects, ie everything about to be exported
+        cell_size: Size of the cubic cells, in scene units
+
+    Returns: Dictionary of (material names, cell) => list of objects, only groups of two or more
+    """
+    # Indexed over the scene rather than objects, children left out of the export still count
+    hierarchy = utils.build_hierarchy(bpy.context.scene.objects)
+    groups = {}
+    for obj in objects:
+        if not is_static(obj, hierarchy):
+            continue
+        matrix = np.array(obj.matrix_world)
+        corners = np.array(obj.bound_box) @ matrix[:3, :3].T + matrix[:3, 3]
+        center = (corners.min(axis=0) + corners.max(axis=0)) / 2.0
+        cell = tuple(int(math.floor(c / cell_size)) for c in center)
+        materials = tuple(slot.material.name if slot.material else "" for slot in obj.material_slots)
+        groups.setdefault((materials, cell), []).append(obj)
+    return {key: group for key, group in groups.items() if len(group) > 1}
+
+
+def read_part(obj, depsgraph, materials):
+    """
+    Reads the evaluated mesh of an object into world space arrays
+    Args:
+        obj: Mesh object
+        depsgraph: Evaluated depsgraph
+        materials: Materials of the merged mesh, slots of obj are remapped to them
+
+    Returns: Dictionary of arrays
+    """
+    eval_obj = obj.evaluated_get(depsgraph)
+    mesh = eval_obj.to_mesh()
+    try:
+        co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", co)
+        loop_vertex = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get("vertex_index", loop_vertex)
+        loop_start = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("loop_start", loop_start)
+        loop_total = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("loop_total", loop_total)
+        material_index = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("material_index", material_index)
+        use_smooth = np.empty(len(mesh.polygons), dtype=bool)
+        mesh.polygons.foreach_get("use_smooth", use_smooth)
+        uvs = {}
+        for layer in mesh.uv_layers:
+            uv = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+            layer.data.foreach_get("uv", uv)
+            uvs[layer.name] = uv.reshape(-1, 2)
+    finally:
+        eval_obj.to_mesh_clear()
+
+    matrix = np.array(obj.matrix_world, dtype=np.float32)
+    co = co.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+    if np.linalg.det(matrix[:3, :3]) < 0:
+        # Negative scale flips the winding, reverse the loops of every polygon
+        starts = np.repeat(loop_start, loop_total)
+        offsets = np.arange(len(loop_vertex), dtype=np.int32) - starts
+        order = starts + np.repeat(loop_total, loop_total) - 1 - offsets
+        loop_vertex = loop_vertex[order]
+        uvs = {name: uv[order] for name, uv in uvs.items()}
+
+    remap = np.array([materials.index(slot.material) if slot.material in materials else 0
+                      for slot in obj.material_slots] or [0], dtype=np.int32)
+    return {
+        "co": co,
+        "loop_vertex": loop_vertex,
+        "loop_start": loop_start,
+        "loop_total": loop_total,
+        "material_index": remap[np.clip(material_index, 0, len(remap) - 1)],
+        "use_smooth": use_smooth,
+        "uvs": uvs,
+    }
+
+
+def merge_parts(name, parts, materials):
+    """
+    Builds one mesh from world space parts by concatenating their arrays
+    Args:
+        name: Name of the new mesh
+        parts: Part dictionaries from read_part
+        materials: Materials of the new mesh
+
+    Returns: New mesh datablock
+    """
+    vertex_offsets = np.cumsum([0] + [len(part["co"]) for part in parts[:-1]])
+    loop_offsets = np.cumsum([0] + [len(part["loop_vertex"]) for part in parts[:-1]])
+    co = np.concatenate([part["co"] for part in parts])
+    loop_vertex = np.concatenate([part["loop_vertex"] + offset for part, offset in zip(parts, vertex_offsets)])
+    loop_start = np.concatenate([part["loop_start"] + offset for part, offset in zip(parts, loop_offsets)])
+
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(co))
+    mesh.vertices.foreach_set("co", co.astype(np.float32).ravel())
+    mesh.loops.add(len(loop_vertex))
+    mesh.loops.foreach_set("vertex_index", loop_vertex.astype(np.int32))
+    mesh.polygons.add(len(loop_start))
+    mesh.polygons.foreach_set("loop_start", loop_start.astype(np.int32))
+    # Polygon sizes are derived from loop_start in newer blender versions
+    if not bpy.types.MeshPolygon.bl_rna.properties["loop_total"].is_readonly:
+        mesh.polygons.foreach_set("loop_total", np.concatenate([part["loop_total"] for part in parts]))
+    mesh.polygons.foreach_set("material_index", np.concatenate([part["material_index"] for part in parts]))
+    mesh.polygons.foreach_set("use_smooth", np.concatenate([part["use_smooth"] for part in parts]))
+
+    # UV layers are matched by name, parts without a layer get zeros
+    for layer_name in dict.fromkeys(layer for part in parts for layer in part["uvs"]):
+        uv = np.concatenate([part["uvs"].get(layer_name, np.zeros((len(part["loop_vertex"]), 2), dtype=np.float32))
+                             for part in parts])
+        mesh.uv_layers.new(name=layer_name).data.foreach_set("uv", uv.ravel())
+
+    for material in materials:
+        mesh.materials.append(material)
+    mesh.update(calc_edges=True)
+    return mesh
+
+
+def get_level_children(obj, children):
+    """
+    Sorts the generated children of a batched object
+    Args:
+        obj: Batched object
+        children: Direct children of obj
+
+    Returns: Tuple of (dictionary of LOD level => mesh object, collision meshes, other colliders)
+    """
+    levels = {0: obj}
+    collision = []
+    colliders = []
+    for child in children:
+        if child.type == 'MESH' and report.is_collision(child) and child.get("collision_convex") != 1:
+            collision.append(child)
+        elif report.is_collision(child) or child.get("sxl_collider"):
+            colliders.append(child)
+        elif child.type == 'MESH' and report.get_lod_level(child) > 0:
+            levels[report.get_lod_level(child)] = child
+    return levels, collision, colliders
+
+
+def build_batch(name, objects, hierarchy, depsgraph, collection):
+    """
+    Merges a group of static objects, their LOD levels and their collision meshes.
+    Objects without a LOD level use their closest lower level in that merged level.
+    Convex hulls and primitive colliders are not merged, copies are parented to the batch.
+    Args:
+        name: Base name of the batch
+        objects: Objects in the group
+        hierarchy: Index from utils.build_hierarchy
+        depsgraph: Evaluated depsgraph
+        collection: Collection new objects are linked to
+
+    Returns: List of new objects, the batch root first
+    """
+    materials = [slot.material for slot in objects[0].material_slots if slot.material is not None]
+    sorted_children = [get_level_children(obj, hierarchy.get(obj, [])) for obj in objects]
+    lod_count = max(max(levels) for levels, _, _ in sorted_children)
+
+    new_objects = []
+    for level in range(lod_count + 1):
+        parts = []
+        for levels, _, _ in sorted_children:
+            source = levels[max(lod for lod in levels if lod <= level)]
+            parts.append(read_part(source, depsgraph, materials))
+        level_name = "{}_LOD{}".format(name, level) if lod_count else name
+        obj = bpy.data.objects.new(level_name, merge_parts(level_name, parts, materials))
+        collection.objects.link(obj)
+        if new_objects:
+            obj.parent = new_objects[0]
+        new_objects.append(obj)
+    root = new_objects[0]
+
+    collision = [child for _, meshes, _ in sorted_children for child in meshes]
+    if collision:
+        collision_name = "{}_collision".format(name)
+        parts = [read_part(child, depsgraph, []) for child in collision]
+        obj = bpy.data.objects.new(collision_name, merge_parts(collision_name, parts, []))
+        collection.objects.link(obj)
+        obj.parent = root
+        new_objects.append(obj)
+
+    for _, _, colliders in sorted_children:
+        for collider in colliders:
+            copy = collider.copy()
+            collection.objects.link(copy)
+            utils.parent_keep_transform(copy, root)
+            new_objects.append(copy)
+    return new_objects
+
+
+@contextlib.contextmanager
+def batched(objects, cell_size):
+    """
+    Temporarily merges the static objects of an export into batches
+    Args:
+        objects: Objects about to be exported
+        cell_size: Size of the batching cells, 0 or less disables batching
+
+    Yields: Tuple of (objects to export instead, number of objects merged into batches)
+    """
+    if cell_size <= 0:
+        yield objects, 0
+        return
+    batches = get_batches(objects, cell_size)
+    if not batches:
+        yield objects, 0
+        return
+
+    collection = bpy.data.collections.new(COLLECTION_NAME)
+    bpy.context.scene.collection.children.link(collection)
+    hierarchy = utils.build_hierarchy(objects)
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    replaced = set()
+    merged = 0
+    new_objects = []
+    # Batches of a cell can share their first material, the index within the cell keeps names unique
+    cell_batches = {}
+    try:
+        for (materials, cell), group in sorted(batches.items()):
+            index = cell_batches[cell] = cell_batches.get(cell, -1) + 1
+            material = materials[0] if materials and materials[0] else "None"
+            name = "Batch_{}_{}_{}_{}_{}".format(material, *cell + (index,))
+            new_objects.extend(build_batch(name, group, hierarchy, depsgraph, collection))
+            merged += len(group)
+            for obj in group:
+                replaced.add(obj)
+                replaced.update(hierarchy.get(obj, []))
+        yield [obj for obj in objects if obj not in replaced] + new_objects, merged
+    finally:
+        meshes = set(obj.data for obj in new_objects if obj.type == 'MESH' and obj.data.users == 1)
+        for obj in new_objects:
+            bpy.data.objects.remove(obj)
+        for mesh in meshes:
+            bpy.data.meshes.remove(mesh)
+        bpy.data.collections.remove(collection)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Skater XL headless build pipeline.
+
+Runs the LOD, collision, grind finalize, export and budget report stages on a list of .blend files:
+    blender --background --python cli.py -- [options] map.blend [map2.blend ...]
+
+Each file is processed by its own background blender process, --workers at a time.
+Exits non-zero when any stage fails on any file.
+"""
+# Ensure that compatibility is handled for python 2, 3
+from __future__ import division, print_function, absolute_import
+
+__author__ = "Greg Amato"
+__url__ = "https://gregamato.dev"
+__copyright__ = "Copyright 2019-2020, Greg Amato - Amatobahn"
+__credits__ = []
+__license__ = "GNU Public License"
+__maintainer__ = "Greg Amato"
+__status__ = "Development"
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import bpy
+
+
+def parse_args(argv):
+    from sxl import pipeline
+
+    parser = argparse.ArgumentParser(prog="blender --background --python cli.py --",
+                                     description="Skater XL headless build pipeline")
+    parser.add_argument("files", nargs="+", help=".blend files to process")
+    parser.add_argument("--stages", default="lods,collision,grinds,export",
+                        help="Comma separated stages to run, in order, from: {}".format(", ".join(pipeline.STAGES)))
+    parser.add_argument("--output", default=None, help="Export folder, defaults to the folder of each .blend")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help="Number of .blend files processed in parallel")
+    parser.add_argument("--export-mode", default="SINGLE", choices=["SINGLE", "OBJECT", "COLLECTION", "TILES"])
+    parser.add_argument("--incremental", action="store_true", help="Skip exporting unchanged assets")
+    parser.add_argument("--fail-on-budget", action="store_true", help="Fail the report stage on budget violations")
+    parser.add_argument("--save", action="store_true", help="Save each .blend after a successful run")
+    args = parser.parse_args(argv)
+
+    args.stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = [stage for stage in args.stages if stage not in pipeline.STAGES]
+    if unknown:
+        parser.error("unknown stages: {}".format(", ".join(unknown)))
+    return args
+
+
+def get_options(args, path):
+    return {
+        "output": os.path.abspath(args.output) if args.output else os.path.dirname(os.path.abspath(path)),
+        "export_mode": args.export_mode,
+        "incremental": args.incremental,
+        "fail_on_budget": args.fail_on_budget,
+        "save": args.save,
+    }
+
+
+def run_in_process(args):
+    from sxl import pipeline
+
+    results = []
+    for path in args.files:
+        bpy.ops.wm.open_mainfile(filepath=os.path.abspath(path))
+        results.append(pipeline.run_stages(args.stages, get_options(args, path)))
+        print(pipeline.format_result(results[-1]))
+    return results
+
+
+def run_in_workers(args):
+    from sxl import batch, pipeline
+    from sxl.error_handling import SXLWorkerError
+
+    jobs = [{"task": "pipeline", "blend": os.path.abspath(path), "stages": args.stages,
+             "options": get_options(args, path)} for path in args.files]
+    temp_dir = tempfile.mkdtemp(prefix="sxl_pipeline_")
+    try:
+        # Stage failures are reported in the results, only crashed workers raise
+        return batch.run_workers(jobs, args.workers, temp_dir,
+                                 callback=lambda job: print("SXL PIPELINE: finished {}".format(job["blend"])))
+    except SXLWorkerError as e:
+        print("SXL PIPELINE: {}".format(e))
+        return None
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def main():
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from sxl import pipeline
+
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    args = parse_args(argv)
+    missing = [path for path in args.files if not os.path.isfile(path)]
+    if missing:
+        print("SXL PIPELINE: missing files: {}".format(", ".join(missing)))
+        sys.exit(2)
+
+    start = time.perf_counter()
+    if args.workers <= 1 or len(args.files) < 2:
+        results = run_in_process(args)
+    else:
+        results = run_in_workers(args)
+        for result in results or []:
+            print(pipeline.format_result(result))
+    if results is None:
+        sys.exit(1)
+
+    failed = [result for result in results if not result["ok"]]
+    for result in failed:
+        print("SXL PIPELINE: {} {}".format(result["file"], result["error"]))
+    print("SXL PIPELINE: {} files, {} failed, {:.2f}s".format(len(results), len(failed), time.perf_counter() - start))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,514 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Skater XL package collision shape generation.
+"""
+# Ensure that compatibility is handled for python 2, 3
+from __future__ import division, print_function, absolute_import
+
+__author__ = "Greg Amato"
+__url__ = "https://gregamato.dev"
+__copyright__ = "Copyright 2019-2020, Greg Amato - Amatobahn"
+__credits__ = []
+__license__ = "GNU Public License"
+__maintainer__ = "Greg Amato"
+__status__ = "Development"
+
+import heapq
+
+import bpy
+import bmesh
+import mathutils
+import numpy as np
+
+from . import lods, meshcache, utils
+
+# Points used to score candidate splits, the final hulls always use every point
+SAMPLE_POINTS = 512
+SPLIT_QUANTILES = (0.25, 0.5, 0.75)
+
+
+def make_collision_shape(obj):
+    """
+    Generates a single collision mesh by dissolving and triangulating a copy of the render mesh.
+    Instances of the same mesh share one collision mesh.
+    Args:
+        obj: Mesh object to generate collision for
+
+    Returns: New collision object
+    """
+    if obj is None:
+        return None
+    token, meshes = meshcache.lookup(obj, "collision", ())
+    collision_obj = obj.copy()
+    collision_obj.name = "{}_collision".format(utils.get_base_name(obj.name))
+    bpy.context.collection.objects.link(collision_obj)
+
+    if meshes is None:
+        modifier = collision_obj.modifiers.new(name="Decimate", type="DECIMATE")
+        modifier.decimate_type = "DISSOLVE"
+        modifier.angle_limit = 0.174533
+
+        triangulate = collision_obj.modifiers.new(name="Triangulate", type="TRIANGULATE")
+        triangulate.keep_custom_normals = True
+
+        meshes = [lods.evaluate_mesh(collision_obj)]
+        meshes[0].name = collision_obj.name
+        meshcache.store(token, meshes)
+    collision_obj.data = meshes[0]
+    collision_obj.modifiers.clear()
+    utils.parent_in_place(collision_obj, obj)
+    return collision_obj
+
+
+def mesh_triangles(mesh):
+    """
+    Reads vertex positions and triangles of a mesh in bulk
+    Args:
+        mesh: Mesh datablock
+
+    Returns: Tuple of (N x 3 float vertex array, M x 3 int triangle array)
+    """
+    mesh.calc_loop_triangles()
+    verts = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", verts)
+    tris = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+    mesh.loop_triangles.foreach_get("vertices", tris)
+    return verts.reshape(-1, 3), tris.reshape(-1, 3)
+
+
+def sample(points, count=SAMPLE_POINTS):
+    """
+    Deterministically thins out points to at most count entries
+    """
+    if len(points) <= count:
+        return points
+    return points[np.linspace(0, len(points) - 1, count).astype(np.int64)]
+
+
+def convex_hull(points):
+    """
+    Builds the convex hull of a point cloud
+    Args:
+        points: N x 3 point array
+
+    Returns: BMesh of the hull, or None when the points do not span a volume
+    """
+    if len(points) < 4:
+        return None
+    b_mesh = bmesh.new()
+    for co in points:
+        b_mesh.verts.new(co)
+    result = bmesh.ops.convex_hull(b_mesh, input=b_mesh.verts, use_existing_faces=False)
+    unused = set(result["geom_interior"]) | set(result["geom_unused"])
+    bmesh.ops.delete(b_mesh, geom=[elem for elem in unused if isinstance(elem, bmesh.types.BMVert)], context='VERTS')
+    if not b_mesh.faces:
+        b_mesh.free()
+        return None
+    b_mesh.normal_update()
+    return b_mesh
+
+
+def hull_volume(points):
+    """
+    Volume of the convex hull of a point cloud, zero when the points do not span a volume
+    """
+    return hull_measure(points)[0]
+
+
+def hull_measure(points):
+    """
+    Volume and surface area of the convex hull of a point cloud
+    """
+    b_mesh = convex_hull(points)
+    if b_mesh is None:
+        return 0.0, 0.0
+    measure = (b_mesh.calc_volume(), sum(face.calc_area() for face in b_mesh.faces))
+    b_mesh.free()
+    return measure
+
+
+def hull_planes(points):
+    """
+    Face planes of the convex hull of a point cloud
+    Args:
+        points: N x 3 point array
+
+    Returns: Tuple of (F x 3 outward normal array, F plane offset array), or None without a hull
+    """
+    b_mesh = convex_hull(points)
+    if b_mesh is None:
+        return None
+    normals = np.array([face.normal for face in b_mesh.faces], dtype=np.float32)
+    offsets = np.einsum("ij,ij->i", normals, np.array([face.verts[0].co for face in b_mesh.faces],
+                                                      dtype=np.float32))
+    b_mesh.free()
+    return normals, offsets
+
+
+def concavity(points, centroids, normals):
+    """
+    Measures how far surface triangles sit inside the convex hull of their points, by casting a ray
+    from each triangle centroid along its normal to the hull surface. Zero for convex surfaces.
+    Args:
+        points: N x 3 point array to build the hull from
+        centroids: M x 3 triangle centroid array
+        normals: M x 3 triangle normal array
+
+    Returns: Deepest ray distance to the hull surface
+    """
+    planes = hull_planes(points)
+    if planes is None:
+        return 0.0
+    hull_normals, offsets = planes
+
+    distance = offsets[np.newaxis, :] - centroids @ hull_normals.T
+    facing = normals @ hull_normals.T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        depth = np.where(facing > 1e-6, distance / facing, np.inf).min(axis=1)
+    depth = depth[np.isfinite(depth)]
+    return float(max(depth.max(), 0.0)) if len(depth) else 0.0
+
+
+def reduce_points(points, count):
+    """
+    Farthest point sampling, keeping the points that preserve the most of the hull shape
+    Args:
+        points: N x 3 point array
+        count: Number of points to keep
+
+    Returns: count x 3 point array
+    """
+    if len(points) <= count:
+        return points
+    chosen = [int(np.argmax(np.linalg.norm(points - points.mean(axis=0), axis=1)))]
+    distance = np.linalg.norm(points - points[chosen[0]], axis=1)
+    for _ in range(count - 1):
+        chosen.append(int(np.argmax(distance)))
+        distance = np.minimum(distance, np.linalg.norm(points - points[chosen[-1]], axis=1))
+    return points[chosen]
+
+
+def convex_decomposition(verts, tris, max_hulls=16, max_hull_verts=32, max_concavity=0.05):
+    """
+    Approximates a mesh by a set of convex hulls. Triangle clusters are split recursively,
+    always splitting the most concave cluster along the axis aligned plane that gives the
+    smallest total hull volume, until every cluster is convex enough or max_hulls is reached.
+    Neighbouring clusters are then merged back while they stay convex enough.
+    Args:
+        verts: N x 3 vertex array
+        tris: M x 3 triangle array
+        max_hulls: Maximum number of hulls
+        max_hull_verts: Maximum number of vertices per hull
+        max_concavity: Clusters with a concavity at or below this distance are not split
+
+    Returns: List of hull point arrays
+    """
+    corners = verts[tris]
+    centroids = corners.mean(axis=1)
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    normals /= np.maximum(np.linalg.norm(normals, axis=1), 1e-12)[:, np.newaxis]
+
+    def cluster_points(cluster):
+        return verts[np.unique(tris[cluster])]
+
+    def cluster_concavity(cluster):
+        samples = sample(cluster)
+        return concavity(sample(cluster_points(cluster)), centroids[samples], normals[samples])
+
+    def split(cluster):
+        best = None
+        for axis in range(3):
+            values = centroids[cluster, axis]
+            for plane in np.unique(np.quantile(values, SPLIT_QUANTILES)):
+                mask = values < plane
+                if mask.all() or not mask.any():
+                    continue
+                left, right = cluster[mask], cluster[~mask]
+                cost = hull_volume(sample(cluster_points(left))) + hull_volume(sample(cluster_points(right)))
+                if best is None or cost < best[0]:
+                    best = (cost, left, right)
+        return best
+
+    def merge_clusters(clusters):
+        # Splitting along triangle centroids leaves slivers, merge neighbours back together while
+        # the merged cluster stays convex enough, cheapest added hull volume first.
+        # Pair results are cached by cluster id, so each merge only evaluates pairs with the new cluster.
+        clusters = dict(enumerate(clusters))
+        volumes = {key: hull_volume(sample(cluster_points(cluster))) for key, cluster in clusters.items()}
+        bounds = {key: (points.min(axis=0) - max_concavity, points.max(axis=0) + max_concavity)
+                  for key, points in ((key, cluster_points(cluster)) for key, cluster in clusters.items())}
+        pairs = {}
+        next_key = len(clusters)
+        while len(clusters) > 1:
+            keys = sorted(clusters)
+            for a, i in enumerate(keys):
+                for j in keys[a + 1:]:
+                    if (i, j) in pairs:
+                        continue
+                    if (bounds[i][0] > bounds[j][1]).any() or (bounds[j][0] > bounds[i][1]).any():
+                        pairs[i, j] = None
+                        continue
+                    merged = np.concatenate((clusters[i], clusters[j]))
+                    if cluster_concavity(merged) > max_concavity:
+                        pairs[i, j] = None
+                        continue
+                    volume = hull_volume(sample(cluster_points(merged)))
+                    pairs[i, j] = (volume - volumes[i] - volumes[j], merged, volume)
+            candidates = [(value[0], key) for key, value in pairs.items() if value is not None]
+            if not candidates:
+                break
+            _, (i, j) = min(candidates)
+            _, merged, volume = pairs[i, j]
+            for key in (i, j):
+                del clusters[key], volumes[key], bounds[key]
+            pairs = {key: value for key, value in pairs.items() if i not in key and j not in key}
+            clusters[next_key], volumes[next_key] = merged, volume
+            bounds[next_key] = (cluster_points(merged).min(axis=0) - max_concavity,
+                                cluster_points(merged).max(axis=0) + max_concavity)
+            next_key += 1
+        return [clusters[key] for key in sorted(clusters)]
+
+    # Max heap of clusters by concavity, the counter keeps ordering deterministic
+    counter = 0
+    clusters = [(-cluster_concavity(np.arange(len(tris))), counter, np.arange(len(tris)))]
+    final = []
+    while clusters and len(clusters) + len(final) < max_hulls:
+        score, order, cluster = heapq.heappop(clusters)
+        best = split(cluster) if -score > max_concavity else None
+        if best is None:
+            final.append((order, cluster))
+            continue
+        for part in best[1:]:
+            counter += 1
+            heapq.heappush(clusters, (-cluster_concavity(part), counter, part))
+    final.extend((order, cluster) for _, order, cluster in clusters)
+
+    clusters = merge_clusters([cluster for _, cluster in sorted(final, key=lambda item: item[0])])
+
+    # Internal faces can leave clusters that sit entirely inside another hull, largest hulls go first
+    clusters.sort(key=lambda cluster: -hull_volume(sample(cluster_points(cluster))))
+    kept_planes = []
+    hulls = []
+    for cluster in clusters:
+        points = cluster_points(cluster)
+        b_mesh = convex_hull(points)
+        if b_mesh is not None:
+            points = np.array([vert.co for vert in b_mesh.verts], dtype=np.float32)
+            b_mesh.free()
+        if any((points @ normals.T - offsets <= max_concavity).all() for normals, offsets in kept_planes):
+            continue
+        planes = hull_planes(points)
+        if planes is not None:
+            kept_planes.append(planes)
+        hulls.append(reduce_points(points, max_hull_verts))
+    return hulls
+
+
+def build_convex_meshes(obj, base_name, max_hulls=16, max_hull_verts=32, max_concavity=0.05):
+    """
+    Builds triangulated convex hull meshes for the evaluated mesh of an object
+    Args:
+        obj: Mesh object to decompose
+        base_name: Name prefix of the new meshes
+        max_hulls: Maximum number of hulls
+        max_hull_verts: Maximum number of vertices per hull
+        max_concavity: Clusters with a concavity at or below this distance are not split
+
+    Returns: List of new meshes
+    """
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    eval_obj = obj.evaluated_get(depsgraph)
+    verts, tris = mesh_triangles(eval_obj.to_mesh())
+    eval_obj.to_mesh_clear()
+    if not len(tris):
+        return []
+
+    meshes = []
+    for points in convex_decomposition(verts, tris, max_hulls, max_hull_verts, max_concavity):
+        b_mesh = convex_hull(points)
+        if b_mesh is None:
+            continue
+        bmesh.ops.triangulate(b_mesh, faces=b_mesh.faces)
+        mesh = bpy.data.meshes.new("{}_collision_convex_{}".format(base_name, len(meshes)))
+        b_mesh.to_mesh(mesh)
+        b_mesh.free()
+        meshes.append(mesh)
+    return meshes
+
+
+def make_convex_collision(obj, max_hulls=16, max_hull_verts=32, max_concavity=0.05):
+    """
+    Generates convex hull collision children for an object. Instances of the same mesh share
+    their hull meshes.
+    Args:
+        obj: Mesh object to generate collision for
+        max_hulls: Maximum number of hulls
+        max_hull_verts: Maximum number of vertices per hull
+        max_concavity: Clusters with a concavity at or below this distance are not split
+
+    Returns: List of new collision objects
+    """
+    if obj is None:
+        return []
+    base_name = utils.get_base_name(obj.name)
+    token, meshes = meshcache.lookup(obj, "convex", (max_hulls, max_hull_verts, max_concavity))
+    if meshes is None:
+        meshes = build_convex_meshes(obj, base_name, max_hulls, max_hull_verts, max_concavity)
+        meshcache.store(token, meshes)
+
+    collision_objects = []
+    for i, mesh in enumerate(meshes):
+        collision_obj = bpy.data.objects.new("{}_collision_convex_{}".format(base_name, i), mesh)
+        collision_obj["collision_convex"] = 1
+        bpy.context.collection.objects.link(collision_obj)
+        utils.parent_in_place(collision_obj, obj)
+        collision_objects.append(collision_obj)
+    return collision_objects
+
+
+def loose_parts(verts, tris):
+    """
+    Splits triangles into connected parts by label propagation over shared vertices
+    Args:
+        verts: N x 3 vertex array
+        tris: M x 3 triangle array
+
+    Returns: List of vertex index arrays, one per part
+    """
+    edges = np.vstack((tris[:, [0, 1]], tris[:, [1, 2]]))
+    labels = np.arange(len(verts))
+    while True:
+        lowest = np.minimum(labels[edges[:, 0]], labels[edges[:, 1]])
+        updated = labels.copy()
+        np.minimum.at(updated, edges[:, 0], lowest)
+        np.minimum.at(updated, edges[:, 1], lowest)
+        updated = updated[updated]
+        if (updated == labels).all():
+            break
+        labels = updated
+
+    used = np.unique(tris)
+    order = np.argsort(labels[used], kind="stable")
+    parts = np.split(used[order], np.flatnonzero(np.diff(labels[used][order])) + 1)
+    return [part for part in parts if len(part)]
+
+
+def fit_primitive(points, plane_thickness=0.01, round_tolerance=0.15):
+    """
+    Fits an oriented primitive to points using the principal axes of the point cloud.
+    Thin parts become planes, long parts with a round cross section become capsules,
+    everything else becomes an oriented box.
+    Args:
+        points: N x 3 point array
+        plane_thickness: Parts thinner than this are fitted as planes
+        round_tolerance: Accepted deviation of the cross section from a circle for capsules
+
+    Returns: Dictionary with type, matrix (4 x 4 array, columns are the primitive axes),
+             half_extents, radius and height
+    """
+    mean = points.mean(axis=0)
+    _, axes = np.linalg.eigh(np.cov((points - mean).T) if len(points) > 1 else np.eye(3))
+    # eigh sorts ascending, order axes from major to minor
+    axes = axes[:, ::-1]
+    local = (points - mean) @ axes
+    low, high = local.min(axis=0), local.max(axis=0)
+    center = mean + axes @ ((low + high) / 2.0)
+    half_extents = (high - low) / 2.0
+    local -= (low + high) / 2.0
+
+    primitive = {"type": "BOX", "half_extents": half_extents, "radius": 0.0, "height": 0.0}
+    radial = np.linalg.norm(local[:, 1:], axis=1)
+    if half_extents[2] * 2.0 <= plane_thickness:
+        # Normal along the minor axis, already local z
+        primitive["type"] = "PLANE"
+    elif half_extents[0] > 1.5 * half_extents[1] and \
+            half_extents[2] >= (1.0 - round_tolerance) * half_extents[1] and \
+            radial.max() <= (1.0 + round_tolerance) * half_extents[1]:
+        # Round cross sections stay within their extents, square ones reach out to the corners
+        primitive["type"] = "CAPSULE"
+        primitive["radius"] = float(radial.max())
+        primitive["height"] = float(half_extents[0] * 2.0)
+        # Capsule axis along local z
+        axes = axes[:, [1, 2, 0]]
+        primitive["half_extents"] = half_extents[[1, 2, 0]]
+
+    if np.linalg.det(axes) < 0:
+        axes[:, 0] = -axes[:, 0]
+    matrix = np.eye(4)
+    matrix[:3, :3] = axes
+    matrix[:3, 3] = center
+    primitive["matrix"] = matrix
+    return primitive
+
+
+def make_primitive_collision(obj, split_parts=True, plane_thickness=0.01):
+    """
+    Generates primitive collider empties for an object, or for each of its loose parts.
+    Boxes and planes are unit cubes scaled to their half extents, capsules are unscaled
+    and store their size as properties. Every collider is tagged with a sxl_collider property.
+    Args:
+        obj: Mesh object to generate colliders for
+        split_parts: Fit one primitive per loose part instead of one for the whole mesh
+        plane_thickness: Parts thinner than this are fitted as planes
+
+    Returns: List of new collider objects
+    """
+    if obj is None:
+        return []
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    eval_obj = obj.evaluated_get(depsgraph)
+    verts, tris = mesh_triangles(eval_obj.to_mesh())
+    eval_obj.to_mesh_clear()
+    if not len(tris):
+        return []
+
+    parts = loose_parts(verts, tris) if split_parts else [np.unique(tris)]
+    base_name = utils.get_base_name(obj.name)
+    colliders = []
+    for i, part in enumerate(parts):
+        primitive = fit_primitive(verts[part], plane_thickness)
+        name = "{}_collider_{}_{}".format(base_name, primitive["type"].lower(), i)
+        collider = bpy.data.objects.new(name, None)
+        collider["sxl_collider"] = primitive["type"]
+        if primitive["type"] == "CAPSULE":
+            collider.empty_display_type = 'SPHERE'
+            collider.empty_display_size = primitive["radius"]
+            collider["collider_radius"] = primitive["radius"]
+            collider["collider_height"] = primitive["height"]
+            scale = (1.0, 1.0, 1.0)
+        else:
+            collider.empty_display_type = 'CUBE'
+            collider.empty_display_size = 1
+            scale = [max(float(extent), plane_thickness / 2.0) for extent in primitive["half_extents"]]
+
+        bpy.context.collection.objects.link(collider)
+        utils.parent_in_place(collider, obj)
+        matrix = mathutils.Matrix(primitive["matrix"].tolist())
+        collider.matrix_basis = matrix @ mathutils.Matrix.Diagonal(scale).to_4x4()
+        colliders.append(collider)
+    return colliders
+
+
+def make_collision(obj, sxl):
+    """
+    Generates collision for obj with the collision settings of the scene
+    Args:
+        obj: Mesh object to generate collision for
+        sxl: Scene SXL properties
+
+    Returns: List of new collision objects
+    """
+    # Grind roots can be compact meshes, they never get collision
+    if obj is None or obj.get("grind_spline"):
+        return []
+    if sxl.collision_mode == "CONVEX":
+        return make_convex_collision(obj,
+                                     max_hulls=sxl.collision_max_hulls,
+                                     max_hull_verts=sxl.collision_max_hull_verts,
+                                     max_concavity=sxl.collision_concavity)
+    if sxl.collision_mode == "PRIMITIVE":
+        return make_primitive_collision(obj, split_parts=sxl.collision_loose_parts)
+    shape = make_collision_shape(obj)
+    return [shape] if shape is not None else []
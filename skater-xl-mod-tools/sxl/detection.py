@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Skater XL package grindable edge detection.
+"""
+# Ensure that compatibility is handled for python 2, 3
+from __future__ import division, print_function, absolute_import
+
+__author__ = "Greg Amato"
+__url__ = "https://gregamato.dev"
+__copyright__ = "Copyright 2019-2020, Greg Amato - Amatobahn"
+__credits__ = []
+__license__ = "GNU Public License"
+__maintainer__ = "Greg Amato"
+__status__ = "Development"
+
+import math
+
+import numpy as np
+
+from . import splines
+
+# A grindable edge needs one face pointing up at most this far from vertical
+UP_FACING_ANGLE = math.radians(45.0)
+
+
+def read_mesh(mesh, matrix):
+    """
+    Reads the arrays edge detection needs from a mesh in bulk, in world space
+    Args:
+        mesh: Mesh datablock, usually evaluated
+        matrix: World matrix of the object
+
+    Returns: Dictionary of numpy arrays: co, edges, loop_edges, loop_totals, normals, centers
+    """
+    # Reads into the native 32 bit types are the fast path of foreach_get
+    def read(collection, attribute, dtype, width=1):
+        buffer = np.empty(len(collection) * width, dtype=dtype)
+        collection.foreach_get(attribute, buffer)
+        return buffer.reshape(-1, width) if width > 1 else buffer
+
+    matrix = np.array(matrix, dtype=np.float64)
+    rotation, translation = matrix[:3, :3], matrix[:3, 3]
+    normal_matrix = np.linalg.inv(rotation).T
+
+    normals = read(mesh.polygons, "normal", np.float32, 3) @ normal_matrix.T
+    normals /= np.maximum(np.linalg.norm(normals, axis=1), 1e-12)[:, None]
+    return {
+        "co": read(mesh.vertices, "co", np.float32, 3) @ rotation.T + translation,
+        "edges": read(mesh.edges, "vertices", np.int32, 2),
+        "loop_edges": read(mesh.loops, "edge_index", np.int32),
+        "loop_totals": read(mesh.polygons, "loop_total", np.int32),
+        "normals": normals,
+        "centers": read(mesh.polygons, "center", np.float32, 3) @ rotation.T + translation,
+    }
+
+
+def edge_faces(loop_edges, loop_totals, edge_count):
+    """
+    Finds the two faces of every manifold edge
+    Args:
+        loop_edges: Edge index of each loop
+        loop_totals: Loop count of each polygon
+        edge_count: Number of edges in the mesh
+
+    Returns: Tuple of (manifold edge indices, (M, 2) array of their face indices)
+    """
+    loop_faces = np.repeat(np.arange(len(loop_totals)), loop_totals)
+    order = np.argsort(loop_edges, kind="stable")
+    sorted_edges = loop_edges[order]
+    counts = np.bincount(loop_edges, minlength=edge_count)
+    manifold = np.flatnonzero(counts == 2)
+
+    # Loops of manifold edges sit in adjacent pairs once sorted by edge
+    starts = np.searchsorted(sorted_edges, manifold)
+    faces = np.column_stack((loop_faces[order[starts]], loop_faces[order[starts + 1]]))
+    return manifold, faces
+
+
+def find_grind_edges(data, min_angle, min_height, up_angle=UP_FACING_ANGLE):
+    """
+    Finds convex, up-facing edges sharp enough to grind on, fully vectorized
+    Args:
+        data: Arrays from read_mesh
+        min_angle: Minimum angle between the normals of the two faces of an edge, in radians
+        min_height: Minimum height of the edge above the lowest point of the mesh
+        up_angle: Maximum angle from vertical of the upper face
+
+    Returns: (K, 2) array of vertex index pairs of grindable edges
+    """
+    edges = data["edges"]
+    if not len(edges) or not len(data["loop_totals"]):
+        return np.empty((0, 2), dtype=np.int32)
+    manifold, faces = edge_faces(data["loop_edges"], data["loop_totals"], len(edges))
+    n0, n1 = data["normals"][faces[:, 0]], data["normals"][faces[:, 1]]
+    c0, c1 = data["centers"][faces[:, 0]], data["centers"][faces[:, 1]]
+
+    # Dihedral angle between the two faces
+    sharp = np.einsum("ij,ij->i", n0, n1) <= math.cos(min_angle)
+    # Convex when each face center lies below the plane of the other face
+    convex = (np.einsum("ij,ij->i", n0, c1 - c0) < 0.0) & (np.einsum("ij,ij->i", n1, c0 - c1) < 0.0)
+    # Something to land on, one of the faces points up
+    up = np.maximum(n0[:, 2], n1[:, 2]) >= math.cos(up_angle)
+
+    co = data["co"]
+    verts = edges[manifold]
+    height = np.minimum(co[verts[:, 0], 2], co[verts[:, 1], 2]) - co[:, 2].min()
+    high = height >= min_height
+
+    return verts[sharp & convex & up & high]
+
+
+def grind_chains(data, edges, min_length):
+    """
+    Chains grindable edges and drops chains shorter than min_length
+    Args:
+        data: Arrays from read_mesh
+        edges: Vertex index pairs from find_grind_edges
+        min_length: Minimum length of a chain
+
+    Returns: List of (N, 3) arrays of ordered world space positions
+    """
+    chains = []
+    for chain in splines.split_edge_chains(map(tuple, edges.tolist())):
+        points = data["co"][chain]
+        if splines.arc_lengths(points)[-1] >= min_length:
+            chains.append(points)
+    return chains
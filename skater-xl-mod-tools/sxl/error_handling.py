@@ -26,6 +26,10 @@ class SXLModeError(SXLException):
     pass
 
 
+class SXLWorkerError(SXLException):
+    pass
+
+
 def sxl_exception(func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
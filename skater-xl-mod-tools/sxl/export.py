@@ -0,0 +1,476 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Skater XL package fbx export.
+"""
+# Ensure that compatibility is handled for python 2, 3
+from __future__ import division, print_function, absolute_import
+
+__author__ = "Greg Amato"
+__url__ = "https://gregamato.dev"
+__copyright__ = "Copyright 2019-2020, Greg Amato - Amatobahn"
+__credits__ = []
+__license__ = "GNU Public License"
+__maintainer__ = "Greg Amato"
+__status__ = "Development"
+
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+
+import bpy
+import numpy as np
+
+from . import batch, batching, grinds, hashing, lods, utils
+
+MANIFEST_SUFFIX = "_manifest.json"
+TILE_INDEX_SUFFIX = "_tiles.json"
+CACHE_FILE = ".sxl_export_cache.json"
+
+
+def write_fbx(filepath, use_selection):
+    """
+    Writes an fbx with the Skater XL export settings
+    Args:
+        filepath: Output .fbx path
+        use_selection: Only write selected objects
+    """
+    bpy.ops.export_scene.fbx(filepath=filepath,
+                             check_existing=True,
+                             use_selection=use_selection,
+                             object_types=utils.EXPORT_TYPES,
+                             use_custom_props=True,
+                             use_tspace=True)
+
+
+def get_cache_path(filepath):
+    return os.path.join(os.path.dirname(os.path.abspath(filepath)), CACHE_FILE)
+
+
+def load_cache(filepath):
+    """
+    Loads the export cache that sits next to an export file
+    Args:
+        filepath: Export file path
+
+    Returns: Dictionary of file name => content hash
+    """
+    try:
+        with open(get_cache_path(filepath)) as cache_file:
+            cache = json.load(cache_file)
+    except (IOError, OSError, ValueError):
+        return {}
+    if cache.get("version") != hashing.HASH_VERSION:
+        return {}
+    return cache.get("files", {})
+
+
+def save_cache(filepath, files):
+    with open(get_cache_path(filepath), "w") as cache_file:
+        json.dump({"version": hashing.HASH_VERSION, "files": files}, cache_file, indent=2, sort_keys=True)
+
+
+def clear_cache(filepath):
+    """
+    Removes the export cache next to an export file, so the next export writes every asset
+    Args:
+        filepath: Export file path
+
+    Returns: True if a cache was removed
+    """
+    path = get_cache_path(filepath)
+    if os.path.exists(path):
+        os.remove(path)
+        return True
+    return False
+
+
+def is_cached(cache, filepath, digest):
+    """
+    Checks whether an export file is already written with the given content hash
+    Args:
+        cache: Dictionary from load_cache
+        filepath: Export file path
+        digest: Content hash of what would be written
+
+    Returns: True if the export can be skipped
+    """
+    return cache.get(os.path.basename(filepath)) == digest and os.path.exists(filepath)
+
+
+def write_objects(context, objects, filepath):
+    """
+    Writes exactly the given objects to an fbx, restoring the selection afterwards
+    Args:
+        context: Blender context
+        objects: Objects to write
+        filepath: Output .fbx path
+    """
+    selected = [o for o in context.view_layer.objects if o.select_get()]
+    for o in selected:
+        o.select_set(False)
+    for o in objects:
+        o.select_set(True)
+    try:
+        write_fbx(filepath, True)
+    finally:
+        for o in objects:
+            o.select_set(False)
+        for o in selected:
+            o.select_set(True)
+
+
+def export_single(context, filepath, selected_only, incremental=False, batch_cell_size=0.0):
+    """
+    Exports everything to a single fbx, skipping the write when its content hash is cached
+    Args:
+        context: Blender context
+        filepath: Output .fbx path
+        selected_only: Only export selected objects and their descendants
+        incremental: Skip the export when the content hash matches the export cache
+        batch_cell_size: Merge static props into batches of this cell size, see batching.batched.
+                         0 writes every object as is.
+
+    Returns: File dictionary with file, objects, batched, size, cached, prepare_seconds and seconds
+    """
+    start = time.perf_counter()
+    objects = utils.get_export_objects(context, selected_only)
+    result = {"file": filepath, "objects": len(objects), "batched": 0, "cached": False, "seconds": 0.0}
+    if incremental:
+        cache = load_cache(filepath)
+        digest = hashing.hash_objects(objects, ("SINGLE", batch_cell_size) if batch_cell_size > 0 else "SINGLE")
+        if is_cached(cache, filepath, digest):
+            result["cached"] = True
+    if selected_only and not result["cached"]:
+        for obj in objects:
+            obj.select_set(True)
+    prepared = time.perf_counter()
+    result["prepare_seconds"] = prepared - start
+
+    if not result["cached"]:
+        # The single file holds every spline, so all compact splines are expanded while it is written
+        with lods.evaluated_live_lods(objects), grinds.expanded_grinds(objects) as (expanded, splines), \
+                batching.batched(expanded, batch_cell_size) as (batched, merged):
+            if merged or splines:
+                write_objects(context, batched, filepath)
+            else:
+                write_fbx(filepath, selected_only)
+        result["batched"] = merged
+        if incremental:
+            cache[os.path.basename(filepath)] = digest
+            save_cache(filepath, cache)
+        result["seconds"] = time.perf_counter() - prepared
+    result["size"] = os.path.getsize(filepath)
+    return result
+
+
+def get_grind_roots(objects):
+    """
+    Indexes grind spline roots by the name of the object they were generated from
+    Args:
+        objects: Objects to search
+
+    Returns: Dictionary of owner name => list of grind roots
+    """
+    roots = {}
+    for o in objects:
+        if o.get("grind_spline") and o.get("grind_parent"):
+            roots.setdefault(o["grind_parent"], []).append(o)
+    return roots
+
+
+def get_world_bounds(objects):
+    """
+    Computes the world space bounds of objects from their bounding boxes
+    Args:
+        objects: Objects to measure, empties count as their location
+
+    Returns: Tuple of (min, max) lists, or None without objects
+    """
+    corners = []
+    for o in objects:
+        matrix = np.array(o.matrix_world)
+        box = np.array(o.bound_box) if o.type == 'MESH' else np.zeros((1, 3))
+        corners.append(box @ matrix[:3, :3].T + matrix[:3, 3])
+    if not corners:
+        return None
+    corners = np.concatenate(corners)
+    return corners.min(axis=0).tolist(), corners.max(axis=0).tolist()
+
+
+def get_tile(objects, tile_size):
+    """
+    Finds the grid cell a group falls in, from the center of its bounds on the ground plane
+    Args:
+        objects: Objects of the group
+        tile_size: Size of the square tiles, in scene units
+
+    Returns: Tuple of (x, y) cell coordinates
+    """
+    low, high = get_world_bounds(objects)
+    return tuple(int(math.floor((low[axis] + high[axis]) / 2.0 / tile_size)) for axis in (0, 1))
+
+
+def get_tile_name(tile):
+    """Names a tile by its cell, negative coordinates are written with an n, ie tile_n1_3"""
+    return "tile_{}_{}".format(*("n{}".format(-c) if c < 0 else c for c in tile))
+
+
+def get_export_groups(context, mode, selected_only, tile_size=64.0):
+    """
+    Splits the export objects into one group per output file.
+    Each group holds its top-level objects, their LOD and collision children and their grind roots.
+    Args:
+        context: Blender context
+        mode: "OBJECT" for one group per top-level object, "COLLECTION" for one per collection,
+              "TILES" for one per grid cell
+        selected_only: Only group selected objects and their descendants
+        tile_size: Size of the grid cells in "TILES" mode, in scene units
+
+    Returns: List of (group name, list of objects) pairs
+    """
+    objects = utils.get_export_objects(context, selected_only)
+    exported = set(objects)
+    hierarchy = utils.build_hierarchy(context.scene.objects)
+    grind_roots = get_grind_roots(context.scene.objects)
+    grind_root_set = set(o for roots in grind_roots.values() for o in roots)
+
+    # Grind roots travel with their owner, finalized ones are gathered under a "Grinds" empty
+    tops = [o for o in objects
+            if (o.parent is None or o.parent not in exported)
+            and o not in grind_root_set and o.name != "Grinds"]
+
+    def collect(top):
+        group = [top] + utils.get_children(top, hierarchy=hierarchy)
+        collected = set(group)
+        for o in list(group):
+            for root in grind_roots.get(o.name, []):
+                if root not in collected:
+                    spline = [root] + utils.get_children(root, hierarchy=hierarchy)
+                    collected.update(spline)
+                    group.extend(spline)
+        return group
+
+    if mode == "COLLECTION":
+        grouped = {}
+        for top in tops:
+            collection = top.users_collection[0] if top.users_collection else context.scene.collection
+            name = context.scene.name if collection == context.scene.collection else collection.name
+            grouped.setdefault(name, []).extend(collect(top))
+        return list(grouped.items())
+
+    if mode == "TILES":
+        # Each top-level object stays whole, in the tile its own bounds center falls in
+        grouped = {}
+        for top in tops:
+            group = collect(top)
+            grouped.setdefault(get_tile(group, tile_size), []).extend(group)
+        return [(get_tile_name(tile), group) for tile, group in sorted(grouped.items())]
+
+    return [(utils.get_base_name(top.name), collect(top)) for top in tops]
+
+
+def get_group_path(filepath, name):
+    """
+    Builds the output path for a group, next to and prefixed by the chosen export file
+    Args:
+        filepath: Export file chosen by the user
+        name: Group name
+
+    Returns: Output .fbx path
+    """
+    stem = os.path.splitext(filepath)[0]
+    return "{}_{}.fbx".format(stem, bpy.path.clean_name(name))
+
+
+def export_groups(groups, batch_cell_size=0.0, free_live_lods=False):
+    """
+    Writes each group to its own fbx in this process, one at a time, restoring the selection
+    and active object afterwards
+    Args:
+        groups: List of (filepath, list of object names) pairs
+        batch_cell_size: Merge the static props of each group into batches, see batching.batched
+        free_live_lods: Remove the evaluated live LODs of each group once it is written instead
+            of keeping them in the mesh cache, see lods.evaluated_live_lods
+
+    Returns: List of file dictionaries with file, objects, size and seconds
+    """
+    objects = bpy.data.objects
+    view_layer = bpy.context.view_layer
+    active = view_layer.objects.active
+    selected = [o for o in view_layer.objects if o.select_get()]
+    for o in selected:
+        o.select_set(False)
+    files = []
+    try:
+        for filepath, names in groups:
+            start = time.perf_counter()
+            members = [objects[name] for name in names]
+            # Evaluated LODs, expanded splines and batches of a group are removed before the next group is built
+            with lods.evaluated_live_lods(members, cached=not free_live_lods), \
+                    grinds.expanded_grinds(members) as (expanded, splines), \
+                    batching.batched(expanded, batch_cell_size) as (group, merged):
+                for o in group:
+                    o.select_set(True)
+                try:
+                    write_fbx(filepath, True)
+                finally:
+                    for o in group:
+                        o.select_set(False)
+            files.append({
+                "file": filepath,
+                "objects": len(names),
+                "size": os.path.getsize(filepath),
+                "seconds": time.perf_counter() - start,
+            })
+    finally:
+        for o in selected:
+            o.select_set(True)
+        view_layer.objects.active = active
+    return files
+
+
+def write_groups(groups, workers=1, progress=None, batch_cell_size=0.0, free_live_lods=False):
+    """
+    Writes export groups in this process, or from a temporary copy of the current file
+    opened by a pool of background blender processes
+    Args:
+        groups: List of (filepath, list of object names) pairs
+        workers: Number of background blender processes, 1 or less writes in process
+        progress: Optional callable receiving (done, total) as files complete
+        batch_cell_size: Merge the static props of each group into batches, see batching.batched
+        free_live_lods: Remove the evaluated live LODs of each group once it is written, see export_groups
+
+    Returns: List of file dictionaries with file, objects, size and seconds
+    """
+    if workers <= 1 or len(groups) < 2:
+        files = export_groups(groups, batch_cell_size, free_live_lods)
+        if progress is not None:
+            progress(len(groups), len(groups))
+        return files
+
+    temp_dir = tempfile.mkdtemp(prefix="sxl_export_")
+    try:
+        blend = os.path.join(temp_dir, "scene.blend")
+        bpy.ops.wm.save_as_mainfile(filepath=blend, copy=True)
+        jobs = [{"task": "export", "blend": blend, "groups": groups[w::workers], "batch_cell_size": batch_cell_size,
+                 "free_live_lods": free_live_lods}
+                for w in range(min(workers, len(groups)))]
+        done = [0]
+
+        def job_done(job):
+            done[0] += len(job["groups"])
+            if progress is not None:
+                progress(done[0], len(groups))
+
+        files = []
+        for result in batch.run_workers(jobs, workers, temp_dir, callback=job_done):
+            files.extend(result["files"])
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return files
+
+
+def write_tile_index(filepath, tiles, tile_size):
+    """
+    Writes the index of a tiled export, so a map can be loaded progressively
+    Args:
+        filepath: Export file chosen by the user, the index is named after it
+        tiles: List of (group name, output path, list of objects) triples
+        tile_size: Size of the grid cells, in scene units
+
+    Returns: Index file path
+    """
+    index = {"tile_size": tile_size, "tiles": []}
+    for name, path, objects in tiles:
+        low, high = get_world_bounds(objects)
+        index["tiles"].append({
+            "name": name,
+            "file": os.path.basename(path),
+            "cell": [-int(c[1:]) if c.startswith("n") else int(c) for c in name.split("_")[1:]],
+            "bounds": {"min": low, "max": high},
+            "objects": len(objects),
+        })
+    index_path = os.path.splitext(filepath)[0] + TILE_INDEX_SUFFIX
+    with open(index_path, "w") as index_file:
+        json.dump(index, index_file, indent=2)
+    return index_path
+
+
+def export_split(context, filepath, mode, selected_only, workers=1, progress=None, incremental=False,
+                 tile_size=64.0, batch_cell_size=0.0, parallel_tiles=False):
+    """
+    Exports one fbx per top-level object, per collection or per grid tile and writes a manifest
+    of the files. Tiled exports also write a tile index with the bounds of every tile.
+    With several workers the current file is saved to a temporary copy that a pool of
+    background blender processes opens and writes the groups from concurrently.
+    Evaluated live LODs, static batches and expanded grind splines only exist while their group
+    is written. Tiles are written one at a time in this process unless parallel_tiles is set,
+    since every worker holds the whole file, and their evaluated live LODs are not cached.
+    Args:
+        context: Blender context
+        filepath: Export file chosen by the user, output files are named after it
+        mode: "OBJECT", "COLLECTION" or "TILES", see get_export_groups
+        selected_only: Only export selected objects and their descendants
+        workers: Number of background blender processes, 1 or less writes in process
+        progress: Optional callable receiving (done, total) as files complete
+        incremental: Skip groups whose content hash matches the export cache
+        tile_size: Size of the grid cells in "TILES" mode, in scene units
+        batch_cell_size: Merge the static props of each group into batches, see batching.batched
+        parallel_tiles: Write tiles with the worker pool as well
+
+    Returns: Manifest dictionary
+    """
+    start = time.perf_counter()
+    cache = load_cache(filepath) if incremental else {}
+    groups = []
+    cached = []
+    hashes = {}
+    tiles = []
+    settings = mode if batch_cell_size <= 0 else (mode, batch_cell_size)
+    for name, objects in get_export_groups(context, mode, selected_only, tile_size):
+        path = get_group_path(filepath, name)
+        tiles.append((name, path, objects))
+        if incremental:
+            hashes[os.path.basename(path)] = digest = hashing.hash_objects(objects, settings)
+            if is_cached(cache, path, digest):
+                cached.append({
+                    "file": path,
+                    "objects": len(objects),
+                    "size": os.path.getsize(path),
+                    "seconds": 0.0,
+                    "cached": True,
+                })
+                continue
+        groups.append((path, [o.name for o in objects]))
+    prepared = time.perf_counter()
+
+    tiled = mode == "TILES"
+    if tiled and not parallel_tiles:
+        workers = 1
+    files = write_groups(groups, workers, progress, batch_cell_size, free_live_lods=tiled)
+
+    if incremental:
+        cache.update(hashes)
+        save_cache(filepath, cache)
+    files = sorted(files + cached, key=lambda f: f["file"])
+
+    manifest = {
+        "source": bpy.data.filepath,
+        "mode": mode,
+        "workers": workers,
+        "cache": {"hits": len(cached), "misses": len(groups)},
+        "prepare_seconds": prepared - start,
+        "total_seconds": time.perf_counter() - start,
+        "total_size": sum(f["size"] for f in files),
+        "files": files,
+    }
+    if tiled:
+        manifest["tile_index"] = write_tile_index(filepath, tiles, tile_size)
+    with open(os.path.splitext(filepath)[0] + MANIFEST_SUFFIX, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    return manifest
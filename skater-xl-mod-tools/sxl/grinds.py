@@ -0,0 +1,570 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Skater XL package grind spline registry.
+
+Every grind root is recorded with the mesh it was generated from in scene.SXL.grinds,
+so finalizing and resetting splines never has to scan the scene.
+"""
+# Ensure that compatibility is handled for python 2, 3
+from __future__ import division, print_function, absolute_import
+
+__author__ = "Greg Amato"
+__url__ = "https://gregamato.dev"
+__copyright__ = "Copyright 2019-2020, Greg Amato - Amatobahn"
+__credits__ = []
+__license__ = "GNU Public License"
+__maintainer__ = "Greg Amato"
+__status__ = "Development"
+
+import contextlib
+import os
+import re
+
+import bpy
+import numpy as np
+
+from . import splines, utils
+
+GRINDS_NODE = "Grinds"
+# Compact grind roots are vertex-only meshes holding their points, expanded at export
+COMPACT_PROPERTY = "grind_compact"
+POINT_PREFIX_PROPERTY = "grind_point_prefix"
+# Points are named GrindPoint_<spline>_<index>, see new_spline_number
+POINT_PREFIX = "GrindPoint_{:04d}_"
+
+
+def is_grind_root(obj):
+    return obj.get("grind_spline") == 1 and (obj.type == "EMPTY" or is_compact(obj))
+
+
+def is_compact(obj):
+    return obj.type == "MESH" and obj.get(COMPACT_PROPERTY) == 1
+
+
+def register_grind(scene, root, owner):
+    """
+    Records a grind root and the mesh it belongs to
+    Args:
+        scene: Scene holding the registry
+        root: Grind root empty
+        owner: Object the spline was generated from
+    """
+    entry = scene.SXL.grinds.add()
+    entry.root = root
+    entry.owner = owner
+
+
+def rebuild_registry(scene):
+    """
+    Rebuilds the registry from the grind roots in the scene.
+    Owners already recorded are kept, so renamed meshes stay matched to their splines.
+    Args:
+        scene: Scene to rebuild the registry for
+
+    Returns: Number of registered grind roots
+    """
+    grinds = scene.SXL.grinds
+    owners = {entry.root: entry.owner for entry in grinds if entry.root is not None and entry.owner is not None}
+    grinds.clear()
+    for obj in scene.objects:
+        if is_grind_root(obj):
+            owner = owners.get(obj) or bpy.data.objects.get(obj.get("grind_parent", ""))
+            if owner is not None:
+                obj["grind_parent"] = owner.name
+            register_grind(scene, obj, owner)
+    return len(grinds)
+
+
+def validate_registry(scene):
+    """
+    Checks that the registry matches the grind roots in the scene
+    Args:
+        scene: Scene to validate
+
+    Returns: List of problem descriptions, empty if the registry is valid
+    """
+    problems = []
+    registered = set()
+    for i, entry in enumerate(scene.SXL.grinds):
+        if entry.root is None:
+            problems.append("Entry {} has no grind root".format(i))
+            continue
+        if entry.root in registered:
+            problems.append("{} is registered twice".format(entry.root.name))
+        registered.add(entry.root)
+        if entry.owner is None:
+            problems.append("{} has no owner".format(entry.root.name))
+        elif entry.root.get("grind_parent") != entry.owner.name:
+            problems.append("{} owner was renamed to {}".format(entry.root.name, entry.owner.name))
+    for obj in scene.objects:
+        if is_grind_root(obj):
+            if obj not in registered:
+                problems.append("{} is not registered".format(obj.name))
+            registered.discard(obj)
+    for root in registered:
+        problems.append("{} is no longer in the scene".format(root.name))
+    return problems
+
+
+def get_grinds(scene):
+    """
+    Gets the registered (root, owner) pairs, rebuilding the registry for files made before it existed
+    Args:
+        scene: Scene holding the registry
+
+    Returns: List of (grind root, owner) pairs
+    """
+    if not len(scene.SXL.grinds):
+        rebuild_registry(scene)
+    return [(entry.root, entry.owner) for entry in scene.SXL.grinds if entry.root is not None]
+
+
+def finalize_grinds(scene, collection):
+    """
+    Moves every grind root under the Grinds node, keeping world transforms
+    Args:
+        scene: Scene holding the registry
+        collection: Collection to create the Grinds node in when missing
+
+    Returns: Number of moved grind roots
+    """
+    grinds_pt = bpy.data.objects.get(GRINDS_NODE)
+    if grinds_pt is None:
+        grinds_pt = bpy.data.objects.new(GRINDS_NODE, None)
+        collection.objects.link(grinds_pt)
+
+    moved = 0
+    for root, owner in get_grinds(scene):
+        if root.parent != grinds_pt:
+            utils.parent_keep_transform(root, grinds_pt)
+            moved += 1
+    return moved
+
+
+def reset_grinds(scene):
+    """
+    Moves every grind root back under the mesh it was generated from, keeping world transforms
+    Args:
+        scene: Scene holding the registry
+
+    Returns: Number of moved grind roots
+    """
+    moved = 0
+    for root, owner in get_grinds(scene):
+        if owner is not None and root.parent != owner:
+            utils.parent_keep_transform(root, owner)
+            moved += 1
+    return moved
+
+
+def sync_counter(scene):
+    """
+    Moves the scene counter past every spline number already used by an object name or a
+    compact root, ie by splines appended from other files. Scans the objects once, so call it
+    once per operation rather than per spline.
+    Args:
+        scene: Scene holding the counter
+
+    Returns: Current counter value
+    """
+    pattern = re.compile(r"GrindPoint_(\d+)_")
+    used = [scene.SXL.grind_counter]
+    for obj in bpy.data.objects:
+        match = pattern.match(obj.get(POINT_PREFIX_PROPERTY) or obj.name)
+        if match:
+            used.append(int(match.group(1)))
+    scene.SXL.grind_counter = max(used)
+    return scene.SXL.grind_counter
+
+
+def new_spline_number(scene=None):
+    """
+    Takes the next grind spline number from the scene counter. Names built from it are unique
+    from the start, so blender never has to resolve a .001 suffix against existing objects.
+    Args:
+        scene: Scene holding the counter, defaults to the current scene
+
+    Returns: Spline number
+    """
+    sxl = (scene or bpy.context.scene).SXL
+    sxl.grind_counter += 1
+    return sxl.grind_counter
+
+
+def new_point_prefix(scene=None):
+    return POINT_PREFIX.format(new_spline_number(scene))
+
+
+def get_point_name(prefix, index):
+    return "{}{:04d}".format(prefix, index)
+
+
+def new_compact_root(name, co, collection, point_prefix=None):
+    """
+    Creates a compact grind root: a vertex-only mesh with a vertex per point and edges between
+    consecutive points, so the spline is a single object that can be edited in the viewport
+    Args:
+        name: Name of the grind root
+        co: Ordered point positions, local to the root
+        collection: Collection to link the root to
+        point_prefix: Name prefix of the expanded points, a new one is generated when not given
+
+    Returns: New grind root object
+    """
+    co = np.asarray(co, dtype=np.float32).reshape(-1, 3)
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(co))
+    mesh.vertices.foreach_set("co", co.ravel())
+    mesh.edges.add(max(len(co) - 1, 0))
+    # Edges (0, 1), (1, 2), ... keep the point order visible and editable
+    mesh.edges.foreach_set("vertices", np.repeat(np.arange(len(co), dtype=np.int32), 2)[1:-1])
+    mesh.update()
+
+    root = bpy.data.objects.new(name, mesh)
+    root["grind_spline"] = 1
+    root[COMPACT_PROPERTY] = 1
+    root[POINT_PREFIX_PROPERTY] = point_prefix or new_point_prefix()
+    collection.objects.link(root)
+    return root
+
+
+def build_compact_spline(name, owner, points, location, collection=None, point_prefix=None):
+    """
+    Creates a compact grind root for an ordered chain, placed like the empty based roots
+    Args:
+        name: Name of the grind root
+        owner: Object the spline was generated from, the root is parented to it
+        points: Ordered world space positions of the spline
+        location: World space location of the root
+        collection: Collection to link the root to, defaults to the active collection
+        point_prefix: Name prefix of the expanded points, a new one is generated when not given
+
+    Returns: New grind root object
+    """
+    co = np.asarray(points, dtype=np.float32).reshape(-1, 3) - np.asarray(location, dtype=np.float32)
+    root = new_compact_root(name, co, collection or bpy.context.collection, point_prefix)
+    root["grind_parent"] = owner.name
+    root.location = location
+    root.parent = owner
+    root.matrix_parent_inverse = owner.matrix_world.inverted()
+    return root
+
+
+def get_point_order(points):
+    """
+    Sorts point empties by the index their names end with
+    Args:
+        points: Point empties of one spline, named prefix + index
+
+    Returns: Sorted list of points
+    """
+    if len(points) < 2:
+        return list(points)
+    prefix = os.path.commonprefix([point.name for point in points])
+    try:
+        return sorted(points, key=lambda point: int(point.name[len(prefix):] or 0))
+    except ValueError:
+        return sorted(points, key=lambda point: point.name)
+
+
+def compact_grinds(scene):
+    """
+    Replaces every empty based grind spline with a compact grind root, keeping its name,
+    transform, parent and registry entry
+    Args:
+        scene: Scene holding the registry
+
+    Returns: Number of compacted splines
+    """
+    get_grinds(scene)
+    sync_counter(scene)
+    hierarchy = utils.build_hierarchy(scene.objects)
+    compacted = 0
+    for entry in scene.SXL.grinds:
+        root = entry.root
+        if root is None or root.type != "EMPTY":
+            continue
+        points = get_point_order(hierarchy.get(root, []))
+        inverse = root.matrix_world.inverted()
+        co = [inverse @ point.matrix_world.translation for point in points]
+
+        name = root.name
+        root.name = "{}_expanded".format(name)
+        collection = root.users_collection[0] if root.users_collection else scene.collection
+        # Expanding the compact root names its points like the empties it replaces
+        compact = new_compact_root(name, co, collection, get_point_prefix(root, points))
+        for key in root.keys():
+            compact[key] = root[key]
+        compact.parent = root.parent
+        compact.matrix_parent_inverse = root.matrix_parent_inverse.copy()
+        compact.matrix_basis = root.matrix_basis.copy()
+        entry.root = compact
+
+        for point in points:
+            bpy.data.objects.remove(point)
+        bpy.data.objects.remove(root)
+        compacted += 1
+    return compacted
+
+
+def expand_spline(root, name):
+    """
+    Creates the empty hierarchy the game expects from a compact grind root:
+    a root empty and a GrindPoint empty per vertex
+    Args:
+        root: Compact grind root
+        name: Name of the root empty
+
+    Returns: List of new objects, the root empty first
+    """
+    expanded = bpy.data.objects.new(name, None)
+    for key in root.keys():
+        if key not in {COMPACT_PROPERTY, POINT_PREFIX_PROPERTY}:
+            expanded[key] = root[key]
+    expanded.empty_display_size = 1
+    expanded.empty_display_type = 'PLAIN_AXES'
+    expanded.parent = root.parent
+    expanded.matrix_parent_inverse = root.matrix_parent_inverse.copy()
+    expanded.matrix_basis = root.matrix_basis.copy()
+
+    co = np.empty(len(root.data.vertices) * 3, dtype=np.float32)
+    root.data.vertices.foreach_get("co", co)
+    prefix = root.get(POINT_PREFIX_PROPERTY) or new_point_prefix()
+    objects = [expanded]
+    for i, location in enumerate(co.reshape(-1, 3)):
+        point = bpy.data.objects.new(get_point_name(prefix, i), None)
+        point.empty_display_size = 1
+        point.empty_display_type = 'PLAIN_AXES'
+        point.location = location
+        point.parent = expanded
+        objects.append(point)
+
+    collection = root.users_collection[0] if root.users_collection else bpy.context.scene.collection
+    for obj in objects:
+        collection.objects.link(obj)
+    return objects
+
+
+@contextlib.contextmanager
+def expanded_grinds(objects):
+    """
+    Temporarily expands the compact grind roots among objects. Exports call this per written
+    file, so only the splines of that file are expanded at any time.
+    Args:
+        objects: Objects about to be exported
+
+    Yields: Tuple of (objects to export instead, number of expanded splines)
+    """
+    compact = [obj for obj in objects if is_compact(obj) and obj.get("grind_spline") == 1]
+    if not compact:
+        yield objects, 0
+        return
+
+    renamed = []
+    created = []
+    replaced = {}
+    try:
+        for root in compact:
+            # The expanded root takes the name, the compact root steps aside while exporting
+            name = root.name
+            root.name = "{}_compact".format(name)
+            renamed.append((root, name))
+            replaced[root] = expand_spline(root, name)
+            created.extend(replaced[root])
+        yield [o for obj in objects for o in replaced.get(obj, [obj])], len(compact)
+    finally:
+        for obj in created:
+            bpy.data.objects.remove(obj)
+        for root, name in renamed:
+            root.name = name
+
+
+def get_spline_points(root, hierarchy=None):
+    """
+    Reads the ordered world space points of a grind spline
+    Args:
+        root: Grind root, empty based or compact
+        hierarchy: Index from utils.build_hierarchy. Pass one in when reading many splines,
+                   root.children scans every object in the file.
+
+    Returns: Array of shape (points, 3)
+    """
+    matrix = np.array(root.matrix_world, dtype=np.float64)
+    if is_compact(root):
+        co = np.empty(len(root.data.vertices) * 3, dtype=np.float32)
+        root.data.vertices.foreach_get("co", co)
+        return co.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+    points = get_point_order(hierarchy.get(root, []) if hierarchy is not None else list(root.children))
+    return np.array([point.matrix_world.translation[:] for point in points], dtype=np.float64).reshape(-1, 3)
+
+
+def get_point_prefix(root, points):
+    """
+    Finds the name prefix of the points of a grind spline
+    Args:
+        root: Grind root
+        points: Point empties of root, ordered
+
+    Returns: Prefix, or None when it cannot be told from the point names
+    """
+    if root.get(POINT_PREFIX_PROPERTY):
+        return root[POINT_PREFIX_PROPERTY]
+    if not points:
+        return None
+    match = re.match(r"GrindPoint_\d+_", points[0].name)
+    if match:
+        return match.group(0)
+    # Names from before the scene counter end with an unpadded index, the first one is 0
+    prefix = points[0].name.rstrip("0123456789")
+    return prefix if prefix.startswith("GrindPoint_") and len(prefix) > len("GrindPoint_") else None
+
+
+def set_spline_points(root, points, hierarchy=None, point_prefix=None):
+    """
+    Replaces the points of a grind spline, keeping the root and the name prefix of its points
+    Args:
+        root: Grind root, empty based or compact
+        points: Ordered world space positions
+        hierarchy: Index from utils.build_hierarchy, updated with the new points
+        point_prefix: Name prefix of empty based points, defaults to the prefix of the old points
+    """
+    inverse = np.array(root.matrix_world.inverted(), dtype=np.float64)
+    co = np.asarray(points, dtype=np.float64).reshape(-1, 3) @ inverse[:3, :3].T + inverse[:3, 3]
+    if is_compact(root):
+        mesh = root.data
+        mesh.clear_geometry()
+        mesh.vertices.add(len(co))
+        mesh.vertices.foreach_set("co", co.astype(np.float32).ravel())
+        mesh.edges.add(max(len(co) - 1, 0))
+        mesh.edges.foreach_set("vertices", np.repeat(np.arange(len(co), dtype=np.int32), 2)[1:-1])
+        mesh.update()
+        return
+
+    old_points = get_point_order(hierarchy.get(root, []) if hierarchy is not None else list(root.children))
+    prefix = point_prefix or get_point_prefix(root, old_points) or new_point_prefix()
+    collection = root.users_collection[0] if root.users_collection else bpy.context.scene.collection
+    # Removed first, so the new points take the same names
+    bpy.data.batch_remove(old_points)
+    new_points = []
+    for i, location in enumerate(co):
+        point = bpy.data.objects.new(get_point_name(prefix, i), None)
+        point.empty_display_size = 1
+        point.empty_display_type = 'PLAIN_AXES'
+        point.location = location
+        point.parent = root
+        collection.objects.link(point)
+        new_points.append(point)
+    if hierarchy is not None:
+        hierarchy[root] = new_points
+
+
+def copy_spline(root, points, name, point_prefix=None):
+    """
+    Creates a grind spline with the owner, parent, transform and properties of root
+    Args:
+        root: Grind root to copy
+        points: Ordered world space positions of the new spline
+        name: Name of the new root
+        point_prefix: Name prefix of the new points, a new one is generated when not given
+
+    Returns: New grind root
+    """
+    point_prefix = point_prefix or new_point_prefix()
+    collection = root.users_collection[0] if root.users_collection else bpy.context.scene.collection
+    if is_compact(root):
+        copy = new_compact_root(name, [], collection, point_prefix)
+    else:
+        copy = bpy.data.objects.new(name, None)
+        copy.empty_display_size = 1
+        copy.empty_display_type = 'PLAIN_AXES'
+        collection.objects.link(copy)
+    for key in root.keys():
+        if key != POINT_PREFIX_PROPERTY:
+            copy[key] = root[key]
+    copy.parent = root.parent
+    copy.matrix_parent_inverse = root.matrix_parent_inverse.copy()
+    copy.matrix_world = root.matrix_world.copy()
+    # The copy has no points yet, an empty index entry spares the children lookup
+    set_spline_points(copy, points, {copy: []}, point_prefix)
+    return copy
+
+
+def remove_spline(root, hierarchy=None):
+    """
+    Removes a grind root and its points
+    Args:
+        root: Grind root, empty based or compact
+        hierarchy: Index from utils.build_hierarchy, see get_spline_points
+    """
+    points = hierarchy.get(root, []) if hierarchy is not None else list(root.children)
+    mesh = root.data if is_compact(root) else None
+    bpy.data.batch_remove(list(points) + [root])
+    if mesh is not None and not mesh.users:
+        bpy.data.meshes.remove(mesh)
+
+
+def cleanup_grinds(scene, tolerance=0.01, snap_distance=0.1, finalized_only=False):
+    """
+    Cleans up the registered grind splines with grid lookups over all of their points:
+    points within tolerance are merged, spline ends within snap_distance of other ends are
+    snapped together, and the parts of segments that run along an earlier spline are removed.
+    Splines split by removed segments continue as new splines, splines entirely covered by
+    earlier ones are deleted. Splines that would collapse to a single point are left as they
+    are and reported. Only splines whose points changed are rewritten.
+    Args:
+        scene: Scene holding the registry
+        tolerance: Points closer than this are merged, segments closer than this overlap
+        snap_distance: Spline ends closer than this are snapped to a shared position.
+                       Overlaps shorter than this are kept, so junctions stay connected.
+        finalized_only: Only clean splines under the Grinds node
+
+    Returns: Dictionary of points_before, points_after, merged_points, snapped_ends,
+             dropped_segments, trimmed_segments, removed_splines, added_splines,
+             changed_splines and collapsed, the names of the splines left as they are
+    """
+    sync_counter(scene)
+    hierarchy = utils.build_hierarchy(scene.objects)
+    grinds_node = bpy.data.objects.get(GRINDS_NODE)
+    pairs = [(root, owner) for root, owner in get_grinds(scene)
+             if not finalized_only or (grinds_node is not None and root.parent == grinds_node)]
+    originals = [get_spline_points(root, hierarchy) for root, owner in pairs]
+    stats = dict.fromkeys(("points_before", "points_after", "merged_points", "snapped_ends", "dropped_segments",
+                           "trimmed_segments", "removed_splines", "added_splines", "changed_splines"), 0)
+    stats["collapsed"] = []
+    stats["points_before"] = sum(len(points) for points in originals)
+    if not stats["points_before"]:
+        return stats
+
+    centers, chains, stats["merged_points"], stats["snapped_ends"] = splines.merge_chains(
+        originals, tolerance, snap_distance)
+    # Short splines merged or snapped onto a single point are skipped, and kept as they are
+    points, runs_per_spline, stats["dropped_segments"], stats["trimmed_segments"] = splines.trim_overlaps(
+        centers, chains, tolerance, snap_distance)
+
+    for i, ((root, owner), runs) in enumerate(zip(pairs, runs_per_spline)):
+        if runs is None:
+            stats["collapsed"].append(root.name)
+            stats["points_after"] += len(originals[i])
+            continue
+        if not runs:
+            remove_spline(root, hierarchy)
+            stats["removed_splines"] += 1
+            continue
+        stats["points_after"] += sum(len(run) for run in runs)
+        first = points[runs[0]]
+        if len(runs) == 1 and first.shape == originals[i].shape and np.allclose(first, originals[i], atol=1e-6):
+            continue
+        stats["changed_splines"] += 1
+        set_spline_points(root, first, hierarchy)
+        # Splits are numbered like new splines, so their points get names of their own
+        base_name = root.name.rsplit("_", 1)[0] if "_Root_" in root.name else root.name
+        for run in runs[1:]:
+            number = new_spline_number(scene)
+            copy = copy_spline(root, points[run], "{}_{:04d}".format(base_name, number), POINT_PREFIX.format(number))
+            if owner is not None:
+                copy["grind_parent"] = owner.name
+            stats["added_splines"] += 1
+    rebuild_registry(scene)
+    return stats
@@ -0,0 +1,345 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Skater XL package content hashing, used to skip exporting unchanged assets.
+"""
+# Ensure that compatibility is handled for python 2, 3
+from __future__ import division, print_function, absolute_import
+
+__author__ = "Greg Amato"
+__url__ = "https://gregamato.dev"
+__copyright__ = "Copyright 2019-2020, Greg Amato - Amatobahn"
+__credits__ = []
+__license__ = "GNU Public License"
+__maintainer__ = "Greg Amato"
+__status__ = "Development"
+
+import hashlib
+import os
+
+import bpy
+import numpy as np
+
+# Bumped whenever what goes into a hash changes, so old caches never match
+HASH_VERSION = 4
+# Node editor layout, it does not change the exported material
+# Attribute data type => (foreach_get attribute, dtype, width)
+ATTRIBUTE_VALUES = {
+    "FLOAT": ("value", np.float32, 1),
+    "INT": ("value", np.int32, 1),
+    "INT8": ("value", np.int32, 1),
+    "BOOLEAN": ("value", np.bool_, 1),
+    "FLOAT_VECTOR": ("vector", np.float32, 3),
+    "FLOAT2": ("vector", np.float32, 2),
+    "INT32_2D": ("value", np.int32, 2),
+    "FLOAT_COLOR": ("color", np.float32, 4),
+    "BYTE_COLOR": ("color", np.float32, 4),
+    "QUATERNION": ("value", np.float32, 4),
+    "FLOAT4X4": ("value", np.float32, 16),
+}
+NODE_LAYOUT = {"location", "location_absolute", "width", "height", "select", "hide", "show_options", "show_preview", "show_texture"}
+
+
+def _update(h, *values):
+    h.update(repr(values).encode("utf-8"))
+
+
+def _read(collection, attribute, dtype, width=1):
+    buffer = np.empty(len(collection) * width, dtype=dtype)
+    collection.foreach_get(attribute, buffer)
+    return buffer
+
+
+def _prop_value(value):
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    if hasattr(value, "to_list"):
+        return value.to_list()
+    if hasattr(value, "name"):
+        return value.name
+    return value
+
+
+def hash_mesh(mesh):
+    """
+    Hashes mesh geometry from bulk reads of its vertex, edge, face, uv and attribute data,
+    custom normals and shape keys
+    Args:
+        mesh: Mesh datablock
+
+    Returns: Hex digest
+    """
+    h = hashlib.blake2b(digest_size=16)
+    _update(h, len(mesh.vertices), len(mesh.edges), len(mesh.loops), len(mesh.polygons))
+    h.update(_read(mesh.vertices, "co", np.float32, 3).tobytes())
+    h.update(_read(mesh.loops, "vertex_index", np.int32).tobytes())
+    h.update(_read(mesh.polygons, "loop_total", np.int32).tobytes())
+    h.update(_read(mesh.polygons, "material_index", np.int32).tobytes())
+    h.update(_read(mesh.polygons, "use_smooth", np.bool_).tobytes())
+    h.update(_read(mesh.edges, "vertices", np.int32, 2).tobytes())
+    h.update(_read(mesh.edges, "use_seam", np.bool_).tobytes())
+    h.update(_read(mesh.edges, "use_edge_sharp", np.bool_).tobytes())
+    for layer in mesh.uv_layers:
+        _update(h, layer.name)
+        h.update(_read(layer.data, "uv", np.float32, 2).tobytes())
+    # Color attributes, sharp faces, creases and any other generic attribute
+    for attribute in getattr(mesh, "attributes", []):
+        # Internal attributes hold selection state or data read above
+        if attribute.name.startswith(".") or attribute.name == "position":
+            continue
+        values = ATTRIBUTE_VALUES.get(attribute.data_type)
+        _update(h, attribute.name, attribute.domain, attribute.data_type)
+        if values is not None:
+            h.update(_read(attribute.data, values[0], values[1], values[2]).tobytes())
+    for layer in getattr(mesh, "vertex_colors", []):
+        _update(h, layer.name)
+        h.update(_read(layer.data, "color", np.float32, 4).tobytes())
+    if mesh.has_custom_normals:
+        h.update(hash_custom_normals(mesh))
+    if mesh.shape_keys is not None:
+        for key_block in mesh.shape_keys.key_blocks:
+            _update(h, key_block.name, key_block.value, key_block.mute, key_block.relative_key.name,
+                    key_block.slider_min, key_block.slider_max, key_block.vertex_group)
+            h.update(_read(key_block.data, "co", np.float32, 3).tobytes())
+        if mesh.shape_keys.animation_data is not None:
+            _update(h, hash_action(mesh.shape_keys.animation_data.action))
+    return h.hexdigest()
+
+
+def hash_weights(mesh):
+    """
+    Hashes the vertex group weights of a mesh
+    Args:
+        mesh: Mesh datablock
+
+    Returns: Hex digest
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for vertex in mesh.vertices:
+        h.update(repr([(group.group, group.weight) for group in vertex.groups]).encode("utf-8"))
+    return h.hexdigest()
+
+
+def hash_custom_normals(mesh):
+    """
+    Reads the custom split normals of a mesh
+    Args:
+        mesh: Mesh datablock with custom normals
+
+    Returns: Bytes of the per corner normals
+    """
+    if hasattr(mesh, "corner_normals"):
+        return _read(mesh.corner_normals, "vector", np.float32, 3).tobytes()
+    # Before blender 4.1 split normals are computed into the loops
+    mesh.calc_normals_split()
+    return _read(mesh.loops, "normal", np.float32, 3).tobytes()
+
+
+def get_fcurves(action):
+    """
+    Lists the fcurves of an action, layered actions included
+    Args:
+        action: Action datablock
+
+    Returns: List of fcurves
+    """
+    if hasattr(action, "layers") and len(action.layers):
+        return [fcurve for layer in action.layers for strip in layer.strips
+                for channelbag in getattr(strip, "channelbags", []) for fcurve in channelbag.fcurves]
+    return list(getattr(action, "fcurves", []))
+
+
+def hash_action(action):
+    """
+    Hashes the keyframes of an action: their times, values, handles and interpolation
+    Args:
+        action: Action datablock, or None
+
+    Returns: Tuple of values
+    """
+    if action is None:
+        return None,
+    values = [action.name, tuple(action.frame_range)]
+    for fcurve in get_fcurves(action):
+        points = fcurve.keyframe_points
+        values.append((fcurve.data_path, fcurve.array_index, fcurve.extrapolation, fcurve.mute, len(points)))
+        values.append(_read(points, "co", np.float32, 2).tobytes())
+        values.append(_read(points, "handle_left", np.float32, 2).tobytes())
+        values.append(_read(points, "handle_right", np.float32, 2).tobytes())
+        values.append(tuple(point.interpolation for point in points))
+    return tuple(values)
+
+
+def hash_armature(obj):
+    """
+    Hashes the bones of an armature object: rest bones and the current pose
+    Args:
+        obj: Armature object
+
+    Returns: Tuple of values
+    """
+    values = [_settings(obj.data)]
+    for bone in obj.data.bones:
+        values.append((bone.name, bone.parent.name if bone.parent else None, bone.use_deform,
+                       tuple(bone.head_local), tuple(bone.tail_local), [tuple(row) for row in bone.matrix_local]))
+    for pose_bone in obj.pose.bones:
+        values.append((pose_bone.name, [tuple(row) for row in pose_bone.matrix_basis]))
+    return tuple(values)
+
+
+def _settings(struct, skip=()):
+    """
+    Reads the editable settings of a blender struct. Referenced datablocks are read by name.
+    Args:
+        struct: Modifier, node or material
+        skip: Identifiers of settings to leave out
+
+    Returns: List of (identifier, value) pairs
+    """
+    values = []
+    for prop in struct.bl_rna.properties:
+        # Read only properties are evaluation results, ie the decimate face count
+        if prop.identifier in {"rna_type", "is_override_data_local"} or prop.type == 'COLLECTION' or prop.is_readonly:
+            continue
+        if prop.identifier in skip:
+            continue
+        value = getattr(struct, prop.identifier, None)
+        if prop.type == 'POINTER':
+            value = getattr(value, "name", None)
+        elif getattr(prop, "is_array", False) or prop.type == 'ENUM' and prop.is_enum_flag:
+            value = sorted(value) if isinstance(value, set) else list(value)
+        values.append((prop.identifier, value))
+    return values
+
+
+def hash_modifier(modifier):
+    """
+    Hashes a modifier's type and settings. Referenced datablocks are hashed by name.
+    Args:
+        modifier: Modifier to hash
+
+    Returns: Tuple of settings
+    """
+    return tuple([modifier.type, modifier.name] + _settings(modifier))
+
+
+def hash_image(image):
+    """
+    Hashes the source of an image: its file path and modification time, or its packed size
+    Args:
+        image: Image datablock
+
+    Returns: Tuple of values
+    """
+    if image.packed_file is not None:
+        return image.name, "packed", image.packed_file.size
+    path = bpy.path.abspath(image.filepath, library=image.library)
+    return image.name, path, os.path.getmtime(path) if os.path.isfile(path) else None
+
+
+def hash_node_tree(tree):
+    """
+    Hashes the nodes, unlinked input values and links of a node tree, including node groups
+    and the files of image textures
+    Args:
+        tree: Node tree
+
+    Returns: Tuple of values
+    """
+    values = []
+    for node in tree.nodes:
+        values.append((node.bl_idname, node.name, _settings(node, NODE_LAYOUT)))
+        for socket in node.inputs:
+            value = getattr(socket, "default_value", None)
+            if not socket.is_linked and value is not None:
+                values.append((socket.identifier, _prop_value(value) if not hasattr(value, "__len__")
+                               or isinstance(value, str) else list(value)))
+        if getattr(node, "image", None) is not None:
+            values.append(hash_image(node.image))
+        if getattr(node, "node_tree", None) is not None:
+            values.append(hash_node_tree(node.node_tree))
+    for link in tree.links:
+        values.append((link.from_node.name, link.from_socket.identifier, link.to_node.name, link.to_socket.identifier))
+    return tuple(values)
+
+
+def hash_material(material):
+    """
+    Hashes a material's settings and node tree, so editing a node value or an image
+    texture changes the hash of every object using it
+    Args:
+        material: Material datablock
+
+    Returns: Hex digest
+    """
+    h = hashlib.blake2b(digest_size=16)
+    _update(h, material.name, _settings(material))
+    if material.use_nodes and material.node_tree is not None:
+        _update(h, hash_node_tree(material.node_tree))
+    return h.hexdigest()
+
+
+def hash_object(obj, mesh_hashes=None, material_hashes=None):
+    """
+    Hashes everything about an object that ends up in an export:
+    mesh data, transform, modifiers, materials and custom properties
+    Args:
+        obj: Object to hash
+        mesh_hashes: Optional dictionary of object data => digest, shared between objects using the same data
+        material_hashes: Optional dictionary of material => digest, shared between objects
+
+    Returns: Hex digest
+    """
+    h = hashlib.blake2b(digest_size=16)
+    _update(h, obj.name, obj.type, obj.parent.name if obj.parent else None)
+    _update(h, [tuple(row) for row in obj.matrix_world])
+
+    if mesh_hashes is None:
+        mesh_hashes = {}
+    if obj.type == 'MESH':
+        if obj.data not in mesh_hashes:
+            mesh_hashes[obj.data] = hash_mesh(obj.data)
+        _update(h, mesh_hashes[obj.data])
+    elif obj.type == 'ARMATURE':
+        # The pose belongs to the object, so armatures are not shared
+        _update(h, hash_armature(obj))
+    elif obj.data is not None:
+        _update(h, obj.data.name, _settings(obj.data))
+    if obj.vertex_groups:
+        _update(h, [group.name for group in obj.vertex_groups])
+        if obj.type == 'MESH':
+            key = ("weights", obj.data)
+            if key not in mesh_hashes:
+                mesh_hashes[key] = hash_weights(obj.data)
+            _update(h, mesh_hashes[key])
+    for modifier in obj.modifiers:
+        _update(h, hash_modifier(modifier))
+    if material_hashes is None:
+        material_hashes = {}
+    for slot in obj.material_slots:
+        if slot.material is not None and slot.material not in material_hashes:
+            material_hashes[slot.material] = hash_material(slot.material)
+    _update(h, [(material_hashes[slot.material] if slot.material else None, slot.link) for slot in obj.material_slots])
+    _update(h, sorted((key, _prop_value(obj[key])) for key in obj.keys()))
+    if obj.animation_data is not None:
+        _update(h, hash_action(obj.animation_data.action))
+    return h.hexdigest()
+
+
+def hash_objects(objects, settings=None):
+    """
+    Hashes a group of objects exported together
+    Args:
+        objects: Objects in the group, in export order
+        settings: Optional export settings that change the written file
+
+    Returns: Hex digest
+    """
+    h = hashlib.blake2b(digest_size=16)
+    _update(h, HASH_VERSION, settings)
+    mesh_hashes = {}
+    material_hashes = {}
+    for obj in objects:
+        h.update(hash_object(obj, mesh_hashes, material_hashes).encode("utf-8"))
+    return h.hexdigest()
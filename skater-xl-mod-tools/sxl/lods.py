@@ -0,0 +1,489 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Skater XL package level of detail generation.
+"""
+# Ensure that compatibility is handled for python 2, 3
+from __future__ import division, print_function, absolute_import
+
+__author__ = "Greg Amato"
+__url__ = "https://gregamato.dev"
+__copyright__ = "Copyright 2019-2020, Greg Amato - Amatobahn"
+__credits__ = []
+__license__ = "GNU Public License"
+__maintainer__ = "Greg Amato"
+__status__ = "Development"
+
+import array
+import contextlib
+import os
+import shutil
+import tempfile
+
+import bpy
+
+from . import batch, meshcache, utils
+from .error_handling import SXLException
+
+SOURCE_PREFIX = "SXL_LOD_SOURCE_"
+# Custom property holding the level of LOD children that keep live modifier stacks
+LIVE_LOD_PROPERTY = "sxl_live_lod"
+
+
+def add_lod_modifiers(obj, level):
+    """
+    Adds the decimate and triangulate modifiers for a LOD level
+    Args:
+        obj: Object to add modifiers to
+        level: LOD level, starting at 1
+    """
+    modifier = obj.modifiers.new(name="Decimate", type="DECIMATE")
+    modifier.decimate_type = "DISSOLVE"
+    modifier.use_dissolve_boundaries = True
+    modifier.delimit = {'UV'}
+    modifier.angle_limit = 0.174533 * level  # 10 degrees * level
+
+    triangulate = obj.modifiers.new(name="Triangulate", type="TRIANGULATE")
+    triangulate.keep_custom_normals = True
+
+
+def evaluate_mesh(obj, depsgraph=None):
+    """
+    Evaluates an object through the depsgraph into a new mesh, applying its modifier stack
+    Args:
+        obj: Object to evaluate
+        depsgraph: Depsgraph to evaluate in, defaults to the context depsgraph
+
+    Returns: New mesh datablock
+    """
+    if depsgraph is None:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+    depsgraph.update()
+    return bpy.data.meshes.new_from_object(obj.evaluated_get(depsgraph))
+
+
+def count_triangles(mesh):
+    """
+    Counts the triangles a mesh exports as, from a bulk read of polygon sizes
+    Args:
+        mesh: Mesh datablock, evaluated or not
+
+    Returns: Triangle count
+    """
+    loop_totals = array.array('i', [0]) * len(mesh.polygons)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+    return sum(loop_totals) - 2 * len(loop_totals)
+
+
+def parse_lod_targets(text):
+    """
+    Parses a comma separated list of LOD triangle targets.
+    Percentages are relative to LOD0, plain numbers are absolute triangle counts.
+    Args:
+        text: Target list, ie "50%, 25%, 10%" or "5000, 1000"
+
+    Returns: List of [value, is_ratio] pairs
+    """
+    targets = []
+    for item in text.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            if item.endswith("%"):
+                targets.append([float(item[:-1]) / 100.0, True])
+            else:
+                targets.append([int(item), False])
+        except ValueError:
+            raise SXLException("Invalid LOD target '{}'".format(item))
+    return targets
+
+
+def decimate_to_target(obj, decimate, target, tolerance=0.02, max_iterations=12):
+    """
+    Bisects a collapse decimate ratio on obj until its evaluated triangle count meets target
+    Args:
+        obj: Object linked to the scene
+        decimate: Collapse decimate modifier of obj to set the ratio of
+        target: Triangle count to converge on
+        tolerance: Accepted error, as a fraction of target
+        max_iterations: Maximum number of evaluations
+
+    Returns: Tuple of (ratio, achieved triangle count) closest to target
+    """
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+
+    low, high = 0.0, 1.0
+    ratio = 1.0
+    best = None
+    for _ in range(max_iterations):
+        decimate.ratio = ratio
+        depsgraph.update()
+        triangles = count_triangles(obj.evaluated_get(depsgraph).data)
+        if best is None or abs(triangles - target) < abs(best[1] - target):
+            best = (ratio, triangles)
+        if abs(triangles - target) <= max(1, target * tolerance):
+            break
+        if triangles > target:
+            high = ratio
+        else:
+            low = ratio
+        ratio = (low + high) / 2.0
+    decimate.ratio = best[0]
+    return best
+
+
+def build_budget_lod_meshes(obj, targets):
+    """
+    Builds LOD meshes that meet triangle targets. Each level decimates the previous one.
+    Args:
+        obj: Mesh object to build LODs for
+        targets: List of [value, is_ratio] pairs, see parse_lod_targets
+
+    Returns: List of new mesh datablocks, one per target
+    """
+    temp = obj.copy()
+    bpy.context.scene.collection.objects.link(temp)
+    meshes = []
+    try:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        depsgraph.update()
+        base_triangles = count_triangles(temp.evaluated_get(depsgraph).data)
+        for value, is_ratio in targets:
+            target = int(round(base_triangles * value)) if is_ratio else int(value)
+            modifier = temp.modifiers.new(name="Decimate", type="DECIMATE")
+            modifier.decimate_type = "COLLAPSE"
+            modifier.use_collapse_triangulate = True
+            modifier.delimit = {'UV'}
+            triangulate = temp.modifiers.new(name="Triangulate", type="TRIANGULATE")
+            triangulate.keep_custom_normals = True
+
+            decimate_to_target(temp, modifier, target)
+            meshes.append(evaluate_mesh(temp))
+
+            # The next level starts from this one
+            temp.modifiers.clear()
+            temp.data = meshes[-1]
+    finally:
+        bpy.data.objects.remove(temp)
+    return meshes
+
+
+def build_lod_meshes(obj, lod_count=3, targets=None):
+    """
+    Builds LOD meshes for an object without bpy.ops, so it does not depend on the active object
+    Args:
+        obj: Mesh object to build LODs for
+        lod_count: Number of LOD levels to build below LOD0
+        targets: Optional triangle targets, see parse_lod_targets. Replaces lod_count when given
+
+    Returns: List of new mesh datablocks, one per LOD level
+    """
+    if targets:
+        return build_budget_lod_meshes(obj, targets)
+
+    # A temporary object sharing the source data, evaluated with the LOD modifiers on top
+    temp = obj.copy()
+    bpy.context.scene.collection.objects.link(temp)
+    meshes = []
+    try:
+        for i in range(lod_count):
+            add_lod_modifiers(temp, i + 1)
+            meshes.append(evaluate_mesh(temp))
+            for modifier in temp.modifiers[-2:]:
+                temp.modifiers.remove(modifier)
+    finally:
+        bpy.data.objects.remove(temp)
+    return meshes
+
+
+def add_lod_objects(obj, meshes):
+    """
+    Creates LOD child objects for obj from already built meshes
+    Args:
+        obj: Base object, renamed to LOD0
+        meshes: LOD meshes, starting at LOD1
+
+    Returns: List of new LOD objects
+    """
+    collection = obj.users_collection[0] if obj.users_collection else bpy.context.collection
+    base_name = utils.get_base_name(obj.name)
+    lod_objects = []
+    for i, mesh in enumerate(meshes):
+        new_lod = obj.copy()
+        # Meshes shared with other instances keep the name of the first one
+        fresh = mesh.users == 0
+        new_lod.data = mesh
+        new_lod.modifiers.clear()
+        new_lod.name = "{}_LOD{}".format(base_name, i + 1)
+        if fresh:
+            mesh.name = new_lod.name
+        utils.parent_in_place(new_lod, obj)
+        collection.objects.link(new_lod)
+        lod_objects.append(new_lod)
+
+    # Name Base Object
+    if '_LOD' not in obj.name:
+        obj.name = "{}_LOD0".format(obj.name)
+    return lod_objects
+
+
+def make_lods(obj, lod_count=3, targets=None):
+    """
+    Generates LOD children for a single object in process, reusing the LOD meshes of
+    other instances of its mesh
+    Args:
+        obj: Mesh object to generate LODs for
+        lod_count: Number of LOD levels to build below LOD0
+        targets: Optional triangle targets, see parse_lod_targets. Replaces lod_count when given
+
+    Returns: List of new LOD objects
+    """
+    # Grind roots can be compact meshes, they never get LODs
+    if obj is None or obj.get("grind_spline"):
+        return []
+    # Instances of the same mesh share their LOD meshes, which are decimated once
+    token, meshes = meshcache.lookup(obj, "lods", (lod_count, targets))
+    if meshes is not None:
+        return add_lod_objects(obj, meshes)
+    meshes = build_lod_meshes(obj, lod_count, targets)
+    lod_objects = add_lod_objects(obj, meshes)
+    meshcache.store(token, meshes)
+    return lod_objects
+
+
+def get_live_lods(obj, hierarchy=None):
+    """
+    Finds the live LOD children of an object
+    Args:
+        obj: Base object
+        hierarchy: Index from utils.build_hierarchy. Pass one in when looking up many objects,
+                   obj.children scans every object in the file.
+
+    Returns: Dictionary of level => live LOD object
+    """
+    children = hierarchy.get(obj, []) if hierarchy is not None else obj.children
+    return {child[LIVE_LOD_PROPERTY]: child for child in children if child.get(LIVE_LOD_PROPERTY)}
+
+
+def make_live_lods(obj, lod_count=3, hierarchy=None):
+    """
+    Adds or updates LOD children that share the mesh of obj and keep live decimate and
+    triangulate modifiers. Nothing is evaluated here, levels above lod_count are removed.
+    Args:
+        obj: Mesh object to generate LODs for
+        lod_count: Number of LOD levels below LOD0
+        hierarchy: Index from utils.build_hierarchy, see get_live_lods
+
+    Returns: List of live LOD objects, starting at LOD1
+    """
+    if obj is None or obj.get("grind_spline"):
+        return []
+    existing = get_live_lods(obj, hierarchy)
+    for level, lod in existing.items():
+        if level > lod_count:
+            bpy.data.objects.remove(lod)
+
+    collection = obj.users_collection[0] if obj.users_collection else bpy.context.collection
+    base_name = utils.get_base_name(obj.name)
+    lod_objects = []
+    for level in range(1, lod_count + 1):
+        lod = existing.get(level)
+        if lod is None:
+            # The copy keeps the source modifiers, the LOD modifiers go on top like build_lod_meshes
+            lod = obj.copy()
+            lod.name = "{}_LOD{}".format(base_name, level)
+            lod[LIVE_LOD_PROPERTY] = level
+            utils.parent_in_place(lod, obj)
+            collection.objects.link(lod)
+        else:
+            for name in ("Decimate", "Triangulate"):
+                if name in lod.modifiers:
+                    lod.modifiers.remove(lod.modifiers[name])
+        add_lod_modifiers(lod, level)
+        lod_objects.append(lod)
+
+    if '_LOD' not in obj.name:
+        obj.name = "{}_LOD0".format(obj.name)
+    return lod_objects
+
+
+def evaluate_live_lod(obj, depsgraph):
+    """
+    Evaluates a live LOD object, reusing the cached mesh until its source mesh or modifiers change
+    Args:
+        obj: Live LOD object
+        depsgraph: Evaluated depsgraph
+
+    Returns: Evaluated mesh datablock
+    """
+    token, meshes = meshcache.lookup(obj, "live_lod", ())
+    if meshes is None:
+        meshes = [bpy.data.meshes.new_from_object(obj.evaluated_get(depsgraph))]
+        meshes[0].name = "{}_evaluated".format(obj.name)
+        meshcache.store(token, meshes)
+    return meshes[0]
+
+
+@contextlib.contextmanager
+def evaluated_live_lods(objects, cached=True):
+    """
+    Temporarily swaps live LOD objects to their cached evaluated meshes with their modifiers
+    disabled, so an export does not evaluate unchanged LODs again
+    Args:
+        objects: Objects about to be exported, other objects are ignored
+        cached: Store new evaluated meshes in the mesh cache. Otherwise meshes that are not cached
+            yet are removed on exit, so only the live LODs of one group are held at a time
+    """
+    live = [obj for obj in objects if obj.get(LIVE_LOD_PROPERTY)]
+    depsgraph = bpy.context.evaluated_depsgraph_get() if live else None
+    states = []
+    temporary = []
+    try:
+        for obj in live:
+            if cached:
+                mesh = evaluate_live_lod(obj, depsgraph)
+            else:
+                meshes = meshcache.lookup(obj, "live_lod", ())[1]
+                if meshes is None:
+                    meshes = [bpy.data.meshes.new_from_object(obj.evaluated_get(depsgraph))]
+                    temporary.append(meshes[0])
+                mesh = meshes[0]
+            states.append((obj, obj.data, [(m, m.show_viewport, m.show_render) for m in obj.modifiers]))
+            obj.data = mesh
+            for modifier in obj.modifiers:
+                modifier.show_viewport = False
+                modifier.show_render = False
+        yield
+    finally:
+        for obj, data, modifiers in states:
+            obj.data = data
+            for modifier, show_viewport, show_render in modifiers:
+                modifier.show_viewport = show_viewport
+                modifier.show_render = show_render
+        if temporary:
+            bpy.data.batch_remove(temporary)
+
+
+def describe_lods(obj, lod_objects):
+    """
+    Describes achieved LOD triangle counts for reporting
+    Args:
+        obj: Base object
+        lod_objects: LOD objects generated for obj
+
+    Returns: Report string
+    """
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    base_triangles = count_triangles(obj.evaluated_get(depsgraph).data)
+    levels = ["LOD0 {}".format(base_triangles)]
+    for i, lod in enumerate(lod_objects):
+        triangles = count_triangles(lod.data)
+        levels.append("LOD{} {} ({:.0%})".format(i + 1, triangles, triangles / max(base_triangles, 1)))
+    return "{}: {}".format(utils.get_base_name(obj.name), ", ".join(levels))
+
+
+def batch_make_lods(objects, lod_count=3, targets=None, workers=1, progress=None):
+    """
+    Generates LOD children for many objects. Source meshes are evaluated through the depsgraph,
+    decimated by a pool of background blender processes and merged back into this file.
+    Each unique mesh is decimated once and its LOD meshes are shared by all of its instances.
+    Args:
+        objects: Mesh objects to generate LODs for
+        lod_count: Number of LOD levels to build below LOD0
+        targets: Optional triangle targets, see parse_lod_targets. Replaces lod_count when given
+        workers: Number of background blender processes, 1 or less builds in process
+        progress: Optional callable receiving (done, total) as objects complete
+
+    Returns: Dictionary of object => list of new LOD objects
+    """
+    objects = [obj for obj in objects if obj.type == 'MESH' and not obj.get("grind_spline")]
+    if targets:
+        lod_count = len(targets)
+    results = {}
+    if workers <= 1 or len(objects) < 2:
+        for i, obj in enumerate(objects):
+            results[obj] = make_lods(obj, lod_count, targets)
+            if progress is not None:
+                progress(i + 1, len(objects))
+        return results
+
+    # Instances of the same mesh are decimated once, by their first object
+    params = (lod_count, targets)
+    groups = {}
+    for obj in objects:
+        groups.setdefault(meshcache.make_key(obj, "lods", params), []).append(obj)
+    pending = []
+    for instances in groups.values():
+        token, meshes = meshcache.lookup(instances[0], "lods", params)
+        if meshes is None:
+            pending.append((token, instances))
+            continue
+        for obj in instances:
+            results[obj] = add_lod_objects(obj, meshes)
+    if progress is not None and len(results):
+        progress(len(results), len(objects))
+    if not pending:
+        return results
+
+    temp_dir = tempfile.mkdtemp(prefix="sxl_lods_")
+    try:
+        # Evaluate every source once, materials stay in this file and are reassigned on merge
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        sources = []
+        materials = []
+        for i, (token, instances) in enumerate(pending):
+            source = bpy.data.meshes.new_from_object(instances[0].evaluated_get(depsgraph))
+            source.name = "{}{}".format(SOURCE_PREFIX, i)
+            materials.append(list(source.materials))
+            source.materials.clear()
+            sources.append(source)
+
+        jobs = []
+        chunks = [list(range(len(pending)))[w::workers] for w in range(workers)]
+        for w, chunk in enumerate(chunk for chunk in chunks if chunk):
+            job = {
+                "task": "lods",
+                "input": os.path.join(temp_dir, "job_{}_in.blend".format(w)),
+                "output": os.path.join(temp_dir, "job_{}_out.blend".format(w)),
+                "meshes": [sources[i].name for i in chunk],
+                "lod_count": lod_count,
+                "targets": targets,
+            }
+            bpy.data.libraries.write(job["input"], set(sources[i] for i in chunk))
+            jobs.append(job)
+        source_index = {source.name: i for i, source in enumerate(sources)}
+        for source in sources:
+            bpy.data.meshes.remove(source)
+
+        done = [len(results)]
+
+        def job_done(job):
+            done[0] += sum(len(pending[source_index[name]][1]) for name in job["meshes"])
+            if progress is not None:
+                progress(done[0], len(objects))
+
+        batch.run_workers(jobs, workers, temp_dir, callback=job_done)
+
+        for job in jobs:
+            with bpy.data.libraries.load(job["output"]) as (data_from, data_to):
+                names = list(data_from.meshes)
+                data_to.meshes = list(names)
+            lod_meshes = {}
+            for name, mesh in zip(names, data_to.meshes):
+                source_name, level = name.rsplit("_LOD", 1)
+                lod_meshes.setdefault(source_name, {})[int(level)] = mesh
+            for name in job["meshes"]:
+                i = source_index[name]
+                token, instances = pending[i]
+                meshes = [lod_meshes[name][level + 1] for level in range(lod_count)]
+                for mesh in meshes:
+                    for material in materials[i]:
+                        mesh.materials.append(material)
+                for obj in instances:
+                    results[obj] = add_lod_objects(obj, meshes)
+                meshcache.store(token, meshes)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return results
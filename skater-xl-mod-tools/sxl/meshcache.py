@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Skater XL package generated mesh cache.
+
+LOD and collision meshes are generated once per source mesh datablock and shared by every
+object instancing it. Entries are kept for the session and are invalidated when the content
+hash of the source mesh changes, or when a generated mesh is removed.
+"""
+# Ensure that compatibility is handled for python 2, 3
+from __future__ import division, print_function, absolute_import
+
+__author__ = "Greg Amato"
+__url__ = "https://gregamato.dev"
+__copyright__ = "Copyright 2019-2020, Greg Amato - Amatobahn"
+__credits__ = []
+__license__ = "GNU Public License"
+__maintainer__ = "Greg Amato"
+__status__ = "Development"
+
+import bpy
+
+# (kind, source mesh name, params, modifiers) => (source mesh hash, generated mesh names)
+# Names are stored rather than datablocks, which do not survive undo
+_CACHE = {}
+
+
+def make_key(obj, kind, params):
+    """
+    Builds the cache key of an object. Objects sharing a mesh and modifier stack share a key.
+    Args:
+        obj: Mesh object
+        kind: Kind of generated meshes, ie "lods" or "collision"
+        params: Generation settings, must have a stable repr
+
+    Returns: Hashable key
+    """
+    from . import hashing
+
+    # Modifier settings hold lists, their repr is hashable
+    return kind, obj.data.name, repr(params), repr([hashing.hash_modifier(m) for m in obj.modifiers])
+
+
+def lookup(obj, kind, params):
+    """
+    Looks up generated meshes for an object
+    Args:
+        obj: Mesh object
+        kind: Kind of generated meshes
+        params: Generation settings
+
+    Returns: Tuple of (token for store, list of meshes or None on a miss)
+    """
+    from . import hashing
+
+    key = make_key(obj, kind, params)
+    digest = hashing.hash_mesh(obj.data)
+    token = (key, digest)
+    entry = _CACHE.get(key)
+    if entry is None:
+        return token, None
+    if entry[0] != digest:
+        # Stale meshes nothing uses anymore are removed rather than left as orphans
+        for name in entry[1]:
+            mesh = bpy.data.meshes.get(name)
+            if mesh is not None and mesh.users == 0:
+                bpy.data.meshes.remove(mesh)
+        del _CACHE[key]
+        return token, None
+    meshes = [bpy.data.meshes.get(name) for name in entry[1]]
+    if any(mesh is None for mesh in meshes):
+        del _CACHE[key]
+        return token, None
+    return token, meshes
+
+
+def store(token, meshes):
+    """
+    Stores generated meshes under a token from lookup
+    Args:
+        token: Token returned by lookup
+        meshes: Generated meshes, stored after they were named
+    """
+    key, digest = token
+    _CACHE[key] = (digest, [mesh.name for mesh in meshes])
+
+
+def clear():
+    _CACHE.clear()
+
+
+@bpy.app.handlers.persistent
+def clear_on_load(*args):
+    clear()
+
+
+def register():
+    if clear_on_load not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(clear_on_load)
+
+
+def unregister():
+    if clear_on_load in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(clear_on_load)
+    clear()
@@ -16,23 +16,17 @@ __maintainer__ = "Greg Amato"
 __status__ = "Development"
 
 import os
-import uuid
+import time
 
 import bpy
 from bpy_extras.io_utils import ExportHelper
-import bmesh
-import mathutils
 
 from .error_handling import *
-from . import utils
+from . import meshcache, profiling, utils
 
 
-class SXLGeneratePoints(bpy.types.Operator):
-    bl_idname = "sxl.generate_points"
-    bl_label = "Generate Spline Points"
-    bl_description = "Generate Spline Points"
-
-    audio_cue = bpy.props.StringProperty()
+class SXLGrindSplineBuilder(object):
+    """Grind root and point creation shared by the spline operators, which provide audio_cue"""
 
     @staticmethod
     def look_at(obj, target):
@@ -42,69 +36,50 @@ class SXLGeneratePoints(bpy.types.Operator):
         obj.rotation_euler = quat.to_euler()
 
     @staticmethod
-    def get_selected_verts(obj):
+    def get_selected_chains(obj):
         """
-        Iterate through selected edges and collect vertices
+        Iterate through selected edges and split them into ordered chains.
+        Closed loops and junctions are broken into separate chains.
         Args:
             obj: Object to iterate through selected edges
 
-        Returns: List of selected edges
+        Returns: List of chains, each a list of world space vertex positions
         """
-        edge_verts = []
+        import bmesh
+
+        from . import splines
 
         obj_data = obj.data
         b_mesh = bmesh.from_edit_mesh(obj_data)
-        print(b_mesh.select_mode)
 
         matrix = obj.matrix_world
         if b_mesh.select_mode in [{'EDGE'}]:
-            selected_edges = []
-            selected_idx = []
-            selected_vert = []
-            for edge in b_mesh.edges:
-                if edge.select:
-                    selected_edges.append(edge)
-                    for vert in edge.verts:
-                        selected_vert.append(vert)
-                        selected_idx.append(vert.index)
-            start_idx = [v for v in selected_idx if selected_idx.count(v) is 1][0]
-            print(start_idx)
-
-            # https://blender.stackexchange.com/questions/72367/how-to-order-a-list-of-vertices-based-upon-position
-            # https://blender.stackexchange.com/questions/69796/selection-history-from-shortest-path/69977#69977
-            ordered_idx = []
-            completed_idx = [start_idx]
-            current_idx = start_idx
-            while len(completed_idx) != len(selected_edges) + 2:
-                for e in b_mesh.edges:
-                    if e.select:
-                        if e.verts[0].index == current_idx or e.verts[1].index == current_idx:
-                            if not e.verts[0].index in completed_idx:
-                                to_idx = e.verts[0].index
-                                break
-                            elif not e.verts[1].index in completed_idx:
-                                to_idx = e.verts[1].index
-                                break
-                ordered_idx.append(current_idx)
-                completed_idx.append(to_idx)
-                current_idx = to_idx
-
-            print(ordered_idx)
-
-            for idx in ordered_idx:
-                vertex = [v for v in selected_vert if v.index == idx][0]
-                edge_verts.append(matrix @ vertex.co)
-            return edge_verts
+            # Single pass over the mesh, everything after this only touches the selection
+            selected_edges = [(e.verts[0], e.verts[1]) for e in b_mesh.edges if e.select]
+            return [[matrix @ vert.co for vert in chain] for chain in splines.split_edge_chains(selected_edges)]
 
         if b_mesh.select_mode == {'VERT'}:
+            edge_verts = []
             for vert in b_mesh.verts:
                 if vert.select:
                     vector = matrix @ vert.co
                     if vector not in edge_verts:
                         edge_verts.append(vector)
+            return [edge_verts]
 
-        return edge_verts
+        return []
 
+    @staticmethod
+    def get_selected_verts(obj):
+        """
+        Iterate through selected edges and collect vertices of the first chain
+        Args:
+            obj: Object to iterate through selected edges
+
+        Returns: List of world space vertex positions
+        """
+        chains = SXLGrindSplineBuilder.get_selected_chains(obj)
+        return chains[0] if chains else []
 
     @staticmethod
     def add_point(name, uid, location=(0, 0, 0), parent=None):
@@ -118,49 +93,128 @@ class SXLGeneratePoints(bpy.types.Operator):
 
         Returns: New point Object
         """
+        return SXLGrindSplineBuilder.add_points(["{}_{}".format(name, uid)], [location], parent)[0]
 
-        point = bpy.data.objects.new(name, None)
-        point.name = "{}_{}".format(point.name.split('.')[0], uid)
-        point.empty_display_size = 1
-        point.empty_display_type = 'PLAIN_AXES'
-        bpy.context.collection.objects.link(point)
-        point.location = location
+    @staticmethod
+    def add_points(names, locations, parent, parent_matrix=None, collection=None):
+        """
+        Creates empty objects parented to parent, keeping their world space location.
+        Parenting is set directly on the data, matching bpy.ops.object.parent_set
+        without triggering a scene update per object.
+        Args:
+            names: Names of new objects
+            locations: positions in world space to create objects at
+            parent: object to parent new objects to
+            parent_matrix: world matrix of parent, defaults to parent.matrix_world.
+                           Required when parent was created without a scene update since.
+            collection: collection to link new objects to, defaults to the active collection
+
+        Returns: List of new point Objects
+        """
+        if parent_matrix is None:
+            parent_matrix = parent.matrix_world
+        parent_inverse = parent_matrix.inverted()
+        if collection is None:
+            collection = bpy.context.collection
+
+        points = []
+        for name, location in zip(names, locations):
+            point = bpy.data.objects.new(name, None)
+            point.empty_display_size = 1
+            point.empty_display_type = 'PLAIN_AXES'
+            point.location = location
+            point.parent = parent
+            point.matrix_parent_inverse = parent_inverse
+            points.append(point)
+
+        for point in points:
+            collection.objects.link(point)
+        return points
 
-        bpy.context.active_object.select_set(False)
-        bpy.data.objects[point.name].select_set(True)
-        bpy.data.objects[parent.name].select_set(True)
-        bpy.context.view_layer.objects.active = parent
-        bpy.ops.object.parent_set(type="OBJECT")
-        bpy.context.active_object.select_set(False)
+    @staticmethod
+    def resample(vertex_array, sxl):
+        """
+        Reduces a chain to the points needed by the scene resample settings
+        Args:
+            vertex_array: Ordered world space positions of the spline
+            sxl: Scene SXL properties
 
-        return point
+        Returns: List of world space positions
+        """
+        from . import splines
+
+        if sxl.spline_resample == "SIMPLIFY":
+            return splines.simplify_chain(vertex_array, sxl.spline_tolerance).tolist()
+        if sxl.spline_resample == "UNIFORM":
+            return splines.resample_chain(vertex_array, sxl.spline_spacing, sxl.spline_tolerance).tolist()
+        return vertex_array
 
     def build_grind_points(self, obj):
         """
-        Builds all grind points for selected edge group
+        Builds all grind points for selected edge groups, one spline per chain
         Args:
             obj: Object to build points for
         """
-        vertex_array = self.get_selected_verts(obj)
-        print(vertex_array)
-        if len(vertex_array) > 1:
-            # Build Grind Root
-            grind_root = self.add_point("{}_GrindSpline_Grind_{}_Root".format(obj.name, self.audio_cue),
-                                        str(uuid.uuid4())[:3],
-                                        location=obj.location,
-                                        parent=obj)
-            # Set grindspline property
-            grind_root["grind_spline"] = 1
-            grind_root["grind_parent"] = obj.name
-
-            point_uuid = str(uuid.uuid4())[:3]
-            for i in range(len(vertex_array)):
-                pt = self.add_point("GrindPoint", "{}{}".format(point_uuid, i),
-                                    location=vertex_array[i],
-                                    parent=grind_root)
-
-            bpy.data.objects[obj.name].select_set(True)
-            bpy.context.view_layer.objects.active = obj
+        from . import grinds
+
+        sxl = bpy.context.scene.SXL
+        grinds.sync_counter(bpy.context.scene)
+        before = after = 0
+        for vertex_array in self.get_selected_chains(obj):
+            if len(vertex_array) > 1:
+                before += len(vertex_array)
+                vertex_array = self.resample(vertex_array, sxl)
+                after += len(vertex_array)
+                self.build_grind_spline(obj, vertex_array)
+        if sxl.spline_resample != "NONE":
+            self.report({'INFO'}, "Resampled grind points: {} => {}".format(before, after))
+
+        bpy.data.objects[obj.name].select_set(True)
+        bpy.context.view_layer.objects.active = obj
+
+    def build_grind_spline(self, obj, vertex_array):
+        """
+        Builds a grind root and its points for a single ordered chain,
+        or a compact grind root when compact splines are enabled
+        Args:
+            obj: Object to build points for
+            vertex_array: Ordered world space positions of the spline
+        """
+        from . import grinds
+
+        number = grinds.new_spline_number()
+        name = "{}_GrindSpline_Grind_{}_Root".format(obj.name, self.audio_cue)
+        if bpy.context.scene.SXL.spline_compact:
+            grind_root = grinds.build_compact_spline("{}_{:04d}".format(name, number), obj, vertex_array,
+                                                     obj.location, point_prefix=grinds.POINT_PREFIX.format(number))
+            grinds.register_grind(bpy.context.scene, grind_root, obj)
+            return
+
+        # Build Grind Root
+        grind_root = self.add_point(name,
+                                    "{:04d}".format(number),
+                                    location=obj.location,
+                                    parent=obj)
+        # Set grindspline property
+        grind_root["grind_spline"] = 1
+        grind_root["grind_parent"] = obj.name
+        grinds.register_grind(bpy.context.scene, grind_root, obj)
+
+        # The root has no evaluated world matrix yet, it sits at its own location
+        prefix = grinds.POINT_PREFIX.format(number)
+        self.add_points([grinds.get_point_name(prefix, i) for i in range(len(vertex_array))],
+                        vertex_array,
+                        grind_root,
+                        parent_matrix=grind_root.matrix_basis)
+
+
+class SXLGeneratePoints(SXLGrindSplineBuilder, bpy.types.Operator):
+    bl_idname = "sxl.generate_points"
+    bl_label = "Generate Spline Points"
+    bl_description = "Generate Spline Points"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    audio_cue = bpy.props.StringProperty()
 
     @sxl_exception
     def _execute(self, context):
@@ -176,42 +230,103 @@ class SXLGeneratePoints(bpy.types.Operator):
         return return_code
 
 
+class SXLDetectGrindEdges(SXLGrindSplineBuilder, bpy.types.Operator):
+    bl_idname = "sxl.detect_grind_edges"
+    bl_label = "Detect Grind Edges"
+    bl_description = "Find convex ledge and rail edges on the selected meshes and generate grind splines for them"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    audio_cue = bpy.props.StringProperty()
+
+    def detect_grind_points(self, obj, depsgraph):
+        """
+        Builds grind splines for every grindable edge chain of an object
+        Args:
+            obj: Mesh object to scan
+            depsgraph: Evaluated depsgraph, so modifiers are taken into account
+
+        Returns: Tuple of (spline count, point count)
+        """
+        from . import detection
+
+        sxl = bpy.context.scene.SXL
+        obj_eval = obj.evaluated_get(depsgraph)
+        mesh = obj_eval.to_mesh()
+        try:
+            data = detection.read_mesh(mesh, obj.matrix_world)
+        finally:
+            obj_eval.to_mesh_clear()
+
+        edges = detection.find_grind_edges(data, sxl.detect_angle, sxl.detect_min_height)
+        splines_built = points = 0
+        for vertex_array in detection.grind_chains(data, edges, sxl.detect_min_length):
+            vertex_array = self.resample(vertex_array.tolist(), sxl)
+            self.build_grind_spline(obj, vertex_array)
+            splines_built += 1
+            points += len(vertex_array)
+        return splines_built, points
+
+    @sxl_exception
+    def _execute(self, context):
+        if context.object is not None and context.object.mode != "OBJECT":
+            bpy.ops.object.mode_set(mode="OBJECT")
+        depsgraph = context.evaluated_depsgraph_get()
+        objects = [obj for obj in context.selected_objects if obj.type == "MESH"]
+        if not objects:
+            self.report({'WARNING'}, "Grind Edges not detected. Select one or more meshes")
+            return {'CANCELLED'}
+
+        from . import grinds
+
+        grinds.sync_counter(context.scene)
+        start = time.perf_counter()
+        splines_built = points = 0
+        for obj in objects:
+            built = self.detect_grind_points(obj, depsgraph)
+            splines_built += built[0]
+            points += built[1]
+        self.report({'INFO'}, "Detected {} grind splines, {} points on {} meshes ({:.2f}s)".format(
+            splines_built, points, len(objects), time.perf_counter() - start))
+        return {'FINISHED'}
+
+    def execute(self, context):
+        return_code = self._execute(context)
+        return return_code
+
+
 class SXLGenerateLODs(bpy.types.Operator):
     bl_idname = "sxl.generate_lods"
     bl_label = "Generate Mesh LODs"
     bl_description = "Generate Mesh LODs"
 
     @staticmethod
-    def make_lods(obj):
-        if obj is not None:
-            for i in range(3):
-                new_lod = obj.copy()
-                new_lod.name = "{}_LOD{}".format(utils.get_base_name(obj.name), i + 1)
-                new_lod.parent = obj
-
-                modifier = new_lod.modifiers.new(name="Decimate", type="DECIMATE")
-                modifier.decimate_type = "DISSOLVE"
-                modifier.use_dissolve_boundaries = True
-                modifier.delimit = {'UV'}
-                modifier.angle_limit = 0.174533 * (i + 1)  # 10% * (i + 1)
-
-                triangulate = new_lod.modifiers.new(name="Triangulate", type="TRIANGULATE")
-                triangulate.keep_custom_normals = True
-
-                bpy.ops.object.modifier_apply(apply_as="DATA", modifier="Decimate")
-                bpy.ops.object.modifier_apply(apply_as="DATA", modifier="Triangulate")
+    def get_targets(context):
+        """
+        Reads the triangle targets for budget mode
+        Args:
+            context: Blender context
 
-                bpy.context.collection.objects.link(new_lod)
+        Returns: List of targets, or None when LODs are generated by angle
+        """
+        from . import lods
 
-            # Name Base Object
-            if '_LOD' not in obj.name:
-                obj.name = "{}_LOD0".format(obj.name)
+        sxl = context.scene.SXL
+        if sxl.lod_mode == "BUDGET":
+            return lods.parse_lod_targets(sxl.lod_targets)
+        return None
 
     @sxl_exception
     def _execute(self, context):
+        from . import lods
+
         if bpy.context.object.mode == "OBJECT":
             obj = context.object
-            self.make_lods(obj)
+            if context.scene.SXL.lod_mode == "LIVE":
+                lod_objects = lods.make_live_lods(obj, context.scene.SXL.lod_count)
+                self.report({'INFO'}, "{} live LOD levels, evaluated at export".format(len(lod_objects)))
+                return {'FINISHED'}
+            lod_objects = lods.make_lods(obj, context.scene.SXL.lod_count, self.get_targets(context))
+            self.report({'INFO'}, lods.describe_lods(obj, lod_objects))
         else:
             self.report({'WARNING'}, "LODs not generated. Must be in Object Mode")
         return {'FINISHED'}
@@ -221,34 +336,86 @@ class SXLGenerateLODs(bpy.types.Operator):
         return return_code
 
 
-class SXLGenerateCollision(bpy.types.Operator):
-    bl_idname = "sxl.generate_collision"
-    bl_label = "Generate Collision Shape"
-    bl_description = "Generate Collision Shape"
+class SXLBatchGenerateLODs(bpy.types.Operator):
+    bl_idname = "sxl.batch_generate_lods"
+    bl_label = "Batch Generate Mesh LODs"
+    bl_description = "Generate Mesh LODs for every selected mesh, or every mesh in the active collection"
+    bl_options = {'REGISTER', 'UNDO'}
 
     @staticmethod
-    def make_collision_shape(obj):
-        if obj is not None:
-            collision_obj = obj.copy()
-            collision_obj.name = "{}_collision".format(utils.get_base_name(obj.name))
-            collision_obj.parent = obj
+    def get_sources(context):
+        """
+        Collects the meshes to generate LODs for, skipping generated LOD and collision objects
+        and compact grind roots
+        Args:
+            context: Blender context
 
-            modifier = collision_obj.modifiers.new(name="Decimate", type="DECIMATE")
-            modifier.decimate_type = "DISSOLVE"
-            modifier.angle_limit = 0.174533
+        Returns: List of mesh objects
+        """
+        if context.scene.SXL.lod_batch_source == "COLLECTION":
+            objects = context.collection.all_objects
+        else:
+            objects = context.selected_objects
+        return [obj for obj in objects
+                if obj.type == 'MESH' and "_collision" not in obj.name and not obj.get("grind_spline")
+                and not ('_LOD' in obj.name and not obj.name.endswith("_LOD0"))]
 
-            triangulate = collision_obj.modifiers.new(name="Triangulate", type="TRIANGULATE")
-            triangulate.keep_custom_normals = True
+    @sxl_exception
+    def _execute(self, context):
+        from . import lods
+
+        if context.mode == "OBJECT":
+            prefs = context.preferences.addons['skater-xl-mod-tools'].preferences
+            objects = self.get_sources(context)
+            if context.scene.SXL.lod_mode == "LIVE":
+                hierarchy = utils.build_hierarchy()
+                for obj in objects:
+                    lods.make_live_lods(obj, context.scene.SXL.lod_count, hierarchy)
+                self.report({'INFO'}, "Updated live LODs for {} objects".format(len(objects)))
+                return {'FINISHED'}
+
+            window_manager = context.window_manager
+            window_manager.progress_begin(0, len(objects))
+            try:
+                results = lods.batch_make_lods(objects,
+                                               lod_count=context.scene.SXL.lod_count,
+                                               targets=SXLGenerateLODs.get_targets(context),
+                                               workers=prefs.worker_count,
+                                               progress=lambda done, total: window_manager.progress_update(done))
+            except SXLWorkerError as e:
+                self.report({'ERROR'}, str(e))
+                return {'CANCELLED'}
+            finally:
+                window_manager.progress_end()
+            for obj, lod_objects in results.items():
+                print(lods.describe_lods(obj, lod_objects))
+            self.report({'INFO'}, "Generated LODs for {} objects".format(len(results)))
+        else:
+            self.report({'WARNING'}, "LODs not generated. Must be in Object Mode")
+        return {'FINISHED'}
 
-            bpy.ops.object.modifier_apply(apply_as="DATA", modifier="Decimate")
-            bpy.ops.object.modifier_apply(apply_as="DATA", modifier="Triangulate")
-            bpy.context.collection.objects.link(collision_obj)
+    def execute(self, context):
+        return_code = self._execute(context)
+        return return_code
+
+
+class SXLGenerateCollision(bpy.types.Operator):
+    bl_idname = "sxl.generate_collision"
+    bl_label = "Generate Collision Shape"
+    bl_description = "Generate Collision Shape"
 
     @sxl_exception
     def _execute(self, context):
+        from . import collision
+
         if bpy.context.object.mode == "OBJECT":
             obj = context.object
-            self.make_collision_shape(obj)
+            sxl = context.scene.SXL
+            generated = collision.make_collision(obj, sxl)
+            if sxl.collision_mode == "CONVEX":
+                self.report({'INFO'}, "Generated {} convex hulls".format(len(generated)))
+            elif sxl.collision_mode == "PRIMITIVE":
+                self.report({'INFO'}, "Generated {} primitive colliders".format(len(generated)))
         else:
             self.report({'WARNING'}, "Collision Shape not generated. Must be in Object Mode")
         return {'FINISHED'}
@@ -262,25 +429,15 @@ class SXLFinalizeGrinds(bpy.types.Operator):
     bl_idname = "sxl.finalize_grinds"
     bl_label = "Finalize Grinds"
     bl_description = "Finalize Grinds"
+    bl_options = {'REGISTER', 'UNDO'}
 
     @sxl_exception
     def _execute(self, context):
-        prefs = context.preferences.addons['skater-xl-mod-tools'].preferences
-        bpy.context.active_object.select_set(False)
+        from . import grinds
 
-        # Check if grind node exists, if not create it.
-        if "Grinds" not in bpy.data.objects:
-            grinds_pt = bpy.data.objects.new("Grinds", None)
-            bpy.context.collection.objects.link(grinds_pt)
-        else:
-            grinds_pt = bpy.data.objects["Grinds"]
         # Move all grind spline objects to node, maintaining the offset
-        objects = bpy.context.scene.objects
-        for obj in objects:
-            if obj.type == "EMPTY" and obj.get('grind_spline') == 1:
-                bpy.context.view_layer.objects.active = obj
-                obj.parent = grinds_pt
-                bpy.context.active_object.select_set(False)
+        moved = grinds.finalize_grinds(context.scene, context.collection)
+        self.report({'INFO'}, "Finalized {} grind splines".format(moved))
         return {'FINISHED'}
 
     def execute(self, context):
@@ -292,24 +449,89 @@ class SXLResetGrinds(bpy.types.Operator):
     bl_idname = "sxl.reset_grinds"
     bl_label = "Reset Grinds"
     bl_description = "Reset Grinds to respective meshes"
+    bl_options = {'REGISTER', 'UNDO'}
 
     @sxl_exception
     def _execute(self, context):
-        bpy.context.active_object.select_set(False)
-
-        # Check if grind node exists, if not return
-        if "Grinds" in bpy.data.objects:
-            grinds_pt = bpy.data.objects.get("Grinds")
-            for obj in bpy.data.objects:
-                if obj.parent == grinds_pt and obj.get('grind_spline') == 1:
-                    # If the property exists, query the parent, and parent object again
-                    grind_parent = bpy.data.objects[obj["grind_parent"]]
-                    if grind_parent is not None:
-                        bpy.data.objects[obj.name].select_set(True)
-                        grind_parent.select_set(True)
-                        bpy.context.view_layer.objects.active = grind_parent
-                        bpy.ops.object.parent_set(type="OBJECT")
-                        bpy.context.active_object.select_set(False)
+        from . import grinds
+
+        moved = grinds.reset_grinds(context.scene)
+        self.report({'INFO'}, "Reset {} grind splines".format(moved))
+        return {'FINISHED'}
+
+    def execute(self, context):
+        return_code = self._execute(context)
+        return return_code
+
+
+class SXLValidateGrinds(bpy.types.Operator):
+    bl_idname = "sxl.validate_grinds"
+    bl_label = "Validate Grinds"
+    bl_description = "Check the grind spline registry against the scene and rebuild it if it drifted"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @sxl_exception
+    def _execute(self, context):
+        from . import grinds
+
+        problems = grinds.validate_registry(context.scene)
+        if not problems:
+            self.report({'INFO'}, "{} grind splines registered".format(len(context.scene.SXL.grinds)))
+            return {'FINISHED'}
+        for problem in problems:
+            print("SXL GRINDS: {}".format(problem))
+        count = grinds.rebuild_registry(context.scene)
+        self.report({'WARNING'}, "Rebuilt grind registry, {} problems fixed, {} grind splines registered".format(
+            len(problems), count))
+        return {'FINISHED'}
+
+    def execute(self, context):
+        return_code = self._execute(context)
+        return return_code
+
+
+class SXLCompactGrinds(bpy.types.Operator):
+    bl_idname = "sxl.compact_grinds"
+    bl_label = "Compact Grind Splines"
+    bl_description = "Replace the point empties of every grind spline with a single point mesh, expanded at export"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @sxl_exception
+    def _execute(self, context):
+        from . import grinds
+
+        compacted = grinds.compact_grinds(context.scene)
+        self.report({'INFO'}, "Compacted {} grind splines".format(compacted))
+        return {'FINISHED'}
+
+    def execute(self, context):
+        return_code = self._execute(context)
+        return return_code
+
+
+class SXLCleanupGrinds(bpy.types.Operator):
+    bl_idname = "sxl.cleanup_grinds"
+    bl_label = "Clean Up Grind Splines"
+    bl_description = "Merge duplicate grind points, snap nearby spline ends together and remove overlapping segments"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @sxl_exception
+    def _execute(self, context):
+        from . import grinds
+
+        sxl = context.scene.SXL
+        stats = grinds.cleanup_grinds(context.scene, sxl.cleanup_tolerance, sxl.cleanup_snap_distance,
+                                      finalized_only=sxl.cleanup_scope == "GRINDS")
+        self.report({'INFO'}, "Grind points {} => {}: {} merged, {} ends snapped, {} segments dropped, "
+                              "{} trimmed, {} splines changed, {} removed, {} added".format(
+                                  stats["points_before"], stats["points_after"], stats["merged_points"],
+                                  stats["snapped_ends"], stats["dropped_segments"], stats["trimmed_segments"],
+                                  stats["changed_splines"], stats["removed_splines"], stats["added_splines"]))
+        if stats["collapsed"]:
+            for name in stats["collapsed"]:
+                print("SXL GRINDS: {} is shorter than the merge or snap distance, left as is".format(name))
+            self.report({'WARNING'}, "{} grind splines would collapse to a single point and were left as is, "
+                                     "see the console".format(len(stats["collapsed"])))
         return {'FINISHED'}
 
     def execute(self, context):
@@ -327,27 +549,124 @@ class SXLAssetExport(bpy.types.Operator, ExportHelper):
 
     @sxl_exception
     def _execute(self, context):
+        from . import export
+
         prefs = context.preferences.addons['skater-xl-mod-tools'].preferences
         try:
             if os.path.exists(os.path.split(self.filepath)[0]):
-                if not prefs.export_selected_flag:
-                    for obj in context.scene.objects:
-                        obj.select = obj.type in ['EMPTY', 'ARMATURE', 'MESH']
-                else:
-                    objects = context.selected_objects
-                    for obj in objects:
-                        print(obj)
-                        utils.get_children(obj, select=True)
-
-                bpy.ops.export_scene.fbx(filepath=self.filepath,
-                                         check_existing=True,
-                                         use_selection=prefs.export_selected_flag,
-                                         object_types={'EMPTY', 'ARMATURE', 'MESH'},
-                                         use_tspace=True)
-                self.report({'INFO'}, "Export Successful => {}".format(self.filepath))
+                context.scene.SXL.export_path = self.filepath
+                if prefs.export_mode != "SINGLE":
+                    return self.export_split(context, prefs)
+
+                sxl = context.scene.SXL
+                result = export.export_single(context, self.filepath, prefs.export_selected_flag,
+                                              incremental=prefs.export_incremental,
+                                              batch_cell_size=sxl.batch_cell_size if sxl.export_batching else 0.0)
+                if result["cached"]:
+                    self.report({'INFO'}, "Export Skipped => {} is unchanged (cache hit, {:.2f}s)".format(
+                        self.filepath, result["prepare_seconds"]))
+                    return {'FINISHED'}
+                print("SXL EXPORT: {} objects, {} batched, prepare {:.3f}s, fbx write {:.3f}s".format(
+                    result["objects"], result["batched"], result["prepare_seconds"], result["seconds"]))
+                self.report({'INFO'}, "Export Successful => {} (prepare {:.2f}s, write {:.2f}s)".format(
+                    self.filepath, result["prepare_seconds"], result["seconds"]))
         except Exception as e:
-            self.report({'ERROR'}, e)
+            self.report({'ERROR'}, str(e))
+
+        return {'FINISHED'}
+
+    def export_split(self, context, prefs):
+        from . import export
+
+        window_manager = context.window_manager
+        window_manager.progress_begin(0, 1)
+        try:
+            sxl = context.scene.SXL
+            manifest = export.export_split(context, self.filepath, prefs.export_mode,
+                                           prefs.export_selected_flag,
+                                           workers=prefs.worker_count,
+                                           incremental=prefs.export_incremental,
+                                           tile_size=sxl.export_tile_size,
+                                           batch_cell_size=sxl.batch_cell_size if sxl.export_batching else 0.0,
+                                           parallel_tiles=sxl.export_parallel_tiles,
+                                           progress=lambda done, total: window_manager.progress_update(
+                                               done / max(total, 1)))
+        except SXLWorkerError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        finally:
+            window_manager.progress_end()
+
+        cache = manifest["cache"]
+        print("SXL EXPORT: {} files, {} bytes, {} cache hits, {} misses, prepare {:.3f}s, total {:.3f}s".format(
+            len(manifest["files"]), manifest["total_size"], cache["hits"], cache["misses"],
+            manifest["prepare_seconds"], manifest["total_seconds"]))
+        self.report({'INFO'}, "Export Successful => {} written, {} unchanged ({:.2f}s)".format(
+            cache["misses"], cache["hits"], manifest["total_seconds"]))
+        return {'FINISHED'}
+
+    def execute(self, context):
+        return_code = self._execute(context)
+        return return_code
+
 
+class SXLBudgetReport(bpy.types.Operator, ExportHelper):
+    bl_idname = "sxl.budget_report"
+    bl_label = "Budget Report"
+    bl_description = "Write triangle, material, LOD, collision and grind point counts of the export, " \
+                     "flagging anything over budget. Saved as csv when the file name ends in .csv"
+
+    filename_ext = ".json"
+    check_extension = None
+    filter_glob = bpy.props.StringProperty(default="*.json;*.csv", options={'HIDDEN'}, maxlen=255)
+
+    @sxl_exception
+    def _execute(self, context):
+        from . import report
+
+        prefs = context.preferences.addons['skater-xl-mod-tools'].preferences
+        start = time.perf_counter()
+        objects = utils.get_export_objects(context, prefs.export_selected_flag)
+        budget_report = report.build_report(objects,
+                                            context.evaluated_depsgraph_get(),
+                                            utils.build_hierarchy(context.scene.objects),
+                                            report.get_budgets(context.scene.SXL))
+        report.write_report(budget_report, self.filepath)
+
+        totals = budget_report["totals"]
+        summary = "{} assets, {} triangles, {} grind points ({:.2f}s) => {}".format(
+            len(budget_report["assets"]), totals["triangles"], totals["grind_points"],
+            time.perf_counter() - start, self.filepath)
+        for violation in budget_report["violations"]:
+            print("SXL BUDGET: {}".format(violation))
+        if budget_report["violations"]:
+            self.report({'WARNING'}, "{} budget violations, {}".format(len(budget_report["violations"]), summary))
+        else:
+            self.report({'INFO'}, "Within budget, {}".format(summary))
+        return {'FINISHED'}
+
+    def execute(self, context):
+        return_code = self._execute(context)
+        return return_code
+
+
+class SXLClearExportCache(bpy.types.Operator):
+    bl_idname = "sxl.clear_export_cache"
+    bl_label = "Clear Export Cache"
+    bl_description = "Forget the content hashes of the last export location, so the next export writes every asset"
+
+    @sxl_exception
+    def _execute(self, context):
+        from . import export
+
+        export_path = context.scene.SXL.export_path
+        if not export_path:
+            self.report({'WARNING'}, "Nothing has been exported yet")
+            return {'CANCELLED'}
+        if export.clear_cache(export_path):
+            self.report({'INFO'}, "Cleared export cache => {}".format(export.get_cache_path(export_path)))
+        else:
+            self.report({'INFO'}, "No export cache next to {}".format(export_path))
         return {'FINISHED'}
 
     def execute(self, context):
@@ -357,19 +676,30 @@ class SXLAssetExport(bpy.types.Operator, ExportHelper):
 
 operations = [
     SXLGeneratePoints,
+    SXLDetectGrindEdges,
     SXLGenerateLODs,
+    SXLBatchGenerateLODs,
     SXLGenerateCollision,
     SXLFinalizeGrinds,
     SXLResetGrinds,
-    SXLAssetExport
+    SXLValidateGrinds,
+    SXLCompactGrinds,
+    SXLCleanupGrinds,
+    SXLAssetExport,
+    SXLBudgetReport,
+    SXLClearExportCache
 ]
 
 
 def register():
+    profiling.register()
+    meshcache.register()
     for op in operations:
-        utils.register(op)
+        utils.register(profiling.instrument(op))
 
 
 def unregister():
     for op in operations:
         bpy.utils.unregister_class(op)
+    profiling.unregister()
+    meshcache.unregister()
@@ -17,8 +17,7 @@ __status__ = "Development"
 
 import bpy
 
-from .ops import *
-from . import utils
+from . import profiling, utils
 
 
 class SXLPanel(bpy.types.Panel):
@@ -54,6 +53,17 @@ class SXLPanel(bpy.types.Panel):
         row.scale_y = 1.2
         row.prop(sxl, "audio_cues", text="")
 
+        row = column.row()
+        row.prop(sxl, "spline_resample", expand=True)
+        if sxl.spline_resample != "NONE":
+            row = column.row()
+            row.prop(sxl, "spline_tolerance")
+        if sxl.spline_resample == "UNIFORM":
+            row = column.row()
+            row.prop(sxl, "spline_spacing")
+
+        row = column.row()
+        row.prop(sxl, "spline_compact")
         row = column.row()
         row.separator()
         row = column.row()
@@ -61,11 +71,32 @@ class SXLPanel(bpy.types.Panel):
         row.operator("sxl.generate_points", icon="OUTLINER_DATA_EMPTY").audio_cue = sxl.audio_cues
         column.separator()
         row = column.row()
+        row.prop(sxl, "detect_angle")
+        row = column.row(align=True)
+        row.prop(sxl, "detect_min_length")
+        row.prop(sxl, "detect_min_height")
+        row = column.row()
+        row.scale_y = 1.2
+        row.operator("sxl.detect_grind_edges", icon="VIEWZOOM").audio_cue = sxl.audio_cues
+        column.separator()
+        row = column.row()
         row.scale_y = 1.2
         row.operator("sxl.finalize_grinds", icon="DECORATE_LOCKED")
         row = column.row()
         row.scale_y = 1.2
         row.operator("sxl.reset_grinds", icon="FILE_REFRESH")
+        row = column.row(align=True)
+        row.operator("sxl.validate_grinds", icon="CHECKMARK")
+        row.operator("sxl.compact_grinds", icon="VERTEXSEL")
+        column.separator()
+        row = column.row()
+        row.prop(sxl, "cleanup_scope", expand=True)
+        row = column.row(align=True)
+        row.prop(sxl, "cleanup_tolerance")
+        row.prop(sxl, "cleanup_snap_distance")
+        row = column.row()
+        row.scale_y = 1.2
+        row.operator("sxl.cleanup_grinds", icon="AUTOMERGE_ON")
 
 
 class SXLExperimentalPanel(bpy.types.Panel):
@@ -77,6 +108,7 @@ class SXLExperimentalPanel(bpy.types.Panel):
 
     def draw(self, context):
         prefs = context.preferences.addons['skater-xl-mod-tools'].preferences
+        sxl = context.scene.SXL
 
         layout = self.layout
 
@@ -87,8 +119,20 @@ class SXLExperimentalPanel(bpy.types.Panel):
                  icon_only=True, emboss=False)
         if prefs.lod_menu:
             row = box.row()
+            row.prop(sxl, "lod_mode", expand=True)
+            row = box.row()
+            if sxl.lod_mode == "BUDGET":
+                row.prop(sxl, "lod_targets")
+            else:
+                row.prop(sxl, "lod_count")
+            row = box.row()
             row.scale_y = 1.2
             row.operator("sxl.generate_lods", icon="MOD_EXPLODE")
+            row = box.row()
+            row.prop(sxl, "lod_batch_source", expand=True)
+            row = box.row()
+            row.scale_y = 1.2
+            row.operator("sxl.batch_generate_lods", icon="MOD_EXPLODE")
 
         box = layout.box()
         row = box.row()
@@ -97,6 +141,16 @@ class SXLExperimentalPanel(bpy.types.Panel):
                  icon_only=True, emboss=False)
         if prefs.collision_menu:
             row = box.row()
+            row.prop(sxl, "collision_mode", expand=True)
+            if sxl.collision_mode == "CONVEX":
+                column = box.column(align=True)
+                column.prop(sxl, "collision_max_hulls")
+                column.prop(sxl, "collision_max_hull_verts")
+                column.prop(sxl, "collision_concavity")
+            elif sxl.collision_mode == "PRIMITIVE":
+                row = box.row()
+                row.prop(sxl, "collision_loose_parts")
+            row = box.row()
             row.scale_y = 1.2
             row.operator("sxl.generate_collision", icon="AUTOMERGE_ON")
 
@@ -121,6 +175,47 @@ class SXLExportPanel(bpy.types.Panel):
         row = column.row(align=True)
         row.prop(prefs, "export_selected_flag", text="Export Selected")
         row.prop(prefs, "export_animation_flag", text="Export Animation")
+        row = column.row()
+        row.prop(prefs, "export_mode", expand=True)
+        if prefs.export_mode == "TILES":
+            row = column.row(align=True)
+            row.prop(context.scene.SXL, "export_tile_size")
+            row.prop(context.scene.SXL, "export_parallel_tiles")
+        row = column.row(align=True)
+        row.prop(prefs, "export_incremental")
+        row.operator("sxl.clear_export_cache", text="", icon="TRASH")
+        row = column.row(align=True)
+        row.prop(context.scene.SXL, "export_batching")
+        row.prop(context.scene.SXL, "batch_cell_size")
+
+        # Budgets
+        sxl = context.scene.SXL
+        box = layout.box()
+        column = box.column()
+        row = column.row()
+        row.label(text="Budgets (0 = unlimited)")
+        column.prop(sxl, "budget_triangles")
+        column.prop(sxl, "budget_materials")
+        column.prop(sxl, "budget_collision_triangles")
+        column.prop(sxl, "budget_total_triangles")
+        column.prop(sxl, "budget_total_grind_points")
+        row = column.row()
+        row.operator("sxl.budget_report", icon="TEXT")
+
+        # Profiling
+        box = layout.box()
+        column = box.column()
+        row = column.row(align=True)
+        row.prop(prefs, "profiling_enabled")
+        row.prop(prefs, "profiling_cprofile")
+        if prefs.profiling_enabled:
+            runs = list(profiling.RUNS)[-prefs.profiling_history:]
+            if not runs:
+                column.label(text="No runs recorded yet")
+            for run in reversed(runs):
+                column.label(text="{} {:.3f}s".format(run["operator"], run["seconds"]), icon="TIME")
+                column.label(text="    {} depsgraph updates, objects {} => {}".format(
+                    run["depsgraph_updates"], run["objects_before"], run["objects_after"]))
 
         # Export Asset
         row = layout.row()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Skater XL package build pipeline, the operator workflow without the UI.
+Stages run on the open .blend file with the Skater XL settings saved in its scene.
+"""
+# Ensure that compatibility is handled for python 2, 3
+from __future__ import division, print_function, absolute_import
+
+__author__ = "Greg Amato"
+__url__ = "https://gregamato.dev"
+__copyright__ = "Copyright 2019-2020, Greg Amato - Amatobahn"
+__credits__ = []
+__license__ = "GNU Public License"
+__maintainer__ = "Greg Amato"
+__status__ = "Development"
+
+import os
+import time
+import traceback
+
+import bpy
+
+from . import collision, export, grinds, lods, report, utils
+
+STAGES = ("lods", "collision", "grinds", "export", "report")
+
+
+def ensure_registered():
+    """Registers the scene properties when the add-on is not enabled, ie in a factory startup worker"""
+    if not hasattr(bpy.types.Scene, "SXL"):
+        from . import properties
+        properties.register()
+
+
+def is_source(obj):
+    return (obj.type == 'MESH' and "_collision" not in obj.name and not obj.get("grind_spline")
+            and not ('_LOD' in obj.name and not obj.name.endswith("_LOD0")))
+
+
+def has_collision(obj, hierarchy):
+    return any("_collision" in o.name or o.get("sxl_collider") for o in hierarchy.get(obj, []))
+
+
+def stage_lods(context, options):
+    sxl = context.scene.SXL
+    sources = [obj for obj in context.scene.objects if is_source(obj) and not obj.name.endswith("_LOD0")]
+    if sxl.lod_mode == "LIVE":
+        hierarchy = utils.build_hierarchy(context.scene.objects)
+        for obj in sources:
+            lods.make_live_lods(obj, sxl.lod_count, hierarchy)
+        return len(sources)
+    targets = lods.parse_lod_targets(sxl.lod_targets) if sxl.lod_mode == "BUDGET" else None
+    lods.batch_make_lods(sources, sxl.lod_count, targets)
+    return len(sources)
+
+
+def stage_collision(context, options):
+    hierarchy = utils.build_hierarchy(context.scene.objects)
+    sources = [obj for obj in context.scene.objects if is_source(obj) and not has_collision(obj, hierarchy)]
+    for obj in sources:
+        collision.make_collision(obj, context.scene.SXL)
+    return len(sources)
+
+
+def stage_grinds(context, options):
+    return grinds.finalize_grinds(context.scene, context.scene.collection)
+
+
+def stage_export(context, options):
+    filepath = os.path.join(options["output"], options["name"] + ".fbx")
+    sxl = context.scene.SXL
+    batch_cell_size = sxl.batch_cell_size if sxl.export_batching else 0.0
+    if options["export_mode"] == "SINGLE":
+        return export.export_single(context, filepath, False, incremental=options["incremental"],
+                                    batch_cell_size=batch_cell_size)
+    manifest = export.export_split(context, filepath, options["export_mode"], False,
+                                   incremental=options["incremental"],
+                                   tile_size=sxl.export_tile_size,
+                                   batch_cell_size=batch_cell_size)
+    return len(manifest["files"])
+
+
+def stage_report(context, options):
+    objects = utils.get_export_objects(context, False)
+    budget_report = report.build_report(objects,
+                                        context.evaluated_depsgraph_get(),
+                                        utils.build_hierarchy(context.scene.objects),
+                                        report.get_budgets(context.scene.SXL))
+    report.write_report(budget_report, os.path.join(options["output"], options["name"] + "_report.json"))
+    if budget_report["violations"] and options["fail_on_budget"]:
+        raise RuntimeError("{} budget violations:\n{}".format(
+            len(budget_report["violations"]), "\n".join(budget_report["violations"])))
+    return len(budget_report["violations"])
+
+
+STAGE_FUNCTIONS = {
+    "lods": stage_lods,
+    "collision": stage_collision,
+    "grinds": stage_grinds,
+    "export": stage_export,
+    "report": stage_report,
+}
+
+
+def run_stages(stages, options):
+    """
+    Runs pipeline stages on the open .blend file, stopping at the first failing stage
+    Args:
+        stages: Stage names, see STAGES
+        options: Dictionary with output, export_mode, incremental, fail_on_budget and save
+
+    Returns: Result dictionary with file, ok, error and a {stage: seconds} timings dictionary
+    """
+    ensure_registered()
+    context = bpy.context
+    path = bpy.data.filepath
+    options = dict(options, name=os.path.splitext(os.path.basename(path))[0])
+    os.makedirs(options["output"], exist_ok=True)
+    result = {"file": path, "ok": True, "error": None, "timings": {}, "stages": {}}
+    for stage in stages:
+        start = time.perf_counter()
+        try:
+            value = STAGE_FUNCTIONS[stage](context, options)
+        except Exception:
+            result["ok"] = False
+            result["error"] = "{} failed:\n{}".format(stage, traceback.format_exc())
+            break
+        finally:
+            result["timings"][stage] = time.perf_counter() - start
+        result["stages"][stage] = value if isinstance(value, (int, float)) else value.get("file")
+    if result["ok"] and options.get("save"):
+        bpy.ops.wm.save_mainfile()
+    return result
+
+
+def format_result(result):
+    """
+    Formats per stage timings of a result for the build log
+    Args:
+        result: Dictionary from run_stages
+
+    Returns: Log line
+    """
+    timings = " ".join("{} {:.2f}s".format(stage, seconds) for stage, seconds in result["timings"].items())
+    return "SXL PIPELINE: {} [{}] {} total {:.2f}s".format(
+        os.path.basename(result["file"]), "OK" if result["ok"] else "FAILED", timings,
+        sum(result["timings"].values()))
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Skater XL package operator profiling.
+
+Operators registered through ops.register are wrapped by instrument. When profiling is
+enabled in the add-on preferences, every run records wall time, the datablocks the depsgraph
+updated for it and object counts, optionally with a cProfile capture.
+"""
+# Ensure that compatibility is handled for python 2, 3
+from __future__ import division, print_function, absolute_import
+
+__author__ = "Greg Amato"
+__url__ = "https://gregamato.dev"
+__copyright__ = "Copyright 2019-2020, Greg Amato - Amatobahn"
+__credits__ = []
+__license__ = "GNU Public License"
+__maintainer__ = "Greg Amato"
+__status__ = "Development"
+
+import collections
+import functools
+import os
+import tempfile
+import time
+
+import bpy
+
+ADDON = "skater-xl-mod-tools"
+
+# Runs of this session, newest last
+RUNS = collections.deque(maxlen=100)
+
+_depsgraph_updates = [0]
+
+
+@bpy.app.handlers.persistent
+def count_depsgraph_update(scene, depsgraph=None):
+    # Counts updated datablocks rather than handler calls, one evaluation can update many
+    _depsgraph_updates[0] += len(depsgraph.updates) if depsgraph is not None else 1
+
+
+def get_prefs(context):
+    addon = context.preferences.addons.get(ADDON)
+    return addon.preferences if addon is not None else None
+
+
+def get_profile_path(prefs, bl_idname):
+    directory = bpy.path.abspath(prefs.profiling_dir) if prefs.profiling_dir else tempfile.gettempdir()
+    return os.path.join(directory, "{}_{}_{}.prof".format(bl_idname.replace(".", "_"),
+                                                          time.strftime("%Y%m%d_%H%M%S"), len(RUNS)))
+
+
+def profile_call(bl_idname, execute, operator, context, prefs):
+    """
+    Runs an operator execute and records a profiling run
+    Args:
+        bl_idname: Operator id, ie "sxl.generate_lods"
+        execute: Original execute function
+        operator: Operator instance
+        context: Blender context
+        prefs: Add-on preferences
+
+    Returns: Operator return value
+    """
+    import cProfile
+
+    run = {
+        "operator": bl_idname,
+        "objects_before": len(bpy.data.objects),
+        "profile": None,
+    }
+    profiler = cProfile.Profile() if prefs.profiling_cprofile else None
+    updates = _depsgraph_updates[0]
+    start = time.perf_counter()
+    try:
+        if profiler is not None:
+            return profiler.runcall(execute, operator, context)
+        return execute(operator, context)
+    finally:
+        run["seconds"] = time.perf_counter() - start
+        # Changes made by execute are usually evaluated after the operator returns,
+        # evaluate them now so they are counted with this run
+        if context.view_layer is not None:
+            context.view_layer.update()
+        run["depsgraph_updates"] = _depsgraph_updates[0] - updates
+        run["objects_after"] = len(bpy.data.objects)
+        if profiler is not None:
+            run["profile"] = get_profile_path(prefs, bl_idname)
+            profiler.dump_stats(run["profile"])
+        RUNS.append(run)
+        print("SXL PROFILE: {}".format(describe_run(run)))
+
+
+def describe_run(run):
+    text = "{} {:.3f}s, {} depsgraph updates, objects {} => {}".format(
+        run["operator"], run["seconds"], run["depsgraph_updates"], run["objects_before"], run["objects_after"])
+    if run["profile"]:
+        text += ", profile {}".format(run["profile"])
+    return text
+
+
+def instrument(cls):
+    """
+    Wraps an operator's execute so runs are recorded while profiling is enabled
+    Args:
+        cls: Operator class
+
+    Returns: The operator class
+    """
+    execute = cls.execute
+    if getattr(execute, "sxl_instrumented", False):
+        return cls
+
+    @functools.wraps(execute)
+    def wrapper(self, context):
+        prefs = get_prefs(context)
+        if prefs is None or not prefs.profiling_enabled:
+            return execute(self, context)
+        return profile_call(cls.bl_idname, execute, self, context, prefs)
+
+    wrapper.sxl_instrumented = True
+    cls.execute = wrapper
+    return cls
+
+
+def register():
+    if count_depsgraph_update not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(count_depsgraph_update)
+
+
+def unregister():
+    if count_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(count_depsgraph_update)
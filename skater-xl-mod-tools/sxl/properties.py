@@ -15,11 +15,18 @@ __license__ = "GNU Public License"
 __maintainer__ = "Greg Amato"
 __status__ = "Development"
 
+import os
+
 import bpy
 
 from . import utils
 
 
+class SXLGrindEntry(bpy.types.PropertyGroup):
+    root = bpy.props.PointerProperty(type=bpy.types.Object, name="Grind Root")
+    owner = bpy.props.PointerProperty(type=bpy.types.Object, name="Owner")
+
+
 class SXLSceneProperties(bpy.types.PropertyGroup):
 
     # MAIN PANEL PROPERTIES
@@ -34,10 +41,217 @@ class SXLSceneProperties(bpy.types.PropertyGroup):
         name="Audio Cue Material",
         description="Audio Cue for grind type"
     )
+    grinds = bpy.props.CollectionProperty(type=SXLGrindEntry)
+    grind_counter = bpy.props.IntProperty(
+        default=0,
+        min=0,
+        options={'HIDDEN'},
+        name="Grind Spline Counter",
+        description="Number of the last grind spline, used to build unique point names"
+    )
+    spline_resample = bpy.props.EnumProperty(
+        items=[
+            ("NONE", "Every Vertex", "Create a grind point for every selected vertex", "", 0),
+            ("SIMPLIFY", "Simplify", "Keep only the vertices needed to stay within the max deviation", "", 1),
+            ("UNIFORM", "Uniform", "Evenly spaced points along the spline, within the max deviation", "", 2),
+        ],
+        default="NONE",
+        name="Resample",
+        description="How grind points are placed along the selected edges"
+    )
+    spline_tolerance = bpy.props.FloatProperty(
+        default=0.01,
+        min=0.0,
+        subtype="DISTANCE",
+        name="Max Deviation",
+        description="Maximum distance between the selected edges and the resampled spline"
+    )
+    spline_spacing = bpy.props.FloatProperty(
+        default=0.5,
+        min=0.001,
+        subtype="DISTANCE",
+        name="Spacing",
+        description="Maximum distance between uniformly resampled points"
+    )
+    spline_compact = bpy.props.BoolProperty(
+        default=False,
+        name="Compact Splines",
+        description="Build each grind spline as a single point mesh instead of an empty per point. "
+                    "Points are expanded to empties only while exporting"
+    )
+    cleanup_tolerance = bpy.props.FloatProperty(
+        default=0.01,
+        min=0.0,
+        subtype="DISTANCE",
+        name="Merge Distance",
+        description="Grind points closer than this are merged into one"
+    )
+    cleanup_snap_distance = bpy.props.FloatProperty(
+        default=0.1,
+        min=0.0,
+        subtype="DISTANCE",
+        name="Snap Distance",
+        description="Spline ends closer than this to another spline end are snapped together"
+    )
+    cleanup_scope = bpy.props.EnumProperty(
+        items=[
+            ("SCENE", "Scene", "Clean every grind spline in the scene", "", 0),
+            ("GRINDS", "Grinds Node", "Only clean grind splines finalized under the Grinds node", "", 1),
+        ],
+        default="SCENE",
+        name="Cleanup Scope",
+        description="Grind splines to clean up"
+    )
+    detect_angle = bpy.props.FloatProperty(
+        default=0.785398,  # 45 degrees
+        min=0.0,
+        max=3.141593,
+        subtype="ANGLE",
+        name="Min Edge Angle",
+        description="Minimum angle between the two faces of a grindable edge"
+    )
+    detect_min_length = bpy.props.FloatProperty(
+        default=0.5,
+        min=0.0,
+        subtype="DISTANCE",
+        name="Min Length",
+        description="Shorter chains of grindable edges are ignored"
+    )
+    detect_min_height = bpy.props.FloatProperty(
+        default=0.05,
+        min=0.0,
+        subtype="DISTANCE",
+        name="Min Height",
+        description="Minimum height of a grindable edge above the lowest point of its mesh"
+    )
+
+    # LOD PROPERTIES
+    lod_mode = bpy.props.EnumProperty(
+        items=[("ANGLE", "Angle", "Dissolve by an increasing angle per level", "", 0),
+               ("BUDGET", "Budget", "Decimate each level to a triangle target", "", 1),
+               ("LIVE", "Live", "Keep live modifiers on LOD children, evaluated only at export", "", 2)],
+        name="LOD Mode",
+        description="How LOD levels are reduced"
+    )
+    lod_targets = bpy.props.StringProperty(
+        default="50%, 25%, 10%",
+        name="Targets",
+        description="Triangle target per LOD level. Percentages are relative to LOD0, numbers are triangle counts"
+    )
+    lod_count = bpy.props.IntProperty(
+        default=3,
+        min=1,
+        max=8,
+        name="LOD Count",
+        description="Number of LOD levels generated below LOD0"
+    )
+    lod_batch_source = bpy.props.EnumProperty(
+        items=[("SELECTED", "Selected", "Every selected mesh", "", 0),
+               ("COLLECTION", "Collection", "Every mesh in the active collection", "", 1)],
+        name="Batch Source",
+        description="Objects to generate LODs for in batch mode"
+    )
+
+    # COLLISION PROPERTIES
+    collision_mode = bpy.props.EnumProperty(
+        items=[("MESH", "Mesh", "Single simplified copy of the render mesh", "", 0),
+               ("CONVEX", "Convex", "Small set of convex hulls", "", 1),
+               ("PRIMITIVE", "Primitive", "Boxes, capsules and planes fitted to the mesh", "", 2)],
+        name="Collision Mode",
+        description="Type of collision shape to generate"
+    )
+    collision_max_hulls = bpy.props.IntProperty(
+        default=16,
+        min=1,
+        max=256,
+        name="Max Hulls",
+        description="Maximum number of convex hulls"
+    )
+    collision_max_hull_verts = bpy.props.IntProperty(
+        default=32,
+        min=4,
+        max=255,
+        name="Max Hull Vertices",
+        description="Maximum number of vertices per convex hull"
+    )
+    collision_loose_parts = bpy.props.BoolProperty(
+        default=True,
+        name="Per Loose Part",
+        description="Fit one primitive per loose part instead of one for the whole mesh"
+    )
+    collision_concavity = bpy.props.FloatProperty(
+        default=0.05,
+        min=0.0,
+        subtype="DISTANCE",
+        name="Max Concavity",
+        description="Hulls are split until no surface point is deeper than this inside its hull"
+    )
+
+    # BUDGET PROPERTIES, 0 is unlimited
+    budget_triangles = bpy.props.IntProperty(
+        default=0,
+        min=0,
+        name="Triangles",
+        description="Maximum LOD0 triangles per asset"
+    )
+    budget_materials = bpy.props.IntProperty(
+        default=0,
+        min=0,
+        name="Materials",
+        description="Maximum material slots per asset"
+    )
+    budget_collision_triangles = bpy.props.IntProperty(
+        default=0,
+        min=0,
+        name="Collision Triangles",
+        description="Maximum collision mesh triangles per asset"
+    )
+    budget_total_triangles = bpy.props.IntProperty(
+        default=0,
+        min=0,
+        name="Total Triangles",
+        description="Maximum LOD0 triangles of the whole export"
+    )
+    budget_total_grind_points = bpy.props.IntProperty(
+        default=0,
+        min=0,
+        name="Total Grind Points",
+        description="Maximum grind points of the whole export"
+    )
 
     # EXPORTER PROPERTIES
     export_selected_flag = bpy.props.BoolProperty(default=False)
     export_animation_flag = bpy.props.BoolProperty(default=False)
+    export_path = bpy.props.StringProperty(
+        subtype="FILE_PATH",
+        name="Last Export",
+        description="File the last export was written to, its folder holds the export cache"
+    )
+    export_batching = bpy.props.BoolProperty(
+        default=False,
+        name="Static Batching",
+        description="Merge static props sharing materials and a cell into combined meshes in each exported file"
+    )
+    batch_cell_size = bpy.props.FloatProperty(
+        default=32.0,
+        min=1.0,
+        subtype="DISTANCE",
+        name="Cell Size",
+        description="Size of the cells static props are batched in"
+    )
+    export_tile_size = bpy.props.FloatProperty(
+        default=64.0,
+        min=1.0,
+        subtype="DISTANCE",
+        name="Tile Size",
+        description="Size of the grid tiles of a tiled export"
+    )
+    export_parallel_tiles = bpy.props.BoolProperty(
+        default=False,
+        name="Parallel Tiles",
+        description="Write tiles with the worker pool. Every worker opens the whole file, "
+                    "so tiles are written one at a time in process by default"
+    )
 
 
 class SXLAddonPreferences(bpy.types.AddonPreferences):
@@ -52,8 +266,58 @@ class SXLAddonPreferences(bpy.types.AddonPreferences):
     # EXPORT PREFERENCES
     export_selected_flag = bpy.props.BoolProperty(default=False)
     export_animation_flag = bpy.props.BoolProperty(default=False)
+    export_mode = bpy.props.EnumProperty(
+        items=[
+            ("SINGLE", "Single File", "Export everything to one fbx", "", 0),
+            ("OBJECT", "Per Object", "Export one fbx per top-level object with its children and grinds", "", 1),
+            ("COLLECTION", "Per Collection", "Export one fbx per collection", "", 2),
+            ("TILES", "Tiled", "Export one fbx per grid tile of the map, with a tile index", "", 3),
+        ],
+        default="SINGLE",
+        name="Export Mode",
+        description="How the export is split into fbx files"
+    )
+    export_incremental = bpy.props.BoolProperty(
+        default=True,
+        name="Skip Unchanged",
+        description="Only write assets whose content changed since the last export to the same folder"
+    )
     # export_save = bpy.props.BoolProperty(default=False)
 
+    # BATCH PREFERENCES
+    worker_count = bpy.props.IntProperty(
+        default=max(1, (os.cpu_count() or 2) - 1),
+        min=1,
+        max=64,
+        name="Worker Processes",
+        description="Number of background blender processes used by batch operations"
+    )
+
+    # PROFILING PREFERENCES
+    profiling_enabled = bpy.props.BoolProperty(
+        default=False,
+        name="Profile Operators",
+        description="Record wall time, depsgraph updates and object counts of every Skater XL operator"
+    )
+    profiling_cprofile = bpy.props.BoolProperty(
+        default=False,
+        name="Capture cProfile",
+        description="Also capture a cProfile of every run, saved as a .prof file"
+    )
+    profiling_dir = bpy.props.StringProperty(
+        default="",
+        subtype="DIR_PATH",
+        name="Profile Folder",
+        description="Folder for cProfile captures, defaults to the temporary folder"
+    )
+    profiling_history = bpy.props.IntProperty(
+        default=5,
+        min=1,
+        max=100,
+        name="Runs Shown",
+        description="Number of recent runs shown in the export panel"
+    )
+
     def draw(self, context):
         layout = self.layout
         column = layout.column()
@@ -63,9 +327,23 @@ class SXLAddonPreferences(bpy.types.AddonPreferences):
         box.row().prop(self, "export_save", text="Save On Export")
         box.row().prop(self, "export_selected_flag", text="Export Selected")
         box.row().prop(self, "export_animation_flag", text="Export Animation")
+        box.row().prop(self, "export_mode")
+        box.row().prop(self, "export_incremental")
+
+        box = column.box()
+        box.row().label(text="Batch Options")
+        box.row().prop(self, "worker_count")
+
+        box = column.box()
+        box.row().label(text="Profiling")
+        box.row().prop(self, "profiling_enabled")
+        box.row().prop(self, "profiling_cprofile")
+        box.row().prop(self, "profiling_dir")
+        box.row().prop(self, "profiling_history")
 
 
 properties = [
+    SXLGrindEntry,
     SXLSceneProperties,
     SXLAddonPreferences
 ]
@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Skater XL package export budget report.
+"""
+# Ensure that compatibility is handled for python 2, 3
+from __future__ import division, print_function, absolute_import
+
+__author__ = "Greg Amato"
+__url__ = "https://gregamato.dev"
+__copyright__ = "Copyright 2019-2020, Greg Amato - Amatobahn"
+__credits__ = []
+__license__ = "GNU Public License"
+__maintainer__ = "Greg Amato"
+__status__ = "Development"
+
+import csv
+import json
+import re
+
+import numpy as np
+
+from . import utils
+
+LOD_PATTERN = re.compile(r"_LOD(\d+)$")
+
+CSV_FIELDS = ["name", "triangles", "vertices", "materials", "lod_triangles", "lod_ratios",
+              "collision_triangles", "colliders", "grind_splines", "grind_points", "violations"]
+
+
+def mesh_stats(mesh):
+    """
+    Counts the triangles and vertices a mesh exports as, from a bulk read of polygon sizes
+    Args:
+        mesh: Mesh datablock, evaluated or not
+
+    Returns: Tuple of (triangles, vertices)
+    """
+    loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+    return int(loop_totals.sum()) - 2 * len(loop_totals), len(mesh.vertices)
+
+
+def get_lod_level(obj):
+    match = LOD_PATTERN.search(obj.name)
+    return int(match.group(1)) if match else 0
+
+
+def is_collision(obj):
+    return "_collision" in obj.name or obj.get("collision_convex") == 1
+
+
+def new_entry(name):
+    return {
+        "name": name,
+        "triangles": 0,
+        "vertices": 0,
+        "materials": 0,
+        "lod_triangles": [],
+        "lod_ratios": [],
+        "collision_triangles": 0,
+        "colliders": 0,
+        "grind_splines": 0,
+        "grind_points": 0,
+        "violations": [],
+    }
+
+
+def build_report(objects, depsgraph, hierarchy, budgets=None):
+    """
+    Collects export statistics for each asset. LOD, collision and grind objects are
+    counted on the asset they belong to.
+    Args:
+        objects: Export objects, see utils.get_export_objects
+        depsgraph: Evaluated depsgraph, so counts match what the exporter writes
+        hierarchy: Index from utils.build_hierarchy, used to count grind points
+        budgets: Optional dictionary of limits, see check_budgets
+
+    Returns: Report dictionary with assets, totals and violations
+    """
+    assets = {}
+    owners = {}
+
+    def owner_of(obj):
+        # LOD and collision objects are children of the asset they belong to
+        while obj.parent is not None and (get_lod_level(obj) or is_collision(obj) or obj.get("sxl_collider")):
+            obj = obj.parent
+        name = utils.get_base_name(obj.name)
+        if name not in assets:
+            assets[name] = new_entry(name)
+        owners[obj.name] = assets[name]
+        return assets[name]
+
+    grind_roots = []
+    for obj in objects:
+        if obj.get("grind_spline") == 1:
+            grind_roots.append(obj)
+            continue
+        if obj.type == "EMPTY":
+            if obj.get("sxl_collider"):
+                owner_of(obj)["colliders"] += 1
+            continue
+        if obj.type != "MESH":
+            continue
+
+        triangles, vertices = mesh_stats(obj.evaluated_get(depsgraph).data)
+        entry = owner_of(obj)
+        level = get_lod_level(obj)
+        if is_collision(obj):
+            entry["collision_triangles"] += triangles
+        elif level:
+            entry["lod_triangles"].append((level, triangles))
+        else:
+            entry["triangles"] += triangles
+            entry["vertices"] += vertices
+            entry["materials"] = max(entry["materials"], len(obj.material_slots))
+
+    # Grind roots may be finalized under the Grinds node, they are matched by their owner name
+    for root in grind_roots:
+        owner = root.get("grind_parent", "")
+        entry = owners.get(owner) or assets.get(utils.get_base_name(owner))
+        if entry is None:
+            entry = assets.setdefault(owner, new_entry(owner))
+        entry["grind_splines"] += 1
+        entry["grind_points"] += len(root.data.vertices) if root.type == "MESH" else len(hierarchy.get(root, []))
+
+    for entry in assets.values():
+        entry["lod_triangles"] = [triangles for level, triangles in sorted(entry["lod_triangles"])]
+        entry["lod_ratios"] = [round(triangles / max(entry["triangles"], 1), 4)
+                               for triangles in entry["lod_triangles"]]
+
+    totals = new_entry("TOTAL")
+    for entry in assets.values():
+        for key in ("triangles", "vertices", "materials", "collision_triangles", "colliders",
+                    "grind_splines", "grind_points"):
+            totals[key] += entry[key]
+    del totals["lod_triangles"], totals["lod_ratios"]
+
+    report = {"assets": sorted(assets.values(), key=lambda e: e["name"]), "totals": totals}
+    report["violations"] = check_budgets(report, budgets or {})
+    return report
+
+
+def get_budgets(sxl):
+    """
+    Reads the budget limits from the scene properties
+    Args:
+        sxl: Scene SXL properties
+
+    Returns: Dictionary of limits, see check_budgets
+    """
+    return {
+        "triangles": sxl.budget_triangles,
+        "materials": sxl.budget_materials,
+        "collision_triangles": sxl.budget_collision_triangles,
+        "total_triangles": sxl.budget_total_triangles,
+        "total_grind_points": sxl.budget_total_grind_points,
+    }
+
+
+def check_budgets(report, budgets):
+    """
+    Flags assets and totals over budget. A limit of 0 is not checked.
+    Args:
+        report: Report from build_report, violations are added to each asset
+        budgets: Dictionary of limits: triangles, materials, collision_triangles
+                 per asset, total_triangles and total_grind_points for the export
+
+    Returns: List of violation descriptions
+    """
+    violations = []
+
+    def flag(entry, message):
+        entry["violations"].append(message)
+        violations.append("{}: {}".format(entry["name"], message))
+
+    for entry in report["assets"]:
+        for key in ("triangles", "materials", "collision_triangles"):
+            limit = budgets.get(key, 0)
+            if limit and entry[key] > limit:
+                flag(entry, "{} {} > {}".format(key, entry[key], limit))
+        previous = entry["triangles"]
+        for level, triangles in enumerate(entry["lod_triangles"]):
+            if previous and triangles >= previous:
+                flag(entry, "LOD{} is not reduced ({} >= {})".format(level + 1, triangles, previous))
+            previous = triangles
+
+    totals = report["totals"]
+    for key in ("triangles", "grind_points"):
+        limit = budgets.get("total_" + key, 0)
+        if limit and totals[key] > limit:
+            flag(totals, "total {} {} > {}".format(key, totals[key], limit))
+    return violations
+
+
+def write_report(report, filepath):
+    """
+    Writes a report as csv when filepath ends in .csv, json otherwise
+    Args:
+        report: Report from build_report
+        filepath: Output path
+    """
+    if filepath.lower().endswith(".csv"):
+        with open(filepath, "w", newline="") as report_file:
+            writer = csv.DictWriter(report_file, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            for entry in report["assets"] + [report["totals"]]:
+                row = dict(entry)
+                for key in ("lod_triangles", "lod_ratios", "violations"):
+                    row[key] = ";".join(str(value) for value in entry.get(key, []))
+                writer.writerow(row)
+    else:
+        with open(filepath, "w") as report_file:
+            json.dump(report, report_file, indent=2)
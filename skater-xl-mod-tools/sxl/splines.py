@@ -0,0 +1,431 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Skater XL package spline utilities.
+"""
+# Ensure that compatibility is handled for python 2, 3
+from __future__ import division, print_function, absolute_import
+
+__author__ = "Greg Amato"
+__url__ = "https://gregamato.dev"
+__copyright__ = "Copyright 2019-2020, Greg Amato - Amatobahn"
+__credits__ = []
+__license__ = "GNU Public License"
+__maintainer__ = "Greg Amato"
+__status__ = "Development"
+
+import numpy as np
+
+
+def build_adjacency(edges):
+    """
+    Build a vertex adjacency map from a list of edges
+    Args:
+        edges: Iterable of (vertex, vertex) pairs. Vertices can be indices or BMVerts
+
+    Returns: Dictionary of vertex => list of connected vertices
+    """
+    adjacency = {}
+    for v0, v1 in edges:
+        adjacency.setdefault(v0, []).append(v1)
+        adjacency.setdefault(v1, []).append(v0)
+    return adjacency
+
+
+def split_edge_chains(edges):
+    """
+    Split edges into ordered chains in a single linear pass.
+    Chains are broken at end points and junctions (vertices with more than two edges),
+    closed loops are returned with their first vertex repeated at the end.
+    Args:
+        edges: Iterable of (vertex, vertex) pairs
+
+    Returns: List of ordered vertex lists
+    """
+    adjacency = build_adjacency(edges)
+    chains = []
+    visited = set()
+    chain_ends = set()
+
+    def walk(start, to_vert):
+        chain = [start]
+        previous = start
+        current = to_vert
+        while True:
+            chain.append(current)
+            linked = adjacency[current]
+            if len(linked) != 2 or current == start:
+                chain_ends.add((current, previous))
+                return chain
+            visited.add(current)
+            to_vert = linked[1] if linked[0] == previous else linked[0]
+            previous, current = current, to_vert
+
+    # Open chains and branches, walked from every end point and junction
+    for vert, linked in adjacency.items():
+        if len(linked) != 2:
+            for to_vert in linked:
+                if to_vert not in visited and (vert, to_vert) not in chain_ends:
+                    chains.append(walk(vert, to_vert))
+
+    # Whatever remains is made of closed loops
+    for vert, linked in adjacency.items():
+        if len(linked) == 2 and vert not in visited:
+            visited.add(vert)
+            chains.append(walk(vert, linked[0]))
+
+    return chains
+
+
+def segment_distances(points, starts, ends):
+    """
+    Distances from each point to its matching segment, vectorized
+    Args:
+        points: (N, 3) array of points
+        starts: (N, 3) array of segment starts
+        ends: (N, 3) array of segment ends
+
+    Returns: (N,) array of distances
+    """
+    direction = ends - starts
+    length_sq = np.einsum("ij,ij->i", direction, direction)
+    t = np.einsum("ij,ij->i", points - starts, direction) / np.where(length_sq > 0.0, length_sq, 1.0)
+    closest = starts + direction * np.clip(t, 0.0, 1.0)[:, None]
+    return np.linalg.norm(points - closest, axis=1)
+
+
+def simplify_chain(points, tolerance):
+    """
+    Douglas-Peucker simplification of an ordered chain.
+    Keeps the end points and only the points needed to stay within tolerance of the original.
+    Args:
+        points: Ordered chain positions, (N, 3) array or list of vectors
+        tolerance: Maximum distance between the original points and the simplified chain
+
+    Returns: (M, 3) array of kept points, M <= N
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) < 3:
+        return points
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        inner = points[first + 1:last]
+        distances = segment_distances(inner,
+                                      np.broadcast_to(points[first], inner.shape),
+                                      np.broadcast_to(points[last], inner.shape))
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            split = first + 1 + index
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return points[keep]
+
+
+def arc_lengths(points):
+    """
+    Cumulative arc length at each point of a chain
+    Args:
+        points: (N, 3) array of ordered points
+
+    Returns: (N,) array starting at 0
+    """
+    return np.concatenate(([0.0], np.cumsum(np.linalg.norm(np.diff(points, axis=0), axis=1))))
+
+
+def resample_chain(points, spacing, tolerance=None):
+    """
+    Resamples an ordered chain to evenly spaced points along its length.
+    When tolerance is given, spacing is halved until the resampled chain is within tolerance
+    of every original point, falling back to the original points.
+    Args:
+        points: Ordered chain positions, (N, 3) array or list of vectors
+        spacing: Maximum distance between resampled points
+        tolerance: Optional maximum distance between the original points and the resampled chain
+
+    Returns: (M, 3) array of resampled points
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) < 3 or spacing <= 0.0:
+        return points
+    lengths = arc_lengths(points)
+    total = lengths[-1]
+    if total <= 0.0:
+        return points[:1]
+
+    count = max(1, int(np.ceil(total / spacing)))
+    while count < len(points) - 1:
+        samples = np.linspace(0.0, total, count + 1)
+        resampled = np.column_stack([np.interp(samples, lengths, points[:, axis]) for axis in range(3)])
+        if tolerance is None:
+            return resampled
+        # Each original point is checked against the resampled segment spanning its arc length
+        segment = np.clip(np.searchsorted(samples, lengths, side="right") - 1, 0, count - 1)
+        if segment_distances(points, resampled[segment], resampled[segment + 1]).max() <= tolerance:
+            return resampled
+        count *= 2
+    return points
+
+
+# Neighbour cells after a cell, each pair of neighbouring cells is visited once
+HALF_NEIGHBOURS = [(x, y, z) for x in (-1, 0, 1) for y in (-1, 0, 1) for z in (-1, 0, 1) if (x, y, z) > (0, 0, 0)]
+
+
+def find_pairs(points, radius):
+    """
+    Finds every pair of points within radius of each other, vectorized over a grid of
+    radius sized cells: points are sorted by cell and matched against their neighbour cells
+    Args:
+        points: (N, 3) array of points
+        radius: Pair distance
+
+    Returns: Tuple of (first, second) index arrays, with first < second
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    if len(points) < 2:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    # Cells can grow past radius, so the cell ids of huge, sparse scenes still fit an int64
+    low = points.min(axis=0)
+    cell_size = max(radius, (points.max(axis=0) - low).max() / 2 ** 20, 1e-9)
+    cells = np.floor((points - low) / cell_size).astype(np.int64) + 1
+    dims = cells.max(axis=0) + 2
+    ids = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    order = np.argsort(ids, kind="stable")
+    sorted_ids = ids[order]
+
+    firsts, seconds = [], []
+    for offset in [(0, 0, 0)] + HALF_NEIGHBOURS:
+        target = ids + (offset[0] * dims[1] + offset[1]) * dims[2] + offset[2]
+        lows = np.searchsorted(sorted_ids, target, side="left")
+        counts = np.searchsorted(sorted_ids, target, side="right") - lows
+        first = np.repeat(np.arange(len(points)), counts)
+        second = order[np.repeat(lows - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())]
+        keep = first < second if offset == (0, 0, 0) else first != second
+        keep &= np.linalg.norm(points[first] - points[second], axis=1) <= radius
+        firsts.append(np.minimum(first[keep], second[keep]))
+        seconds.append(np.maximum(first[keep], second[keep]))
+    return np.concatenate(firsts), np.concatenate(seconds)
+
+
+def cluster_points(points, radius):
+    """
+    Clusters points closer than radius. Each unclustered point, in order, claims every
+    unclustered point within radius. Runs in O(N log N) for well spread points.
+    Args:
+        points: (N, 3) array of points
+        radius: Clustering distance
+
+    Returns: Tuple of (cluster id per point, array of cluster centers)
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    first, second = find_pairs(points, radius)
+    order = np.lexsort((second, first))
+    first, second = first[order], second[order]
+    bounds = np.searchsorted(first, np.arange(len(points) + 1)).tolist()
+    # A point only claims later points, earlier ones already have a cluster
+    labels = [-1] * len(points)
+    count = 0
+    for i in range(len(points)):
+        if labels[i] >= 0:
+            continue
+        labels[i] = count
+        for j in second[bounds[i]:bounds[i + 1]].tolist():
+            if labels[j] < 0:
+                labels[j] = count
+        count += 1
+    labels = np.array(labels, dtype=np.int64)
+    sizes = np.bincount(labels, minlength=count)[:, None]
+    centers = np.column_stack([np.bincount(labels, points[:, axis], minlength=count) for axis in range(3)])
+    return labels, (centers / np.maximum(sizes, 1)).reshape(-1, 3)
+
+
+def collapse_repeats(chain):
+    """
+    Drops consecutive repeats from a chain of cluster ids
+    Args:
+        chain: Array of cluster ids
+
+    Returns: Array of cluster ids
+    """
+    if len(chain) < 2:
+        return chain
+    return chain[np.concatenate([[True], chain[1:] != chain[:-1]])]
+
+
+def merge_chains(chains, tolerance, snap_distance):
+    """
+    Merges the near coincident points of several chains, then snaps chain ends together.
+    Ends only snap to other ends, so a chain passing by an end is left in place.
+    Args:
+        chains: List of (N, 3) arrays of ordered points
+        tolerance: Points closer than this are merged
+        snap_distance: Chain ends closer than this are snapped to a shared position
+
+    Returns: Tuple of (array of merged points, list of point index arrays, one per chain,
+             number of merged points, number of snapped ends)
+    """
+    offsets = np.cumsum([0] + [len(chain) for chain in chains])
+    points = np.concatenate(chains).reshape(-1, 3)
+    labels, centers = cluster_points(points, tolerance)
+    indices = [collapse_repeats(labels[offsets[i]:offsets[i + 1]]) for i in range(len(chains))]
+    merged = len(points) - len(centers)
+
+    snapped = 0
+    ends = np.unique([chain[index] for chain in indices if len(chain) > 1 for index in (0, -1)])
+    if len(ends) > 1 and snap_distance > tolerance:
+        end_labels, end_centers = cluster_points(centers[ends], snap_distance)
+        remap = np.arange(len(centers) + len(end_centers))
+        remap[ends] = len(centers) + end_labels
+        centers = np.concatenate([centers, end_centers])
+        indices = [collapse_repeats(remap[chain]) for chain in indices]
+        snapped = len(ends) - len(end_centers)
+    return centers, indices, merged, snapped
+
+
+def get_coverage(samples, starts, ends, tolerance):
+    """
+    Checks which samples lie within tolerance of any of the given segments
+    Args:
+        samples: (S, 3) array of points
+        starts: (N, 3) array of segment starts
+        ends: (N, 3) array of segment ends
+        tolerance: Distance under which a sample is covered
+
+    Returns: (S,) boolean array
+    """
+    count = len(starts)
+    distances = segment_distances(np.repeat(samples, count, axis=0),
+                                  np.tile(starts, (len(samples), 1)),
+                                  np.tile(ends, (len(samples), 1)))
+    return distances.reshape(len(samples), count).min(axis=1) <= tolerance
+
+
+def find_covered_length(start, end, starts, ends, tolerance, from_start):
+    """
+    Bisects how far a segment runs along other segments, from one of its ends
+    Args:
+        start: Start of the segment
+        end: End of the segment
+        starts: Starts of the covering segments
+        ends: Ends of the covering segments
+        tolerance: Coverage distance
+        from_start: Measure from start when True, from end otherwise
+
+    Returns: Covered fraction of the segment, between 0 and 1
+    """
+    covered, uncovered = 0.0, 1.0
+    for _ in range(20):
+        middle = (covered + uncovered) / 2.0
+        t = middle if from_start else 1.0 - middle
+        if get_coverage((start + (end - start) * t)[None], starts, ends, tolerance)[0]:
+            covered = middle
+        else:
+            uncovered = middle
+    return covered
+
+
+def snap_to_ends(point, starts, ends, tolerance):
+    """
+    Moves a trimmed segment end onto the closest end of the segments covering it, when within
+    twice the tolerance, so the trimmed chain continues exactly where the earlier one stops
+    Args:
+        point: Trimmed end
+        starts: Starts of the covering segments
+        ends: Ends of the covering segments
+        tolerance: Coverage distance
+
+    Returns: Position of the trimmed end
+    """
+    candidates = np.concatenate([starts, ends])
+    distances = np.linalg.norm(candidates - point, axis=1)
+    index = int(np.argmin(distances))
+    return candidates[index] if distances[index] <= 2.0 * tolerance else point
+
+
+def trim_overlaps(points, chains, tolerance, snap_distance):
+    """
+    Removes the parts of chain segments that run along a segment of an earlier chain.
+    Candidate segments are found by pairing close midpoints with find_pairs. Fully covered
+    segments are dropped, splitting their chain into runs, and segments covered from one end
+    are trimmed there.
+    Args:
+        points: (N, 3) array of points
+        chains: List of point index arrays, chains of less than two points are skipped
+        tolerance: Segments closer than this overlap
+        snap_distance: Overlaps shorter than this are kept, so junctions stay connected
+
+    Returns: Tuple of (array of points with the trimmed ends appended, list of runs per chain,
+             as lists of point indices, or None for skipped chains, number of dropped segments,
+             number of trimmed segments)
+    """
+    kept = [i for i, chain in enumerate(chains) if len(chain) > 1]
+    segment_chain = np.array([i for i in kept for _ in range(len(chains[i]) - 1)], dtype=np.int64)
+    segment_starts = np.concatenate([points[chains[i][:-1]] for i in kept] or [np.zeros((0, 3))])
+    segment_ends = np.concatenate([points[chains[i][1:]] for i in kept] or [np.zeros((0, 3))])
+    # Overlapping segments have midpoints at most half of both lengths plus tolerance apart
+    lengths = np.linalg.norm(segment_ends - segment_starts, axis=1)
+    middles = (segment_starts + segment_ends) / 2.0
+    first, second = find_pairs(middles, lengths.max(initial=0.0) + tolerance)
+    distances = np.linalg.norm(middles[first] - middles[second], axis=1)
+    close = distances <= (lengths[first] + lengths[second]) / 2.0 + tolerance
+    first, second = first[close], second[close]
+    # Each segment is only checked against segments of earlier chains
+    later = segment_chain[first] > segment_chain[second]
+    earlier = segment_chain[first] < segment_chain[second]
+    segment = np.concatenate([first[later], second[earlier]])
+    candidates = np.concatenate([second[later], first[earlier]])
+    order = np.argsort(segment, kind="stable")
+    segment, candidates = segment[order], candidates[order]
+    bounds = np.searchsorted(segment, np.arange(len(segment_chain) + 1))
+
+    new_points = list(points)
+    samples = np.linspace(0.0, 1.0, 5)
+    dropped = trimmed = index = 0
+    runs_per_chain = []
+    for i, chain in enumerate(chains):
+        if len(chain) < 2:
+            runs_per_chain.append(None)
+            continue
+        runs = [[]]
+        for a, b in zip(chain[:-1], chain[1:]):
+            start, end = points[a], points[b]
+            length = np.linalg.norm(end - start)
+            found = candidates[bounds[index]:bounds[index + 1]]
+            index += 1
+            covered = np.zeros(len(samples), dtype=bool)
+            if len(found):
+                starts, ends = segment_starts[found], segment_ends[found]
+                covered = get_coverage(start + np.outer(samples, end - start), starts, ends, tolerance)
+            if covered.all():
+                dropped += 1
+                runs.append([])
+                continue
+            if covered[0] and not covered[-1]:
+                # Trim the covered start, short overlaps are junctions on the earlier chain
+                t = find_covered_length(start, end, starts, ends, tolerance, True)
+                if t * length >= snap_distance:
+                    new_points.append(snap_to_ends(start + (end - start) * t, starts, ends, tolerance))
+                    runs.append([len(new_points) - 1, b])
+                    trimmed += 1
+                    continue
+            elif covered[-1] and not covered[0]:
+                t = find_covered_length(start, end, starts, ends, tolerance, False)
+                if t * length >= snap_distance:
+                    new_points.append(snap_to_ends(end + (start - end) * t, starts, ends, tolerance))
+                    if not runs[-1]:
+                        runs[-1].append(a)
+                    runs[-1].append(len(new_points) - 1)
+                    runs.append([])
+                    trimmed += 1
+                    continue
+            if not runs[-1]:
+                runs[-1].append(a)
+            runs[-1].append(b)
+        runs_per_chain.append([run for run in runs if len(run) > 1])
+    return np.array(new_points, dtype=np.float64).reshape(-1, 3), runs_per_chain, dropped, trimmed
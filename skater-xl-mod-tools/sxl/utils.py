@@ -22,17 +22,101 @@ def is_legacy():
     return bpy.app.version < (2, 80, 0)
 
 
-def get_children(obj, select=False):
+EXPORT_TYPES = {'EMPTY', 'ARMATURE', 'MESH'}
+
+
+def build_hierarchy(objects=None):
+    """
+    Builds a parent => children index of exportable objects in a single pass
+    Args:
+        objects: Objects to index, defaults to every object in the scene
+
+    Returns: Dictionary of parent object (None for roots) => list of child objects
+    """
+    if objects is None:
+        objects = bpy.context.scene.objects
+    hierarchy = {}
+    for o in objects:
+        if o.type in EXPORT_TYPES:
+            hierarchy.setdefault(o.parent, []).append(o)
+    return hierarchy
+
+
+def get_children(obj, select=False, hierarchy=None):
+    """
+    Collects all exportable descendants of obj, depth first
+    Args:
+        obj: Object to collect descendants for
+        select: Select descendants as they are collected
+        hierarchy: Index from build_hierarchy, built from the scene when not given.
+                   Pass one in when collecting children for many objects.
+
+    Returns: List of descendant objects
+    """
+    if hierarchy is None:
+        hierarchy = build_hierarchy()
     children = []
-    for o in bpy.context.scene.objects:
-        if o.parent is obj and o.type in ['EMPTY', 'ARMATURE', 'MESH']:
-            if select:
-                o.select_set(True)
-            children.append(o)
-            children.extend(get_children(o, select))
+    stack = list(reversed(hierarchy.get(obj, [])))
+    while stack:
+        o = stack.pop()
+        if select:
+            o.select_set(True)
+        children.append(o)
+        stack.extend(reversed(hierarchy.get(o, [])))
     return children
 
 
+def get_export_objects(context, selected_only):
+    """
+    Collects the objects an asset export writes, visiting each object once
+    Args:
+        context: Blender context
+        selected_only: Only collect selected objects and their descendants
+
+    Returns: List of objects
+    """
+    if not selected_only:
+        return [o for o in context.scene.objects if o.type in EXPORT_TYPES]
+
+    hierarchy = build_hierarchy(context.scene.objects)
+    collected = set()
+    objects = []
+    for obj in context.selected_objects:
+        if obj in collected:
+            continue
+        for o in [obj] + get_children(obj, hierarchy=hierarchy):
+            if o not in collected:
+                collected.add(o)
+                objects.append(o)
+    return objects
+
+
+def parent_in_place(child, parent):
+    """
+    Parents child to parent with an identity local transform, so it sits exactly on top of parent
+    Args:
+        child: Object to parent
+        parent: New parent object
+    """
+    child.parent = parent
+    child.matrix_parent_inverse.identity()
+    child.matrix_basis.identity()
+
+
+def parent_keep_transform(child, parent):
+    """
+    Parents child to parent keeping its world transform, like bpy.ops.object.parent_set
+    without the selection round trip and scene update
+    Args:
+        child: Object to parent
+        parent: New parent object
+    """
+    world = child.matrix_world.copy()
+    child.parent = parent
+    child.matrix_parent_inverse = parent.matrix_world.inverted()
+    child.matrix_basis = world
+
+
 def get_base_name(name):
     if '_LOD' in name:
         return name[:-5]
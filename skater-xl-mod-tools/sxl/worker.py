@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Skater XL background blender worker.
+
+Started by batch.run_workers as:
+    blender --background [file.blend] --python worker.py -- job.json
+"""
+# Ensure that compatibility is handled for python 2, 3
+from __future__ import division, print_function, absolute_import
+
+__author__ = "Greg Amato"
+__url__ = "https://gregamato.dev"
+__copyright__ = "Copyright 2019-2020, Greg Amato - Amatobahn"
+__credits__ = []
+__license__ = "GNU Public License"
+__maintainer__ = "Greg Amato"
+__status__ = "Development"
+
+import json
+import os
+import sys
+
+import bpy
+
+
+def run_lods(job):
+    """
+    Builds LOD meshes for every source mesh in the job input library
+    Args:
+        job: Job dictionary with input, output, meshes, lod_count and targets
+
+    Returns: Result dictionary
+    """
+    from sxl import lods
+
+    with bpy.data.libraries.load(job["input"]) as (data_from, data_to):
+        data_to.meshes = list(job["meshes"])
+
+    outputs = set()
+    for name, mesh in zip(job["meshes"], data_to.meshes):
+        obj = bpy.data.objects.new(name, mesh)
+        bpy.context.scene.collection.objects.link(obj)
+        for i, lod_mesh in enumerate(lods.build_lod_meshes(obj, job["lod_count"], job["targets"])):
+            lod_mesh.name = "{}_LOD{}".format(name, i + 1)
+            outputs.add(lod_mesh)
+    bpy.data.libraries.write(job["output"], outputs)
+    return {"meshes": len(outputs)}
+
+
+def run_export(job):
+    """
+    Writes one fbx per group from the opened .blend
+    Args:
+        job: Job dictionary with groups of (filepath, object names), batch_cell_size and free_live_lods
+
+    Returns: Result dictionary
+    """
+    from sxl import export
+
+    return {"files": export.export_groups(job["groups"], job.get("batch_cell_size", 0.0),
+                                           job.get("free_live_lods", False))}
+
+
+def run_pipeline(job):
+    """
+    Runs build pipeline stages on the opened .blend
+    Args:
+        job: Job dictionary with stages and options, see pipeline.run_stages
+
+    Returns: Result dictionary
+    """
+    from sxl import pipeline
+
+    return pipeline.run_stages(job["stages"], job["options"])
+
+
+TASKS = {
+    "lods": run_lods,
+    "export": run_export,
+    "pipeline": run_pipeline,
+}
+
+
+def main():
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    job_path = sys.argv[sys.argv.index("--") + 1]
+    with open(job_path) as job_file:
+        job = json.load(job_file)
+
+    result = TASKS[job["task"]](job)
+    with open(job["result"], "w") as result_file:
+        json.dump(result, result_file)
+
+
+if __name__ == "__main__":
+    main()